@@ -0,0 +1,288 @@
+"""
+End-to-end benchmark of the agent loop against the offline fake LLM.
+
+    python -m benchmarks.bench_agent [--turns 10] [--latency 0.02] [--tps 500]
+                                     [--scenario multi_tool] [--save-baseline]
+                                     [--baseline benchmarks/baseline_agent.json]
+                                     [--max-regression 0.25]
+
+Scenarios (see SCENARIOS) drive `Agent.run` through a generated workspace:
+
+    multi_tool   streamed turns with an @file reference and parallel read-only tools
+    compression  a small context window so background/blocking compression kicks in
+    plan         plan mode: plan_task, then run_plan with parallel sub-agents
+
+For every scenario the report shows the turn latency, the overhead excluding
+the LLM (turn time during which no completion request was in flight, i.e.
+tokenizing, tool execution, compression bookkeeping, HTTP client) and the
+peak traced memory of the run, which includes the in-process fake server.
+Results are compared with the stored baseline; the exit code is 1 when a
+metric regressed by more than --max-regression. Baselines are machine
+specific: re-record one with --save-baseline before comparing.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_openai import FakeOpenAIServer, ScriptedResponder
+from codeagent.config import Settings, get_settings
+from codeagent.core.agent import Agent
+from codeagent.core.executor import ToolExecutor
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.core.session import Session
+
+DEFAULT_BASELINE = str(Path(__file__).with_name("baseline_agent.json"))
+COMPARED = ("turn_p50_ms", "overhead_p50_ms", "peak_memory_kb")
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        responder: ScriptedResponder,
+        prompts: List[str],
+        plan_mode: bool = False,
+        configure_session: Optional[Callable[[Session], None]] = None
+    ):
+        self.name = name
+        self.responder = responder
+        self.prompts = prompts
+        self.plan_mode = plan_mode
+        self.configure_session = configure_session
+
+def build_workspace(root: Path, modules: int = 60):
+    """A small Python project: src/module_<i>.py with classes and functions, plus docs."""
+    (root / "src").mkdir()
+    (root / "docs").mkdir()
+    for i in range(modules):
+        body = [f'"""Module {i} of the benchmark workspace."""', "import os", ""]
+        for j in range(12):
+            body += [
+                f"def handler_{i}_{j}(request):",
+                f"    # TODO: validate request {j}",
+                f"    return {{'module': {i}, 'handler': {j}, 'path': os.getcwd()}}",
+                ""
+            ]
+        body += [f"class Service{i}:", "    def run(self):", f"        return handler_{i}_0(None)", ""]
+        (root / "src" / f"module_{i}.py").write_text("\n".join(body), encoding="utf-8")
+    (root / "docs" / "architecture.md").write_text("# Architecture\n\n" + "Services call handlers.\n" * 200, encoding="utf-8")
+
+def call(name: str, **arguments) -> Dict[str, Any]:
+    return {"name": name, "arguments": arguments}
+
+def multi_tool_scenario() -> Scenario:
+    turns = [
+        {"content": "Let me look at the relevant files.", "tool_calls": [
+            call("read_file", path="src/module_1.py"),
+            call("read_file", path="src/module_2.py"),
+            call("grep_search", pattern="TODO", path="src"),
+            call("list_dir", path="src")
+        ]},
+        {"tool_calls": [call("glob_search", pattern="**/*.md")]},
+        {"content": "The handlers all share the same TODO: request validation is missing. " * 4}
+    ]
+    return Scenario(
+        "multi_tool",
+        ScriptedResponder(turns),
+        ["Where is request validation missing? See @file:architecture.md"]
+    )
+
+def compression_scenario() -> Scenario:
+    turns = [
+        {"tool_calls": [call("read_file", path=f"src/module_{i}.py") for i in range(3)]},
+        {"content": "Reviewed three modules; they follow the same pattern."}
+    ]
+
+    def configure(session: Session):
+        session.max_tokens = 12000
+        session.reserved_output_tokens = 2000
+        session.compression_chunk_tokens = 2000
+
+    return Scenario(
+        "compression",
+        ScriptedResponder(turns, summary="Reviewed modules 0-2: handlers return dicts, validation is missing."),
+        ["Review the first modules again and report the pattern."],
+        configure_session=configure
+    )
+
+def plan_scenario() -> Scenario:
+    tasks = [
+        {"id": "t1", "description": "Inspect module 1", "dependencies": []},
+        {"id": "t2", "description": "Inspect module 2", "dependencies": []},
+        {"id": "t3", "description": "Inspect module 3", "dependencies": []},
+        {"id": "t4", "description": "Summarize the findings", "dependencies": ["t1", "t2", "t3"]}
+    ]
+    main_turns = [
+        {"tool_calls": [call("plan_task", tasks=tasks)]},
+        {"tool_calls": [call("run_plan")]},
+        {"content": "All tasks completed; validation is missing in every handler."}
+    ]
+    sub_turns = [
+        {"tool_calls": [call("read_file", path="src/module_1.py"), call("grep_search", pattern="def handler_1_", path="src")]},
+        {"content": "Module inspected: 12 handlers without validation."}
+    ]
+    return Scenario(
+        "plan",
+        ScriptedResponder(main_turns, routes={"sub-agent": sub_turns}),
+        ["Plan and execute an audit of the handler modules."],
+        plan_mode=True
+    )
+
+SCENARIOS = {
+    "multi_tool": multi_tool_scenario,
+    "compression": compression_scenario,
+    "plan": plan_scenario
+}
+
+def busy_time(intervals: List[Tuple[float, float]], start: float, end: float) -> float:
+    """Length of the union of `intervals` clipped to [start, end]."""
+    total = 0.0
+    cursor = start
+    for lo, hi in sorted(intervals):
+        lo, hi = max(lo, cursor), min(hi, end)
+        if hi > lo:
+            total += hi - lo
+            cursor = hi
+    return total
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def run_turns(scenario: Scenario, settings: Settings, server: FakeOpenAIServer, turns: int) -> Tuple[List[float], List[float]]:
+    agent = Agent(settings, plan_mode=scenario.plan_mode, stream=True)
+    if scenario.configure_session:
+        scenario.configure_session(agent.session)
+    latencies, overheads = [], []
+    try:
+        for i in range(turns):
+            prompt = scenario.prompts[i % len(scenario.prompts)]
+            start = time.perf_counter()
+            async for _ in agent.run(prompt):
+                pass
+            end = time.perf_counter()
+            latencies.append(end - start)
+            overheads.append(end - start - busy_time(server.intervals, start, end))
+    finally:
+        agent.session.cancel_background_compression()
+        await LLMClientPool.aclose()
+    return latencies, overheads
+
+def run_scenario(scenario: Scenario, settings: Settings, server: FakeOpenAIServer, turns: int) -> Dict[str, Any]:
+    server.responder = scenario.responder
+    requests_before = server.requests
+    ToolExecutor.cache.clear()
+    latencies, overheads = asyncio.run(run_turns(scenario, settings, server, turns))
+    requests = server.requests - requests_before
+
+    # Separate pass for memory: tracing allocations would distort the timings
+    ToolExecutor.cache.clear()
+    tracemalloc.start()
+    asyncio.run(run_turns(scenario, settings, server, turns))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "turns": turns,
+        "llm_requests": requests,
+        "turn_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "turn_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "overhead_p50_ms": round(statistics.median(overheads) * 1000, 2),
+        "overhead_mean_ms": round(statistics.mean(overheads) * 1000, 2),
+        "peak_memory_kb": round(peak / 1024)
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_regression: float) -> bool:
+    """Print current vs. baseline; returns False if any metric regressed beyond the limit."""
+    ok = True
+    print(f"\n{'scenario':<13} {'metric':<17} {'current':>10} {'baseline':>10} {'delta':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<13} (no baseline)")
+            continue
+        for metric in COMPARED:
+            if not base.get(metric):
+                continue
+            delta = (current[metric] - base[metric]) / base[metric]
+            flag = ""
+            if delta > max_regression:
+                flag = "  REGRESSION"
+                ok = False
+            print(f"{name:<13} {metric:<17} {current[metric]:>10} {base[metric]:>10} {delta:>+7.0%}{flag}")
+    return ok
+
+def configure_environment(base_url: str, workspace: Path) -> Settings:
+    """Settings for the agent; sub-agents read them through get_settings(), so they go into the environment too."""
+    env = {
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_MODEL": "fake-model",
+        "PERSIST_SESSIONS": "false",
+        "LLM_CACHE_ENABLED": "false",
+        "DEBUG_MODE": "false",
+        "TOKEN_SAMPLES_FILE": "",
+        "METRICS_FILE": "",
+        "ARTIFACT_DIR": str(workspace / ".codeagent" / "artifacts")
+    }
+    os.environ.update(env)
+    get_settings.cache_clear()
+    return get_settings()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end agent benchmark against the fake LLM")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake LLM time to first token (seconds)")
+    parser.add_argument("--tps", type=float, default=500, help="Fake LLM generation rate (tokens per second)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    server = FakeOpenAIServer(latency=args.latency, tokens_per_second=args.tps)
+    base_url = server.start_in_thread()
+    cwd = os.getcwd()
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp)
+            build_workspace(workspace)
+            os.chdir(workspace)  # Tools resolve paths relative to the working directory
+            settings = configure_environment(base_url, workspace)
+            for name in args.scenario or SCENARIOS:
+                results[name] = run_scenario(SCENARIOS[name](), settings, server, args.turns)
+                r = results[name]
+                print(
+                    f"{name:<13} turn p50 {r['turn_p50_ms']:>8.1f} ms  p95 {r['turn_p95_ms']:>8.1f} ms  "
+                    f"overhead p50 {r['overhead_p50_ms']:>7.1f} ms  peak {r['peak_memory_kb']:>7} KiB  "
+                    f"({r['llm_requests']} LLM requests)"
+                )
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        server.stop_thread()
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path} (record one with --save-baseline)")
+        return 0
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    return 0 if compare(results, baseline, args.max_regression) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Benchmark the shared FileTree snapshot against the pathlib calls it replaced.
+
+    python -m benchmarks.bench_file_tree [--files 20000] [--root DIR]
+
+Without --root the synthetic repository of bench_grep is generated. Timings
+are reported for glob_search's pattern, an `@file:` keyword lookup and a
+list_dir of the root, each on a cold and a warm (revalidated) snapshot.
+"""
+import sys
+import time
+import argparse
+import itertools
+import tempfile
+from pathlib import Path
+
+from codeagent.core import file_tree as file_tree_module
+from codeagent.core.file_tree import FileTree
+from benchmarks.bench_grep import generate_repo
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FileTree")
+    parser.add_argument("--files", type=int, default=20000, help="Source files in the generated repository")
+    parser.add_argument("--root", help="Use an existing directory instead")
+    parser.add_argument("--glob", default="**/*.py", help="glob_search pattern")
+    parser.add_argument("--keyword", default="module_1234", help="@file keyword")
+    args = parser.parse_args(argv)
+
+    # The generated tree is seconds old: trust its listings right away
+    file_tree_module.RACY_WINDOW_NS = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.root or tmp)
+        if not args.root:
+            _, gen_time = timed(generate_repo, root, args.files)
+            print(f"Generated {args.files} source files in {gen_time:.1f}s\n")
+
+        cases = (
+            ("glob", lambda: list(root.glob(args.glob))[:100],
+             lambda tree: list(itertools.islice(tree.glob(str(root), args.glob), 101))),
+            ("@file", lambda: [p for p in root.rglob(f"*{args.keyword}*") if p.is_file()],
+             lambda tree: list(itertools.islice(tree.glob(str(root), f"**/*{args.keyword}*", True), 10))),
+            ("list_dir", lambda: [(p.name, p.is_dir()) for p in root.iterdir()],
+             lambda tree: tree.listdir(str(root))),
+        )
+        for label, legacy, cached in cases:
+            tree = FileTree()
+            _, legacy_time = timed(legacy)
+            _, cold_time = timed(cached, tree)
+            _, warm_time = timed(cached, tree)
+            print(
+                f"{label:<9} pathlib {legacy_time * 1000:>8.1f} ms   "
+                f"tree cold {cold_time * 1000:>8.1f} ms   warm {warm_time * 1000:>8.1f} ms"
+            )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark grep_search's engine against the previous os.walk implementation,
+and queries answered through the trigram index.
+
+    python -m benchmarks.bench_grep [--files 20000] [--root DIR] [--pattern needle]
+
+Without --root a synthetic repository is generated: source files, binary
+assets and a .gitignore'd build directory with as many files again. Timings
+are reported for a rare pattern (full scan) and a frequent one (early stop);
+the index is built once (timed) in a temporary directory before its queries.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List
+
+from codeagent.tools import grep_engine
+from codeagent.tools.trigram_index import TrigramIndex
+
+def legacy_grep(root: str, pattern: str, exclude_dirs=(".git", ".venv", "__pycache__", "node_modules")) -> List[str]:
+    """The pre-engine grep_search loop: decode and lowercase every line of every file."""
+    results = []
+    search_pattern = pattern.lower()
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs and not d.startswith(".")]
+        for file in files:
+            try:
+                with open(Path(current) / file, "r", encoding="utf-8", errors="ignore") as f:
+                    for i, line in enumerate(f, 1):
+                        if search_pattern in line.lower():
+                            results.append(f"{current}/{file}:{i}")
+                            if len(results) >= 100:
+                                return results
+            except Exception:
+                continue
+    return results
+
+def generate_repo(root: Path, files: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "request", "handler", "session", "token", "value", "result"]
+    (root / ".git").mkdir()
+    (root / ".gitignore").write_text("build/\n*.log\n", encoding="utf-8")
+    for i in range(files):
+        directory = root / "src" / f"pkg{i % 100}"
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = [" ".join(rng.choice(words) for _ in range(8)) for _ in range(rng.randint(20, 200))]
+        if i % 997 == 0:
+            lines[len(lines) // 2] = "rare_needle_marker = True"
+        (directory / f"module_{i}.py").write_text("\n".join(lines), encoding="utf-8")
+        if i % 20 == 0:
+            (directory / f"asset_{i}.png").write_bytes(os.urandom(32 * 1024))
+            (directory / f"blob_{i}.dat").write_bytes(b"\x00" + os.urandom(32 * 1024))
+        # Ignored build output mirroring the sources
+        build = root / "build" / f"pkg{i % 100}"
+        build.mkdir(parents=True, exist_ok=True)
+        (build / f"module_{i}.py").write_text("\n".join(lines), encoding="utf-8")
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark grep_search")
+    parser.add_argument("--files", type=int, default=20000, help="Source files in the generated repository")
+    parser.add_argument("--root", help="Search an existing directory instead")
+    parser.add_argument("--pattern", default="rare_needle_marker", help="Rare pattern (full scan)")
+    parser.add_argument("--frequent", default="handler", help="Frequent pattern (early stop)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.root
+        if not root:
+            root = tmp
+            _, gen_time = timed(generate_repo, Path(tmp), args.files)
+            print(f"Generated {args.files} source files in {gen_time:.1f}s")
+        print(f"Workers: {grep_engine.MAX_WORKERS}")
+
+        with tempfile.TemporaryDirectory() as index_dir:
+            TrigramIndex.configure(index_dir)
+            index, _ = timed(TrigramIndex.for_path, root)
+            _, build_time = timed(index.wait)
+            print(f"Index: {len(index.files)} files in {build_time:.1f}s\n")
+
+            exclude = [".git", ".venv", "__pycache__", "node_modules"]
+            for label, pattern in (("rare", args.pattern), ("frequent", args.frequent)):
+                legacy, legacy_time = timed(legacy_grep, root, pattern)
+                grep_engine.search(root, pattern)  # Warm the worker pool
+                (matches, _), engine_time = timed(grep_engine.search, root, pattern)
+                indexed, index_time = timed(index.search, root, pattern, exclude_dirs=exclude)
+                print(
+                    f"{label:<9} legacy {legacy_time * 1000:>9.1f} ms ({len(legacy)} matches)   "
+                    f"engine {engine_time * 1000:>9.1f} ms ({len(matches)} matches)   "
+                    f"x{legacy_time / max(engine_time, 1e-9):.1f}   "
+                    + (f"index {index_time * 1000:>7.1f} ms ({len(indexed[0])} matches)" if indexed else "index: full scan")
+                )
+            TrigramIndex.configure(None)
+    grep_engine.shutdown_pool()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
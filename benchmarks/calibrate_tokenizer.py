@@ -0,0 +1,97 @@
+"""
+Calibrate the offline token estimators against real `usage` numbers.
+
+1. Record samples by setting TOKEN_SAMPLES_FILE=logs/token_samples.jsonl and
+   using the agent normally (each LLM call appends messages + prompt_tokens).
+2. Run:
+       python -m benchmarks.calibrate_tokenizer logs/token_samples.jsonl [--vocab tokenizer.json]
+
+For every tokenizer the report shows the mean ratio actual/estimated (the
+`TOKENIZER_SCALE` to use for the heuristic estimator) and the error spread.
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from typing import List, Dict, Any
+
+from codeagent.core.message import Message
+from codeagent.core.session import Session
+from codeagent.core.tokenizer import Tokenizer, CharRatioTokenizer, HeuristicTokenizer, BPETokenizer
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            sample = json.loads(line)
+            if sample.get("prompt_tokens"):
+                samples.append(sample)
+    return samples
+
+def estimate_prompt_tokens(sample: Dict[str, Any], tokenizer: Tokenizer) -> int:
+    """Estimate the prompt exactly the way Session accounts for it, plus the tool schemas."""
+    messages = sample["messages"]
+    session = Session(system_prompt=messages[0].get("content") or "", tokenizer=tokenizer)
+    for raw in messages[1:]:
+        session.add_message(Message(**raw))
+    total = session._count_tokens()
+    if sample.get("tools"):
+        total += tokenizer.count(json.dumps(sample["tools"], ensure_ascii=False))
+    return total
+
+def evaluate(samples: List[Dict[str, Any]], tokenizer: Tokenizer) -> Dict[str, float]:
+    ratios = []
+    errors = []
+    start = time.perf_counter()
+    for sample in samples:
+        estimated = max(1, estimate_prompt_tokens(sample, tokenizer))
+        actual = sample["prompt_tokens"]
+        ratios.append(actual / estimated)
+        errors.append(abs(estimated - actual) / actual)
+    elapsed = time.perf_counter() - start
+    errors.sort()
+    return {
+        "mean_ratio": statistics.mean(ratios),
+        "mean_abs_error": statistics.mean(errors),
+        "p90_abs_error": errors[int(0.9 * (len(errors) - 1))],
+        "max_undercount": max(0.0, max(ratios) - 1.0),
+        "ms_per_sample": 1000 * elapsed / len(samples)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate token estimators against recorded API usage")
+    parser.add_argument("samples", help="JSONL file written via TOKEN_SAMPLES_FILE")
+    parser.add_argument("--vocab", help="Local tokenizer.json or .tiktoken file for the exact BPE backend")
+    args = parser.parse_args(argv)
+
+    samples = load_samples(args.samples)
+    if not samples:
+        print(f"No samples with prompt_tokens found in {args.samples}")
+        return 1
+
+    tokenizers: List[Tokenizer] = [CharRatioTokenizer(), HeuristicTokenizer()]
+    if args.vocab:
+        try:
+            tokenizers.append(BPETokenizer(args.vocab))
+        except Exception as e:
+            print(f"Skipping BPE tokenizer: {e}")
+
+    print(f"{len(samples)} samples from {args.samples}\n")
+    print(f"{'tokenizer':<10} {'ratio':>7} {'mean err':>9} {'p90 err':>8} {'max under':>10} {'ms/sample':>10}")
+    for tokenizer in tokenizers:
+        r = evaluate(samples, tokenizer)
+        print(
+            f"{tokenizer.name:<10} {r['mean_ratio']:>7.3f} {r['mean_abs_error']:>8.1%} "
+            f"{r['p90_abs_error']:>7.1%} {r['max_undercount']:>9.1%} {r['ms_per_sample']:>10.2f}"
+        )
+        if tokenizer.name == "heuristic":
+            suggested = round(r["mean_ratio"], 2)
+    print(f"\nSuggested TOKENIZER_SCALE for the heuristic estimator: {suggested}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
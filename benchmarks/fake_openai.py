@@ -0,0 +1,348 @@
+"""
+Offline OpenAI-compatible stand-in server for benchmarks and tests.
+
+    python -m benchmarks.fake_openai [--port 8765] [--latency 0.2] [--tps 50] [--script script.json]
+
+Serves `POST /v1/chat/completions` (plain JSON and SSE streaming) and
+`GET /v1/models` with scripted responses, so the agent loop can be driven
+end to end without a paid endpoint:
+
+    async with FakeOpenAIServer(ScriptedResponder(turns)) as server:
+        settings = Settings(openai_api_key="fake", openai_base_url=server.base_url)
+
+A turn is `{"content": "...", "tool_calls": [{"name": "read_file", "arguments": {...}}]}`.
+`latency` is the time to the first token and `tokens_per_second` the
+generation rate of the rest of the response (0 = instant). Token counts in
+`usage` are estimated as 4 characters per token.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+Turn = Dict[str, Any]
+Responder = Callable[[Dict[str, Any]], Turn]
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+class ScriptedResponder:
+    """
+    Pick the scripted turn for a request from the conversation itself, so
+    any number of concurrent sessions can share one script.
+
+    The step is the number of assistant messages after the last user message:
+    step 0 answers the user, step 1 answers the first tool results, and so on.
+    `routes` maps a substring of the system prompt to its own turns (e.g.
+    "sub-agent" for `submit_task` sub-agents). Requests without tools (context
+    compression) get `summary`. Past the end of a script the answer is "Done.".
+    """
+    def __init__(
+        self,
+        turns: List[Turn],
+        routes: Optional[Dict[str, List[Turn]]] = None,
+        summary: str = "Summary of the earlier conversation."
+    ):
+        self.turns = turns
+        self.routes = routes or {}
+        self.summary = summary
+
+    def __call__(self, body: Dict[str, Any]) -> Turn:
+        if not body.get("tools"):
+            return {"content": self.summary}
+        messages = body.get("messages") or []
+        system = messages[0].get("content") or "" if messages and messages[0].get("role") == "system" else ""
+        turns = self.turns
+        for marker, routed in self.routes.items():
+            if marker in system:
+                turns = routed
+                break
+        step = 0
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                break
+            if message.get("role") == "assistant":
+                step += 1
+        return turns[step] if step < len(turns) else {"content": "Done."}
+
+class FakeOpenAIServer:
+    """
+    Minimal HTTP/1.1 server (keep-alive, chunked SSE) on asyncio streams.
+
+    Run it on the caller's loop (`async with` / `start`) or on its own loop in
+    a background thread (`start_in_thread`) so serving does not count as
+    client overhead. `intervals` records the (start, end) perf_counter time
+    of every completion request for latency accounting.
+    """
+    def __init__(
+        self,
+        responder: Optional[Responder] = None,
+        latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+        chunk_tokens: int = 4,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = "fake-model"
+    ):
+        self.responder = responder or ScriptedResponder([])
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.host = host
+        self.port = port
+        self.model = model
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.intervals: List[Tuple[float, float]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._call_ids = 0
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # Idle keep-alive connections would otherwise keep wait_closed() waiting
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeOpenAIServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def start_in_thread(self) -> str:
+        """Serve from a daemon thread with its own event loop. Returns the base URL."""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-openai", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop_thread(self):
+        if self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                await self._dispatch(method, path.split("?", 1)[0], body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        if method == "POST" and path.endswith("/chat/completions"):
+            await self._completion(json.loads(body or b"{}"), writer)
+        elif method == "GET" and path.endswith("/models"):
+            await self._send_json(writer, 200, {"object": "list", "data": [{"id": self.model, "object": "model"}]})
+        else:
+            await self._send_json(writer, 404, {"error": {"message": f"Unknown route {method} {path}", "type": "invalid_request_error"}})
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode("utf-8")
+        reason = "OK" if status == 200 else "Not Found"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    def _tool_calls(self, turn: Turn) -> List[Dict[str, Any]]:
+        calls = []
+        for call in turn.get("tool_calls") or []:
+            self._call_ids += 1
+            arguments = call.get("arguments", {})
+            calls.append({
+                "id": call.get("id") or f"call_{self._call_ids}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments)
+                }
+            })
+        return calls
+
+    def _usage(self, body: Dict[str, Any], content: str, tool_calls: List[Dict[str, Any]]) -> Dict[str, int]:
+        prompt_text = "".join(str(m.get("content") or "") for m in body.get("messages") or [])
+        completion_text = content + "".join(c["function"]["name"] + c["function"]["arguments"] for c in tool_calls)
+        prompt_tokens = estimate_tokens(prompt_text)
+        completion_tokens = estimate_tokens(completion_text)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    async def _generate(self, tokens: int):
+        """Sleep for the generation time of `tokens` tokens."""
+        if self.tokens_per_second > 0 and tokens > 0:
+            await asyncio.sleep(tokens / self.tokens_per_second)
+
+    async def _completion(self, body: Dict[str, Any], writer: asyncio.StreamWriter):
+        started = time.perf_counter()
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            turn = self.responder(body)
+            content = turn.get("content") or ""
+            tool_calls = self._tool_calls(turn)
+            usage = self._usage(body, content, tool_calls)
+            latency = turn.get("latency", self.latency)
+            if latency:
+                await asyncio.sleep(latency)
+            if body.get("stream"):
+                await self._stream(body, writer, content, tool_calls, usage)
+            else:
+                await self._generate(usage["completion_tokens"])
+                message: Dict[str, Any] = {"role": "assistant", "content": content or None}
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                await self._send_json(writer, 200, {
+                    "id": f"chatcmpl-{self.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", self.model),
+                    "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                    "usage": usage
+                })
+        finally:
+            self.in_flight -= 1
+            self.intervals.append((started, time.perf_counter()))
+
+    async def _stream(
+        self,
+        body: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+        content: str,
+        tool_calls: List[Dict[str, Any]],
+        usage: Dict[str, int]
+    ):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        base = {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", self.model)
+        }
+
+        async def send(choices: List[Dict[str, Any]], **extra):
+            event = json.dumps({**base, "choices": choices, **extra})
+            await self._write_chunk(writer, f"data: {event}\n\n".encode("utf-8"))
+
+        step = self.chunk_tokens * CHARS_PER_TOKEN
+        for i in range(0, len(content), step):
+            piece = content[i:i + step]
+            await send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            await self._generate(estimate_tokens(piece))
+
+        for index, call in enumerate(tool_calls):
+            arguments = call["function"]["arguments"]
+            split = len(arguments) // 2
+            # Header first, arguments in two fragments, like real providers
+            await send([{"index": 0, "delta": {"tool_calls": [{
+                "index": index, "id": call["id"], "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": arguments[:split]}
+            }]}, "finish_reason": None}])
+            await self._generate(estimate_tokens(call["function"]["name"] + arguments[:split]))
+            await send([{"index": 0, "delta": {"tool_calls": [{
+                "index": index, "function": {"arguments": arguments[split:]}
+            }]}, "finish_reason": None}])
+            await self._generate(estimate_tokens(arguments[split:]))
+
+        await send([{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool_calls else "stop"}])
+        await send([], usage=usage)
+        await self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+        """One HTTP/1.1 chunk of a `Transfer-Encoding: chunked` body."""
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+def load_script(path: str) -> ScriptedResponder:
+    """
+    Load a responder from JSON: either a list of turns or
+    `{"turns": [...], "routes": {...}, "summary": "..."}`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    if isinstance(script, list):
+        return ScriptedResponder(script)
+    return ScriptedResponder(script.get("turns", []), script.get("routes"), script.get("summary", "Summary of the earlier conversation."))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible server with scripted responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds until the first token")
+    parser.add_argument("--tps", type=float, default=0.0, help="Generated tokens per second (0 = instant)")
+    parser.add_argument("--script", help="JSON file with the scripted turns")
+    args = parser.parse_args(argv)
+
+    responder = load_script(args.script) if args.script else ScriptedResponder([])
+    server = FakeOpenAIServer(responder, latency=args.latency, tokens_per_second=args.tps, host=args.host, port=args.port)
+
+    async def serve():
+        base_url = await server.start()
+        print(f"Serving fake OpenAI API on {base_url} (OPENAI_BASE_URL={base_url})")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import asyncio
+import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from rich.console import Console
+
+from codeagent.core.agent import Agent
+from codeagent.cli.runtime import configure_runtime
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.core.context import current_token_usage
+from codeagent.core.metrics import metrics
+from codeagent.core.trace import TraceSink
+
+console = Console(stderr=True)
+
+# Fields read from an input record, in order of preference
+ID_FIELDS = ("id", "request_id")
+PROMPT_FIELDS = ("prompt", "input", "body")
+
+def parse_item(line: str, line_no: int) -> Tuple[str, str]:
+    """
+    Return (id, prompt) of one input line: a JSON string, or an object with a
+    prompt field (`prompt`/`input`/`body`, prefixed by `title` if present) and an
+    optional `id`/`request_id` (defaults to `line-<n>`).
+    """
+    record = json.loads(line)
+    if isinstance(record, str):
+        return f"line-{line_no}", record
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object or string")
+    item_id = next((str(record[f]) for f in ID_FIELDS if record.get(f) is not None), f"line-{line_no}")
+    prompt = next((record[f] for f in PROMPT_FIELDS if record.get(f)), None)
+    if not isinstance(prompt, str):
+        raise ValueError(f"no prompt field ({', '.join(PROMPT_FIELDS)})")
+    if record.get("title"):
+        prompt = f"{record['title']}\n\n{prompt}"
+    return item_id, prompt
+
+def load_items(path: str) -> Tuple[List[Tuple[str, str]], List[Dict[str, Any]]]:
+    """Read the input JSONL. Returns (items, error records for unparsable lines)."""
+    items, invalid = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(parse_item(line, line_no))
+            except (ValueError, KeyError) as e:
+                invalid.append({"id": f"line-{line_no}", "status": "error", "error": f"Invalid input line: {e}"})
+    return items, invalid
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already finished successfully in an existing output file (for resuming)."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line of an interrupted run
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+def open_output(path: str):
+    """Open the output for appending, terminating a torn final line first."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    out = open(path, "a", encoding="utf-8")
+    if out.tell() > 0:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")
+    return out
+
+async def run_item(settings, item_id: str, prompt: str, plan_mode: bool) -> Dict[str, Any]:
+    """Run one prompt with its own Agent (session, TaskManager, artifacts)."""
+    usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    usage_token = current_token_usage.set(usage)
+    started_at = datetime.datetime.now().isoformat()
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"id": item_id}
+    agent = None
+    try:
+        agent = Agent(settings, plan_mode=plan_mode, stream=False)
+        async for _ in agent.run(prompt):
+            pass
+        last = agent.session.history[-1]
+        record["status"] = "ok"
+        record["output"] = last.content if last.role == "assistant" else None
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e) or type(e).__name__
+    finally:
+        current_token_usage.reset(usage_token)
+        if agent:
+            agent.session.cancel_background_compression()
+    record["started_at"] = started_at
+    record["duration_s"] = round(time.perf_counter() - start, 3)
+    record["usage"] = usage
+    if agent:
+        record["tool_calls"] = sum(1 for m in agent.session.history if m.role == "tool")
+    metrics.observe("batch_item_seconds", record["duration_s"], status=record["status"])
+    return record
+
+async def run_batch_async(settings, in_path: str, out_path: str, concurrency: int, plan_mode: bool = False) -> int:
+    items, invalid = load_items(in_path)
+    done = completed_ids(out_path)
+    pending = [(item_id, prompt) for item_id, prompt in items if item_id not in done]
+    total = len(pending)
+    console.print(
+        f"Batch: {len(items)} prompts, {len(items) - total} already done, "
+        f"{total} to run ({concurrency} at a time)"
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    succeeded = 0
+    finished = 0
+    with open_output(out_path) as out:
+        for record in invalid:
+            if record["id"] not in done:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                failures += 1
+        out.flush()
+
+        async def worker(item_id: str, prompt: str):
+            nonlocal failures, succeeded, finished
+            async with semaphore:
+                record = await run_item(settings, item_id, prompt, plan_mode)
+            # Written as soon as the item finishes; a crash loses at most in-flight items
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            finished += 1
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failures += 1
+            console.print(f"[{finished}/{total}] {item_id}: {record['status']} in {record['duration_s']:.1f}s")
+
+        await asyncio.gather(*(worker(item_id, prompt) for item_id, prompt in pending))
+    await LLMClientPool.aclose()
+    console.print(f"Batch finished: {succeeded} ok, {failures} failed. Results in {out_path}")
+    return 1 if failures else 0
+
+def run_batch(settings, in_path: str, out_path: str, concurrency: Optional[int] = None, plan_mode: bool = False) -> int:
+    """
+    Run every prompt of `in_path` (JSONL) headless and append one result per
+    line to `out_path` as items finish. Items already recorded as "ok" in
+    `out_path` are skipped, so rerunning an interrupted batch resumes it;
+    failed items are retried and their new record appended (the last record
+    per id wins).
+
+    Returns:
+        int: Exit code, 0 if every item succeeded.
+    """
+    configure_runtime(settings)
+    concurrency = max(1, concurrency or settings.batch_concurrency)
+    try:
+        return asyncio.run(run_batch_async(settings, in_path, out_path, concurrency, plan_mode))
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted. Run the same command again to resume.[/yellow]")
+        return 130
+    finally:
+        if settings.metrics_file:
+            metrics.export(settings.metrics_file)
+        TraceSink.shutdown()
@@ -1,12 +1,24 @@
 import asyncio
+import time
 from prompt_toolkit import PromptSession
 from prompt_toolkit.styles import Style
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.table import Table
 from rich.text import Text
 
 from codeagent.core.agent import Agent
+from codeagent.core.executor import ToolExecutor
+from codeagent.cli.runtime import configure_runtime
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.core.session import Session
+from codeagent.core.journal import SessionJournal
+from codeagent.core.tokenizer import get_tokenizer
+from codeagent.core.trace import TraceSink
+from codeagent.core.metrics import metrics
+from codeagent.core.context import current_progress
 
 console = Console()
 
@@ -14,17 +26,45 @@ style = Style.from_dict({
     'prompt': 'ansicyan bold',
 })
 
-def run_repl(settings, plan_mode: bool = False):
+def open_session(settings, resume_id: str = None) -> Session:
+    """
+    Create the REPL session, journaled under `settings.session_dir` when
+    persistence is enabled, or restore it from the journal of `resume_id`.
+    """
+    session_kwargs = {
+        "tokenizer": get_tokenizer(settings.tokenizer_vocab_file, settings.tokenizer_scale),
+        "compression_concurrency": settings.compression_concurrency
+    }
+    if resume_id:
+        path = SessionJournal.path_for(settings.session_dir, resume_id)
+        if not path.exists():
+            raise FileNotFoundError(f"No saved session '{resume_id}' in {settings.session_dir}")
+        return Session.resume(str(path), **session_kwargs)
+
+    session = Session(prefix_stable=settings.prefix_stable_context, **session_kwargs)
+    if settings.persist_sessions:
+        session.attach_journal(SessionJournal(SessionJournal.path_for(settings.session_dir, session.session_id)))
+    return session
+
+def run_repl(settings, plan_mode: bool = False, resume_id: str = None):
     """
     Start the Read-Eval-Print Loop with Agent integration.
     """
     # Initialize Agent
-    agent = Agent(settings, plan_mode=plan_mode)
+    configure_runtime(settings)
+    agent_session = open_session(settings, resume_id)
+    agent = Agent(settings, session=agent_session, plan_mode=plan_mode, stream=settings.stream_responses)
+    # run_plan progress is printed as tasks finish, not only with the tool output
+    current_progress.set(lambda line: console.print(Text(line, style="dim")))
     
     session = PromptSession(style=style)
     
     console.print(Panel(f"[bold green]CodeAgent CLI[/bold green]\nModel: {settings.openai_model}\nPlan Mode: {'ON' if plan_mode else 'OFF'}", border_style="green"))
-    console.print("Type 'exit' or 'quit' to close.")
+    if resume_id:
+        console.print(f"Resumed session {agent_session.session_id} ({len(agent_session.history)} messages).")
+    elif agent_session.journal:
+        console.print(f"Session {agent_session.session_id} (resume later with --resume {agent_session.session_id}).")
+    console.print("Type 'exit' or 'quit' to close, '/stats' for performance metrics.")
     
     # We need an event loop for async Agent
     loop = asyncio.new_event_loop()
@@ -41,18 +81,82 @@ def run_repl(settings, plan_mode: bool = False):
                     
                 if not user_input.strip():
                     continue
+
+                if user_input.strip().lower() == '/stats':
+                    print_stats(agent_session)
+                    continue
                 
-                # Show spinner while thinking
-                with console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
-                    # Execute Agent asynchronously
-                    loop.run_until_complete(agent_run_wrapper(agent, user_input))
+                try:
+                    if agent.stream:
+                        # Live panel replaces the spinner as soon as tokens arrive
+                        loop.run_until_complete(agent_stream_wrapper(agent, user_input))
+                    else:
+                        # Show spinner while thinking
+                        with console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
+                            # Execute Agent asynchronously
+                            loop.run_until_complete(agent_run_wrapper(agent, user_input))
+                finally:
+                    export_metrics(settings)
 
             except KeyboardInterrupt:
                 continue
             except EOFError:
                 break
     finally:
+        agent_session.close()
+        export_metrics(settings)
+        loop.run_until_complete(LLMClientPool.aclose())
         loop.close()
+        TraceSink.shutdown()
+
+def export_metrics(settings):
+    if not settings.metrics_file:
+        return
+    try:
+        metrics.export(settings.metrics_file)
+    except OSError as e:
+        console.print(f"[red]Failed to export metrics to {settings.metrics_file}: {e}[/red]")
+
+def print_stats(agent_session: Session):
+    """Render the collected metrics, tool cache and context usage."""
+    snapshot = metrics.snapshot()
+
+    latency = Table(title="Latency (seconds)", title_justify="left")
+    for column in ("metric", "labels", "count", "avg", "p50", "p95", "max"):
+        latency.add_column(column, justify="left" if column in ("metric", "labels") else "right")
+    for name, series in sorted(snapshot["histograms"].items()):
+        for entry in series:
+            labels = ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+            latency.add_row(
+                name, labels, str(entry["count"]),
+                f"{entry['avg']:.3f}", f"{entry['p50']:.3f}", f"{entry['p95']:.3f}", f"{entry['max']:.3f}"
+            )
+
+    counters = Table(title="Counters", title_justify="left")
+    counters.add_column("metric")
+    counters.add_column("labels")
+    counters.add_column("value", justify="right")
+    for name, series in sorted(snapshot["counters"].items()):
+        for entry in series:
+            labels = ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+            counters.add_row(name, labels, f"{entry['value']:g}")
+
+    cache = ToolExecutor.cache.stats()
+    context = agent_session.token_usage_by_role()
+    summary = (
+        f"Context: {sum(context.values())} tokens, {agent_session.token_usage_ratio():.0%} of the window "
+        f"({', '.join(f'{role}={tokens}' for role, tokens in context.items()) or 'empty'})\n"
+        f"Tool cache: {cache['entries']} entries, {cache['bytes']} bytes, "
+        f"{cache['hits']} hits / {cache['misses']} misses"
+    )
+
+    if latency.row_count:
+        console.print(latency)
+    if counters.row_count:
+        console.print(counters)
+    if not latency.row_count and not counters.row_count:
+        console.print("[dim]No metrics recorded yet.[/dim]")
+    console.print(summary)
 
 async def agent_run_wrapper(agent, user_input):
     """Helper to run async generator until completion and render outputs."""
@@ -73,3 +177,49 @@ async def agent_run_wrapper(agent, user_input):
     # Render final response
     if final_response:
         console.print(Panel(Markdown(final_response), title="Agent", border_style="blue"))
+
+async def agent_stream_wrapper(agent, user_input):
+    """Render a streaming agent run, updating the answer panel as tokens arrive."""
+    status = console.status("[bold green]Thinking...[/bold green]", spinner="dots")
+    status.start()
+    live = None
+    response = ""
+    last_render = 0.0
+
+    def render():
+        live.update(Panel(Markdown(response), title="Agent", border_style="blue"), refresh=True)
+
+    def close_live():
+        nonlocal live, response
+        if live:
+            render()
+            live.stop()
+        live = None
+        response = ""
+
+    try:
+        async for chunk in agent.run(user_input):
+            if chunk.startswith("\n[Executing") or chunk.startswith("\n[Tool Output"):
+                status.stop()
+                close_live()
+                if chunk.startswith("\n[Executing"):
+                    console.print(Panel(Text(chunk.strip(), style="bold yellow"), title="Tool Execution", border_style="yellow"))
+                else:
+                    console.print(Panel(Text(chunk.strip(), style="dim"), title="Tool Output", border_style="white"))
+                # Waiting for the next LLM round trip
+                status.start()
+                continue
+
+            if live is None:
+                status.stop()
+                live = Live(console=console, auto_refresh=False)
+                live.start()
+            response += chunk
+            # Re-parsing markdown on every token is quadratic; throttle re-renders
+            now = time.monotonic()
+            if now - last_render >= 0.1:
+                render()
+                last_render = now
+    finally:
+        status.stop()
+        close_live()
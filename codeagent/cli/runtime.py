@@ -0,0 +1,13 @@
+from codeagent.core.executor import ToolExecutor
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.tools.trigram_index import TrigramIndex
+
+def configure_runtime(settings):
+    """
+    Apply the process-wide settings shared by every front end (REPL, batch,
+    server): tool result cache size, search index location and LLM connection limits.
+    Call once before the first Agent is created.
+    """
+    ToolExecutor.configure_cache(settings.tool_cache_max_bytes)
+    TrigramIndex.configure(settings.search_index_dir if settings.search_index_enabled else None)
+    LLMClientPool.configure(settings.llm_max_connections, settings.llm_max_keepalive_connections)
@@ -0,0 +1,368 @@
+import json
+import time
+import asyncio
+import logging
+import ipaddress
+from typing import Any, Dict, Optional, Tuple
+
+from rich.console import Console
+
+from codeagent.core.agent import Agent
+from codeagent.cli.runtime import configure_runtime
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.core.context import current_token_usage
+from codeagent.core.metrics import metrics
+from codeagent.core.trace import TraceSink
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"
+}
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # Any other name may resolve to a public interface
+
+def check_bind(host: str, allow_remote: bool):
+    """
+    Raises:
+        ValueError: If `host` is not a loopback address and remote access is not allowed.
+    """
+    if is_loopback(host):
+        return
+    if not allow_remote:
+        raise ValueError(
+            f"Refusing to serve on non-loopback address {host}: the API has no authentication. "
+            f"Pass --allow-remote (SERVER_ALLOW_REMOTE=true) to expose it anyway."
+        )
+    logger.warning(f"Serving on {host} without authentication; anyone who can connect can run tools on this host")
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class ServerSession:
+    """One hosted conversation: its own Agent, Session, TaskManager and artifacts."""
+    def __init__(self, agent: Agent):
+        self.agent = agent
+        self.id = agent.session.session_id
+        self.busy = False
+        self.turns = 0
+        self.last_active = time.monotonic()
+
+class AgentServer:
+    """
+    Hosts many Agent sessions on one asyncio loop behind a small HTTP/1.1 API.
+    Agent output is streamed as Server-Sent Events.
+
+        POST   /sessions                 {"plan_mode": false}   -> 201 {"session_id": ...}
+        POST   /sessions/<id>/messages   {"input": "..."}       -> SSE: queued, delta..., done | error
+        DELETE /sessions/<id>
+        GET    /health                   session and turn counts
+        GET    /metrics                  Prometheus text format
+
+    Admission control: at most `max_sessions` sessions are kept (idle ones
+    expire after `idle_timeout` seconds) and at most `max_concurrent_turns`
+    turns run at once. Up to `max_queued_turns` more wait for a slot; beyond
+    that requests get 503. A session runs one turn at a time (409 otherwise).
+    The TaskManager and ArtifactStore of each session stay isolated because
+    `Agent.run` sets their ContextVars inside the connection's own task.
+
+    There is no authentication: anyone who can connect runs tools on this
+    host. `start` refuses a non-loopback `host` unless `allow_remote` is set.
+    """
+    def __init__(
+        self,
+        settings,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        max_concurrent_turns: Optional[int] = None,
+        max_queued_turns: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        allow_remote: Optional[bool] = None
+    ):
+        self.settings = settings
+        self.host = host or settings.server_host
+        self.allow_remote = settings.server_allow_remote if allow_remote is None else allow_remote
+        self.port = settings.server_port if port is None else port
+        self.max_sessions = max_sessions or settings.server_max_sessions
+        self.max_concurrent_turns = max_concurrent_turns or settings.server_max_concurrent_turns
+        self.max_queued_turns = settings.server_max_queued_turns if max_queued_turns is None else max_queued_turns
+        self.idle_timeout = idle_timeout or settings.server_session_idle_timeout
+        self.sessions: Dict[str, ServerSession] = {}
+        self.active_turns = 0
+        self.queued_turns = 0
+        self._turn_slots = asyncio.Semaphore(self.max_concurrent_turns)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._connections = set()
+
+    async def start(self) -> str:
+        """
+        Raises:
+            ValueError: If `host` is not a loopback address and remote access is not allowed.
+        """
+        check_bind(self.host, self.allow_remote)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._reaper = asyncio.ensure_future(self._reap_idle())
+        return f"http://{self.host}:{self.port}"
+
+    async def stop(self):
+        if self._reaper:
+            self._reaper.cancel()
+        if self._server:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        for session_id in list(self.sessions):
+            self._close_session(session_id)
+
+    async def _reap_idle(self):
+        """Drop sessions idle for longer than `idle_timeout`."""
+        while True:
+            await asyncio.sleep(min(60.0, self.idle_timeout))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id, session in list(self.sessions.items()):
+                if not session.busy and session.last_active < cutoff:
+                    self._close_session(session_id)
+
+    def _close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.agent.session.cancel_background_compression()
+            # Closed sessions cannot be resumed, nothing will page their artifacts again
+            session.agent.artifacts.cleanup()
+
+    # --- HTTP plumbing ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, path, _ = parts
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any, close: bool = False):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n{'Connection: close' if close else 'Connection: keep-alive'}\r\n\r\n".encode("latin-1")
+            + data
+        )
+        await writer.drain()
+
+    async def _send_text(self, writer: asyncio.StreamWriter, text: str):
+        data = text.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _send_event(writer: asyncio.StreamWriter, event: str, data: Dict[str, Any]):
+        writer.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_open = await self._dispatch(method, path, body, writer)
+                except HTTPError as e:
+                    metrics.inc("server_errors_total", status=e.status)
+                    await self._send_json(writer, e.status, {"error": str(e)}, close=True)
+                    break
+                if not keep_open or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Server connection failed: {e}")
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _parse_json(body: bytes) -> Dict[str, Any]:
+        if not body:
+            return {}
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "JSON body must be an object")
+        return payload
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Handle one request. Returns False when the connection must be closed (after SSE)."""
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, {
+                "sessions": len(self.sessions),
+                "active_turns": self.active_turns,
+                "queued_turns": self.queued_turns
+            })
+        elif parts == ["metrics"] and method == "GET":
+            await self._send_text(writer, metrics.to_prometheus())
+        elif parts == ["sessions"] and method == "POST":
+            session = self._create_session(self._parse_json(body))
+            await self._send_json(writer, 201, {"session_id": session.id})
+        elif len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            if parts[1] not in self.sessions:
+                raise HTTPError(404, f"Unknown session {parts[1]}")
+            self._close_session(parts[1])
+            await self._send_json(writer, 200, {"session_id": parts[1], "closed": True})
+        elif len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages" and method == "POST":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, f"Unknown session {parts[1]}")
+            user_input = self._parse_json(body).get("input")
+            if not isinstance(user_input, str) or not user_input.strip():
+                raise HTTPError(400, "Field 'input' must be a non-empty string")
+            await self._run_turn(session, user_input, writer)
+            return False
+        elif parts and parts[0] in ("health", "metrics", "sessions"):
+            raise HTTPError(405, f"Method {method} not allowed on {path}")
+        else:
+            raise HTTPError(404, f"Unknown route {path}")
+        return True
+
+    # --- Sessions and turns ---
+
+    def _create_session(self, options: Dict[str, Any]) -> ServerSession:
+        if len(self.sessions) >= self.max_sessions:
+            metrics.inc("server_rejected_total", reason="sessions")
+            raise HTTPError(503, f"Session limit reached ({self.max_sessions})")
+        agent = Agent(self.settings, plan_mode=bool(options.get("plan_mode")), stream=True)
+        session = ServerSession(agent)
+        self.sessions[session.id] = session
+        return session
+
+    async def _run_turn(self, session: ServerSession, user_input: str, writer: asyncio.StreamWriter):
+        if session.busy:
+            raise HTTPError(409, f"Session {session.id} is already running a turn")
+        if self._turn_slots.locked() and self.queued_turns >= self.max_queued_turns:
+            metrics.inc("server_rejected_total", reason="turns")
+            raise HTTPError(503, "Too many turns in progress, retry later")
+
+        session.busy = True
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+            )
+            if self._turn_slots.locked():
+                await self._send_event(writer, "queued", {"position": self.queued_turns + 1})
+            self.queued_turns += 1
+            try:
+                await self._turn_slots.acquire()
+            finally:
+                self.queued_turns -= 1
+            self.active_turns += 1
+            try:
+                await self._stream_turn(session, user_input, writer)
+            finally:
+                self.active_turns -= 1
+                self._turn_slots.release()
+        finally:
+            session.busy = False
+            session.last_active = time.monotonic()
+
+    async def _stream_turn(self, session: ServerSession, user_input: str, writer: asyncio.StreamWriter):
+        usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        usage_token = current_token_usage.set(usage)
+        start = time.perf_counter()
+        run = session.agent.run(user_input)
+        try:
+            async for chunk in run:
+                await self._send_event(writer, "delta", {"text": chunk})
+        except ConnectionError:
+            metrics.inc("server_turns_total", status="disconnected")
+            raise
+        except Exception as e:
+            logger.error(f"Turn failed in session {session.id}: {e}")
+            metrics.inc("server_turns_total", status="error")
+            await self._send_event(writer, "error", {"error": str(e) or type(e).__name__})
+            return
+        finally:
+            # Stops a turn whose client went away, cancelling its tools
+            await run.aclose()
+            current_token_usage.reset(usage_token)
+
+        session.turns += 1
+        metrics.inc("server_turns_total", status="ok")
+        last = session.agent.session.history[-1]
+        await self._send_event(writer, "done", {
+            "session_id": session.id,
+            "output": last.content if last.role == "assistant" else None,
+            "duration_s": round(time.perf_counter() - start, 3),
+            "usage": usage
+        })
+
+def run_server(settings, host: Optional[str] = None, port: Optional[int] = None, allow_remote: Optional[bool] = None):
+    """
+    Serve agent sessions until interrupted.
+
+    Raises:
+        ValueError: If `host` is not a loopback address and remote access is not allowed.
+    """
+    configure_runtime(settings)
+    server = AgentServer(settings, host=host, port=port, allow_remote=allow_remote)
+
+    async def serve():
+        url = await server.start()
+        console.print(f"[bold green]CodeAgent server listening on {url}[/bold green]")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+            await LLMClientPool.aclose()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if settings.metrics_file:
+            metrics.export(settings.metrics_file)
+        TraceSink.shutdown()
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     """
@@ -10,10 +11,58 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(..., description="API Key for OpenAI compatible provider")
     openai_base_url: str = Field(..., description="Base URL for OpenAI compatible provider")
     openai_model: str = Field("qwen-plus", description="Model name to use")
+    llm_max_connections: int = Field(20, description="Max concurrent HTTP connections per LLM endpoint (shared by all agents)")
+    llm_max_keepalive_connections: int = Field(10, description="Idle keep-alive connections kept per LLM endpoint")
     
     # System Configuration
     log_level: str = Field("INFO", description="Logging level")
     debug_mode: bool = Field(False, description="Enable verbose trace logging to file")
+    trace_max_bytes: int = Field(10 * 1024 * 1024, description="Rotate logs/trace.log when it reaches this size")
+    trace_backup_count: int = Field(3, description="Number of rotated trace logs to keep")
+    metrics_file: Optional[str] = Field(None, description="Export performance metrics after every turn (.prom/.txt: Prometheus text format, otherwise JSON)")
+    stream_responses: bool = Field(True, description="Stream LLM output to the REPL as it is generated")
+    prefix_stable_context: bool = Field(True, description="Keep the prompt prefix stable across requests so providers can reuse their prompt cache")
+    
+    # Session Persistence
+    persist_sessions: bool = Field(True, description="Journal REPL sessions to disk so they can be resumed with --resume <id>")
+    session_dir: str = Field(".codeagent/sessions", description="Directory of the session journals")
+    
+    # Token Estimation
+    tokenizer_vocab_file: Optional[str] = Field(None, description="Local tokenizer.json / .tiktoken vocab for exact token counts")
+    tokenizer_scale: float = Field(1.0, description="Correction factor for the heuristic token estimator (see benchmarks/calibrate_tokenizer.py)")
+    token_samples_file: Optional[str] = Field(None, description="Append request/usage samples to this JSONL file for tokenizer calibration")
+    
+    # Context Compression
+    compression_concurrency: int = Field(4, description="Number of history chunks summarized concurrently during context compression")
+    
+    # Plan Mode
+    plan_concurrency: int = Field(3, description="Number of independent plan tasks run_plan executes at the same time")
+    
+    # Batch Mode
+    batch_concurrency: int = Field(8, description="Number of prompts --batch runs at the same time")
+    
+    # Server Mode
+    server_host: str = Field("127.0.0.1", description="Address the --serve HTTP server binds to")
+    server_port: int = Field(8080, description="Port of the --serve HTTP server")
+    server_allow_remote: bool = Field(False, description="Let --serve bind a non-loopback address; the API has no authentication")
+    server_max_sessions: int = Field(256, description="Sessions hosted at once; creating more is rejected with 503")
+    server_max_concurrent_turns: int = Field(64, description="Agent turns running at the same time across all sessions")
+    server_max_queued_turns: int = Field(256, description="Turns waiting for a free slot before new ones are rejected with 503")
+    server_session_idle_timeout: float = Field(1800.0, description="Seconds after which an idle server session is dropped")
+    
+    # LLM Response Cache
+    llm_cache_enabled: bool = Field(False, description="Cache deterministic LLM responses on disk")
+    llm_cache_dir: str = Field(".codeagent/llm_cache", description="Directory of the LLM response cache")
+    llm_cache_max_bytes: int = Field(256 * 1024 * 1024, description="Size limit of the LLM response cache")
+    
+    # Tool Execution
+    parallel_tool_calls: bool = Field(True, description="Run independent read-only tool calls concurrently")
+    tool_cache_max_bytes: int = Field(32 * 1024 * 1024, description="Size limit of the idempotent tool result cache (0 disables it)")
+    artifact_dir: str = Field(".codeagent/artifacts", description="Directory for large tool outputs, one subdirectory per session")
+    artifact_threshold_chars: int = Field(8000, description="Tool outputs longer than this are stored as artifacts (0 disables it)")
+    artifact_max_age_days: float = Field(7.0, description="Artifact directories of sessions idle for longer than this are deleted (0 keeps them)")
+    search_index_enabled: bool = Field(True, description="Keep a background trigram index so grep_search only scans candidate files")
+    search_index_dir: str = Field(".codeagent/index", description="Directory of the trigram search indexes, one per repository")
     
     model_config = SettingsConfigDict(
         env_file=".env",
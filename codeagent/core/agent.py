@@ -1,15 +1,20 @@
-from typing import Optional, AsyncGenerator
+from typing import Optional, AsyncGenerator, Dict
+import asyncio
 import logging
 import json
+import time
 
 from codeagent.core.session import Session
-from codeagent.core.llm import LLMClient
+from codeagent.core.tokenizer import get_tokenizer
+from codeagent.core.llm import LLMClient, ToolCallReady
 from codeagent.core.message import Message
 from codeagent.config import Settings
 from codeagent.tools.registry import ToolRegistry
 from codeagent.core.executor import ToolExecutor
 from codeagent.core.task_manager import TaskManager, TaskStatus
-from codeagent.core.context import current_task_manager
+from codeagent.core.context import current_task_manager, current_artifact_store
+from codeagent.core.artifacts import ArtifactStore
+from codeagent.core.metrics import metrics
 
 # Import tools to ensure they are registered
 import codeagent.tools.file_tools
@@ -17,6 +22,7 @@ import codeagent.tools.search_tools
 import codeagent.tools.agent_tools
 import codeagent.tools.task_tools
 import codeagent.tools.shell_tools
+import codeagent.tools.artifact_tools
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +30,24 @@ class Agent:
     """
     Core Agent class that manages the Think-Act loop.
     """
-    def __init__(self, settings: Settings, session: Optional[Session] = None, plan_mode: bool = False):
+    def __init__(self, settings: Settings, session: Optional[Session] = None, plan_mode: bool = False, stream: bool = False):
         self.settings = settings
-        self.session = session or Session()
+        self.session = session or Session(
+            prefix_stable=settings.prefix_stable_context,
+            tokenizer=get_tokenizer(settings.tokenizer_vocab_file, settings.tokenizer_scale),
+            compression_concurrency=settings.compression_concurrency
+        )
         self.llm = LLMClient(settings)
+        # Large tool outputs of this session are spilled here
+        self.artifacts = ArtifactStore(
+            settings.artifact_dir,
+            session_id=self.session.session_id,
+            threshold_chars=settings.artifact_threshold_chars,
+            max_age=settings.artifact_max_age_days * 86400
+        )
         self.plan_mode = plan_mode
+        # Stream LLM tokens through `run` as they arrive (used by the interactive REPL)
+        self.stream = stream
         # Load tools
         self.tools_schema = ToolRegistry.get_schemas()
         
@@ -44,12 +63,17 @@ class Agent:
             context_summary: Optional summary of previous context (for sub-agents).
             
         Yields:
-            str: The response text from the LLM.
+            str: The response text from the LLM. In streaming mode, text is
+            yielded in deltas as it is generated.
         """
         # Set context variable for tools
         token = None
+        started_tools: Dict[int, asyncio.Task] = {}
         if self.task_manager:
             token = current_task_manager.set(self.task_manager)
+        artifact_token = current_artifact_store.set(self.artifacts)
+        turn_start = time.perf_counter()
+        iterations = 0
 
         try:
             resolved = await self.session.resolve_reference(user_input)
@@ -62,15 +86,39 @@ class Agent:
                 self.session.inject_context(context_summary)
             
             while True:
+                # Read-only tool calls dispatched while the response is still streaming
+                started_tools = {}
+                iterations += 1
+
                 # 0. Context Monitor & Compression
-                # Check and compress if needed before calling LLM
-                await self.session.compress_context(self.llm)
+                # Swap in a finished background summary, start one above the
+                # soft watermark, and only block at the hard limit
+                await self.session.maybe_compress(self.llm)
 
                 # 2. Call LLM
-                response_msg = await self.llm.chat(
-                    self.session.get_messages(), 
-                    tools=self.tools_schema if self.tools_schema else None
-                )
+                if self.stream:
+                    response_msg = None
+                    # Early dispatch stops at the first side-effecting call:
+                    # it and everything after it wait for the full message.
+                    dispatch_open = bool(self.settings.parallel_tool_calls)
+                    async for event in self.llm.chat_stream(
+                        self.session.get_messages(),
+                        tools=self.tools_schema if self.tools_schema else None
+                    ):
+                        if isinstance(event, Message):
+                            response_msg = event
+                        elif isinstance(event, ToolCallReady):
+                            if dispatch_open and ToolRegistry.is_read_only(event.name):
+                                started_tools[event.index] = ToolExecutor.start(event.call)
+                            else:
+                                dispatch_open = False
+                        else:
+                            yield event
+                else:
+                    response_msg = await self.llm.chat(
+                        self.session.get_messages(), 
+                        tools=self.tools_schema if self.tools_schema else None
+                    )
                 
                 # 3. Add Assistant Message (Thinking/Call)
                 self.session.add_message(response_msg)
@@ -88,7 +136,11 @@ class Agent:
                     yield f"\n[Executing {len(response_msg.tool_calls)} tool calls: {', '.join(tool_names)}]\n"
                     
                     # Execute Tools
-                    results = await ToolExecutor.execute(response_msg.tool_calls)
+                    results = await ToolExecutor.execute(
+                        response_msg.tool_calls,
+                        concurrent=self.settings.parallel_tool_calls,
+                        started=started_tools
+                    )
                     
                     # Add Tool Results to History
                     for res in results:
@@ -119,7 +171,7 @@ class Agent:
                                     except Exception:
                                         pass
                                 
-                                # Append plan summary to tool output so Agent sees updated state
+                                # Append plan changes to tool output so Agent sees updated state
                                 # Auto-Chaining: Check for next task and prompt Agent
                                 next_task = self.task_manager.get_next_task()
                                 if next_task:
@@ -127,7 +179,7 @@ class Agent:
                                 else:
                                     res["content"] += f"\n\n[System] Task {task_id} completed. No pending tasks found."
                                 
-                                res["content"] += "\n" + self.task_manager.get_plan_summary()
+                                res["content"] += "\n" + self.task_manager.get_plan_delta()
 
                         tool_msg = Message.tool(
                             tool_call_id=res["tool_call_id"],
@@ -142,11 +194,20 @@ class Agent:
                     continue
                 
                 # 5. No tool calls -> Final Answer
-                if response_msg.content:
+                # (already yielded token by token in streaming mode)
+                if response_msg.content and not self.stream:
                     yield response_msg.content
                     
                 break
         finally:
+            # Don't leave early-dispatched tools running if the turn was aborted
+            for task in started_tools.values():
+                if not task.done():
+                    task.cancel()
             # Clean up context var
             if token:
                 current_task_manager.reset(token)
+            current_artifact_store.reset(artifact_token)
+            metrics.observe("agent_turn_seconds", time.perf_counter() - turn_start)
+            metrics.inc("agent_turns_total")
+            metrics.inc("agent_iterations_total", iterations)
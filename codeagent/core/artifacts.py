@@ -0,0 +1,174 @@
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class ArtifactStore:
+    """
+    Per-session on-disk store for large tool outputs.
+
+    Outputs longer than `threshold_chars` are written to
+    `<root_dir>/<session_id>/<handle>.txt`; history only keeps the handle, the
+    size and a head/tail preview, and the model pages through the rest with
+    the `read_artifact` tool. Identical outputs share one artifact.
+
+    Session directories not written to for `max_age` seconds are deleted when
+    a store is created under the same root (at most once per process and root);
+    `cleanup()` deletes this session's directory right away.
+    """
+    PREVIEW_LINES = 20
+    PREVIEW_CHARS = 1500  # Per head/tail preview
+    MAX_PAGE_LINES = 500
+
+    _HANDLE_RE = re.compile(r"^art_[0-9a-f]{12}$")
+    _pruned_roots: Set[Path] = set()
+
+    def __init__(
+        self,
+        root_dir: str,
+        session_id: Optional[str] = None,
+        threshold_chars: int = 8000,
+        max_age: Optional[float] = None
+    ):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.dir = Path(root_dir) / self.session_id
+        self.threshold_chars = threshold_chars
+        self._stored: Set[str] = set()
+        self._lock = threading.Lock()
+        root = Path(root_dir).resolve()
+        if max_age and root not in self._pruned_roots:
+            self._pruned_roots.add(root)
+            self.prune(root, max_age)
+
+    @staticmethod
+    def prune(root_dir, max_age: float) -> int:
+        """Delete session directories under `root_dir` not modified for `max_age` seconds."""
+        cutoff = time.time() - max_age
+        removed = 0
+        try:
+            entries = list(Path(root_dir).iterdir())
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_dir() and not entry.is_symlink() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Failed to remove expired artifacts {entry}: {e}")
+        if removed:
+            logger.info(f"Removed {removed} expired artifact directories from {root_dir}")
+        return removed
+
+    def cleanup(self):
+        """Delete every artifact of this session."""
+        with self._lock:
+            self._stored.clear()
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_chars > 0
+
+    def _path(self, handle: str) -> Path:
+        if not self._HANDLE_RE.match(handle):
+            raise ValueError(f"Invalid artifact handle '{handle}'")
+        return self.dir / f"{handle}.txt"
+
+    def put(self, content: str) -> str:
+        """Store `content` and return its handle."""
+        handle = "art_" + hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()[:12]
+        path = self._path(handle)
+        with self._lock:
+            if handle not in self._stored:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                path.write_text(content, encoding="utf-8", errors="replace")
+                self._stored.add(handle)
+        return handle
+
+    def spill(self, source: str, content: str) -> str:
+        """
+        Return `content` unchanged if it is small, otherwise store it and return
+        a short reference (handle, size, head/tail preview) for the history.
+        """
+        if not self.enabled or len(content) <= self.threshold_chars:
+            return content
+        try:
+            handle = self.put(content)
+        except Exception as e:
+            logger.warning(f"Failed to store artifact for {source}: {e}")
+            return content
+
+        lines = content.split("\n")
+        total_lines = len(lines)
+        head = "\n".join(lines[:self.PREVIEW_LINES])[:self.PREVIEW_CHARS]
+        parts = [
+            f"[Artifact {handle}: {source} output, {len(content)} chars, {total_lines} lines. "
+            f"Use read_artifact(handle=\"{handle}\", offset=..., limit=...) to page through it.]",
+            head
+        ]
+        if total_lines > 2 * self.PREVIEW_LINES:
+            tail_start = total_lines - self.PREVIEW_LINES
+            tail = "\n".join(lines[tail_start:])[-self.PREVIEW_CHARS:]
+            parts.append(f"... [lines {self.PREVIEW_LINES}-{tail_start - 1} omitted] ...")
+            parts.append(tail)
+        elif total_lines > self.PREVIEW_LINES:
+            parts.append("... [truncated] ...")
+        else:
+            parts.append(f"... [{len(content) - len(head)} more chars] ...")
+        return "\n".join(parts)
+
+    def read(self, handle: str, offset: int = 0, limit: int = 200, column: int = 0) -> str:
+        """
+        Return lines [offset, offset + limit) of an artifact (0-based), the
+        first one starting at character `column`. A line longer than a page is
+        returned in pieces; the footer gives the offset and column to continue.
+        """
+        path = self._path(handle)
+        if not path.exists():
+            return f"Error: Artifact {handle} not found"
+
+        offset = max(0, offset)
+        column = max(0, column)
+        limit = max(1, min(limit, self.MAX_PAGE_LINES))
+        # Keep each page below the spill threshold so pages never spill themselves
+        budget = max(100, self.threshold_chars - 200) if self.enabled else 0
+        page = []
+        used = 0
+        total_lines = 0
+        split_at = None  # Column where the last returned line was cut
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for i, line in enumerate(f):
+                total_lines = i + 1
+                if i < offset or len(page) >= limit:
+                    continue
+                line = line.rstrip("\n")
+                if i == offset:
+                    line = line[column:]
+                if budget and used + len(line) > budget:
+                    if not page:
+                        page.append(line[:budget])
+                        split_at = column + budget
+                    limit = len(page)  # Stop collecting, keep counting lines
+                    continue
+                page.append(line)
+                used += len(line) + 1
+
+        if offset >= total_lines:
+            return f"[Artifact {handle}: offset {offset} is past the end ({total_lines} lines)]"
+        if split_at is not None:
+            header = f"[Artifact {handle}: line {offset} of {total_lines}, chars {column}-{split_at - 1}]"
+            page.append(f"[line {offset} continues, next offset={offset} column={split_at}]")
+            return header + "\n" + "\n".join(page)
+        end = offset + len(page)
+        header = f"[Artifact {handle}: lines {offset}-{end - 1} of {total_lines}]"
+        if end < total_lines:
+            page.append(f"[{total_lines - end} more lines, next offset={end}]")
+        return header + "\n" + "\n".join(page)
@@ -4,3 +4,14 @@ from typing import Any
 # Context variable to hold the TaskManager instance for the current execution context
 # This allows tools to access the TaskManager without direct reference to the Agent
 current_task_manager = ContextVar("current_task_manager", default=None)
+
+# Callable receiving progress lines of long-running tools (e.g. run_plan) as they
+# happen, before the tool returns; set by the front end that displays them
+current_progress = ContextVar("current_progress", default=None)
+
+# ArtifactStore of the running agent session (large tool outputs are spilled there)
+current_artifact_store = ContextVar("current_artifact_store", default=None)
+
+# Token usage accumulator ({"requests", "prompt_tokens", "completion_tokens"}) of the
+# current unit of work, e.g. one batch item. Sub-agents inherit the same dict.
+current_token_usage = ContextVar("current_token_usage", default=None)
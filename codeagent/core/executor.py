@@ -1,9 +1,14 @@
-import json
+import asyncio
 import logging
-import inspect
-from typing import Dict, Any, List, Optional, get_type_hints
-from pydantic import BaseModel
-from codeagent.tools.registry import ToolRegistry
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+from codeagent.tools.registry import ToolRegistry, ToolEntry
+from codeagent.core.tool_cache import ToolResultCache
+from codeagent.core.context import current_artifact_store
+from codeagent.core.trace import trace_span
+from codeagent.core.metrics import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -12,70 +17,209 @@ class ToolExecutor:
     """
     Executes tool calls requested by the LLM.
     Supports both sync and async tools.
+
+    Read-only tools (see `ToolRegistry.register`) are executed concurrently,
+    while side-effecting tools (e.g. write_file, run_shell) act as ordering
+    barriers: everything before them finishes first, nothing after them starts early.
+
+    Results of idempotent tools are served from a shared `ToolResultCache`,
+    which side-effecting tools invalidate. Outputs above the threshold of the
+    active `ArtifactStore` are replaced by a handle and a preview.
+
+    Invalidation listeners (e.g. the search index) are told which paths a
+    side-effecting tool changed, or None when its effects are unknown.
     """
-    
-    @staticmethod
-    async def execute(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Upper bound for sync read-only tools running in parallel threads
+    MAX_WORKERS = 8
+    _thread_pool: Optional[ThreadPoolExecutor] = None
+    cache = ToolResultCache()
+    _invalidation_listeners: List[Callable[[Optional[List[str]]], None]] = []
+
+    @classmethod
+    def configure_cache(cls, max_bytes: int):
+        """Resize the result cache. A size of 0 disables caching."""
+        cls.cache.max_bytes = max_bytes
+        if not cls.cache.enabled:
+            cls.cache.clear()
+
+    @classmethod
+    def add_invalidation_listener(cls, listener: Callable[[Optional[List[str]]], None]):
+        """Call `listener(paths)` after every side-effecting tool call."""
+        if listener not in cls._invalidation_listeners:
+            cls._invalidation_listeners.append(listener)
+
+    @classmethod
+    def _notify_invalidation(cls, paths: Optional[List[str]]):
+        for listener in cls._invalidation_listeners:
+            try:
+                listener(paths)
+            except Exception as e:
+                logger.warning(f"Invalidation listener failed: {e}")
+
+    @classmethod
+    def _get_thread_pool(cls) -> ThreadPoolExecutor:
+        if cls._thread_pool is None:
+            cls._thread_pool = ThreadPoolExecutor(
+                max_workers=cls.MAX_WORKERS,
+                thread_name_prefix="codeagent-tool"
+            )
+        return cls._thread_pool
+
+    @classmethod
+    def start(cls, call: Dict[str, Any]) -> "asyncio.Task":
+        """
+        Start a read-only tool call in the background, e.g. while the LLM is still
+        streaming the rest of its response. Pass the task to `execute(started=...)`.
+        """
+        return asyncio.ensure_future(cls._execute_one(call, offload=True))
+
+    @classmethod
+    async def execute(
+        cls,
+        tool_calls: List[Dict[str, Any]],
+        concurrent: bool = True,
+        started: Optional[Dict[int, "asyncio.Task"]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Execute a list of tool calls and return results.
         Now supports async execution.
-        
+
+        Args:
+            tool_calls: Tool calls in OpenAI format.
+            concurrent: Run consecutive read-only tools in parallel.
+            started: Tasks from `start()`, keyed by position in `tool_calls`.
+                They must be a prefix of read-only calls; their results are awaited
+                instead of executing the calls again.
+
         Returns:
-            List of result dictionaries (ready to be converted to ToolMessage).
+            List of result dictionaries (ready to be converted to ToolMessage),
+            in the same order as `tool_calls`.
         """
-        results = []
-        
-        for call in tool_calls:
-            call_id = call.get("id")
+        started = started or {}
+        if not concurrent:
+            return [
+                await started[i] if i in started else await cls._execute_one(call)
+                for i, call in enumerate(tool_calls)
+            ]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls)
+        batch: List[int] = []
+
+        async def flush_batch():
+            if not batch:
+                return
+            outputs = await asyncio.gather(*(
+                started[i] if i in started else cls._execute_one(tool_calls[i], offload=True)
+                for i in batch
+            ))
+            for i, output in zip(batch, outputs):
+                results[i] = output
+            batch.clear()
+
+        for index, call in enumerate(tool_calls):
             func_name = call.get("function", {}).get("name")
-            arguments_str = call.get("function", {}).get("arguments", "{}")
-            
-            try:
-                # 1. Get tool function
-                func = ToolRegistry.get_tool(func_name)
-                if not func:
-                    raise ValueError(f"Tool '{func_name}' not found")
-                
-                # 2. Parse arguments
-                try:
-                    args_dict = json.loads(arguments_str)
-                except json.JSONDecodeError:
-                    raise ValueError(f"Invalid JSON arguments: {arguments_str}")
-                
-                # 3. Convert to Pydantic model if needed
-                type_hints = {}
-                try:
-                    type_hints = get_type_hints(func)
-                except Exception:
-                    pass
-
-                first_param_type = next((t for n, t in type_hints.items() if n != "return"), None)
-                
-                # Prepare arguments
-                if first_param_type and issubclass(first_param_type, BaseModel):
-                    tool_args = first_param_type(**args_dict)
-                    call_args = (tool_args,)
-                    call_kwargs = {}
-                else:
-                    call_args = ()
-                    call_kwargs = args_dict
-
-                # 4. Execute Function (Async or Sync)
-                if inspect.iscoroutinefunction(func):
-                    output = await func(*call_args, **call_kwargs)
-                else:
-                    output = func(*call_args, **call_kwargs)
-                
-                result_content = str(output)
-                
-            except Exception as e:
-                logger.error(f"Error executing tool {func_name}: {e}")
-                result_content = f"Error: {str(e)}"
-            
-            results.append({
-                "tool_call_id": call_id,
-                "name": func_name,
-                "content": result_content
-            })
-            
+            if index in started or ToolRegistry.is_read_only(func_name):
+                batch.append(index)
+                continue
+            # Barrier: finish pending reads, then run the side-effecting tool alone
+            await flush_batch()
+            results[index] = await cls._execute_one(call)
+
+        await flush_batch()
         return results
+
+    @classmethod
+    async def _execute_one(cls, call: Dict[str, Any], offload: bool = False) -> Dict[str, Any]:
+        """
+        Execute a single tool call.
+
+        Args:
+            call: Tool call in OpenAI format.
+            offload: Run sync tools on the shared thread pool instead of the event loop.
+        """
+        call_id = call.get("id")
+        func_name = call.get("function", {}).get("name")
+        arguments_str = call.get("function", {}).get("arguments", "{}")
+
+        try:
+            # 1. Look up the compiled dispatch entry
+            entry = ToolRegistry.get_entry(func_name)
+            if not entry:
+                raise ValueError(f"Tool '{func_name}' not found")
+
+            # 2. Parse and validate arguments
+            call_args, call_kwargs = entry.validate(arguments_str)
+
+            # 3. Execute Function (Async or Sync)
+            try:
+                with trace_span("tool", tool=func_name, call_id=call_id, offload=offload), \
+                        metrics.timer("tool_duration_seconds", tool=func_name):
+                    if entry.is_async:
+                        output = await entry.func(*call_args, **call_kwargs)
+                    else:
+                        invoke = functools.partial(cls._invoke_sync, entry, call_args, call_kwargs)
+                        if offload:
+                            # Copy the context so tools still see ContextVars (e.g. current_task_manager)
+                            ctx = contextvars.copy_context()
+                            loop = asyncio.get_running_loop()
+                            output = await loop.run_in_executor(cls._get_thread_pool(), ctx.run, invoke)
+                        else:
+                            output = invoke()
+            finally:
+                if not entry.read_only:
+                    cls._invalidate_cache(entry, call_args, call_kwargs)
+
+            result_content = str(output)
+            store = current_artifact_store.get()
+            if store:
+                result_content = store.spill(func_name, result_content)
+            metrics.inc("tool_calls_total", tool=func_name, status="ok")
+
+        except Exception as e:
+            logger.error(f"Error executing tool {func_name}: {e}")
+            result_content = f"Error: {str(e)}"
+            metrics.inc("tool_calls_total", tool=func_name, status="error")
+
+        return {
+            "tool_call_id": call_id,
+            "name": func_name,
+            "content": result_content
+        }
+
+    @classmethod
+    def _invoke_sync(cls, entry: ToolEntry, call_args: tuple, call_kwargs: Dict[str, Any]) -> Any:
+        """Call a sync tool, going through the result cache for idempotent tools."""
+        if not (entry.idempotent and cls.cache.enabled):
+            return entry.func(*call_args, **call_kwargs)
+
+        tool_args = call_args[0] if call_args else call_kwargs
+        paths = entry.cache_paths(tool_args) if entry.cache_paths else []
+        key = cls.cache.make_key(entry.name, call_args, call_kwargs)
+        # Stamps are taken before running, so a concurrent change makes the entry stale
+        stamps = cls.cache.snapshot(paths, recursive=entry.cache_recursive)
+        cached = cls.cache.get(key, stamps)
+        if cached is not None:
+            return cached
+
+        output = str(entry.func(*call_args, **call_kwargs))
+        cls.cache.put(key, output, paths, stamps)
+        return output
+
+    @classmethod
+    def _invalidate_cache(cls, entry: ToolEntry, call_args: tuple, call_kwargs: Dict[str, Any]):
+        """Drop cached results a side-effecting tool may have made stale."""
+        if entry.invalidates is None:
+            # Unknown side effects (e.g. run_shell): flush conservatively
+            cls.cache.clear()
+            cls._notify_invalidation(None)
+            return
+        tool_args = call_args[0] if call_args else call_kwargs
+        try:
+            paths = entry.invalidates(tool_args)
+        except Exception:
+            cls.cache.clear()
+            cls._notify_invalidation(None)
+            return
+        if paths:
+            cls.cache.invalidate_paths(paths)
+            cls._notify_invalidation(paths)
@@ -0,0 +1,205 @@
+import os
+import re
+import time
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from codeagent.core.ignore import IgnoreRules, translate_glob
+
+# Directories never descended into (same defaults as grep_search)
+DEFAULT_EXCLUDE_DIRS = frozenset((".git", ".venv", "__pycache__", "node_modules"))
+# A directory modified this close to its scan may change again within the
+# same mtime tick (coarse filesystem timestamps); such listings are not reused
+RACY_WINDOW_NS = 2_000_000_000
+MAX_DIRS = 100_000
+
+DIR, LINK_DIR, FILE = "dir", "link_dir", "file"
+
+class TreeEntry(NamedTuple):
+    name: str
+    kind: str  # DIR, LINK_DIR (symlink to a directory, not descended) or FILE
+
+    @property
+    def is_dir(self) -> bool:
+        return self.kind != FILE
+
+class _Listing:
+    __slots__ = ("mtime_ns", "entries", "trusted", "visible")
+
+    def __init__(self, mtime_ns: int, entries: Tuple[TreeEntry, ...], trusted: bool):
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.trusted = trusted
+        # (walk filter key, entries left after exclusion and ignore rules)
+        self.visible: Optional[Tuple[tuple, Tuple[TreeEntry, ...]]] = None
+
+class FileTree:
+    """
+    Cached snapshot of the workspace directory tree, shared by `list_dir`,
+    `glob_search` and `@file` resolution.
+
+    Directory listings are read with `os.scandir` once and reused while the
+    directory's mtime is unchanged (adding, removing or renaming an entry
+    updates it), so revalidating a tree costs one stat per directory instead
+    of a scandir plus a stat per entry. Walks prune `DEFAULT_EXCLUDE_DIRS` and
+    paths ignored by `.gitignore`, and `glob` yields matches lazily in walk
+    order so callers can stop at their result limit.
+    """
+    def __init__(self, max_dirs: int = MAX_DIRS):
+        self.max_dirs = max_dirs
+        self._listings: Dict[str, _Listing] = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.reuses = 0
+
+    def listdir(self, path: str) -> Tuple[TreeEntry, ...]:
+        """
+        Entries of directory `path`, sorted by name.
+
+        Raises:
+            OSError: If `path` is not a readable directory.
+        """
+        return self._listing(os.path.abspath(path)).entries
+
+    def _listing(self, abs_path: str) -> _Listing:
+        st = os.stat(abs_path)
+        listing = self._listings.get(abs_path)
+        if listing is not None and listing.trusted and listing.mtime_ns == st.st_mtime_ns:
+            self.reuses += 1
+            return listing
+        scanned_at = time.time_ns()
+        entries = []
+        with os.scandir(abs_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        kind = DIR
+                    elif entry.is_dir():
+                        kind = LINK_DIR
+                    else:
+                        kind = FILE
+                except OSError:
+                    continue
+                entries.append(TreeEntry(entry.name, kind))
+        entries.sort()
+        listing = _Listing(st.st_mtime_ns, tuple(entries), st.st_mtime_ns < scanned_at - RACY_WINDOW_NS)
+        with self._lock:
+            if len(self._listings) >= self.max_dirs:
+                self._listings.clear()
+            self._listings[abs_path] = listing
+            self.scans += 1
+        return listing
+
+    def walk(
+        self,
+        root: str,
+        exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS,
+        use_gitignore: bool = True,
+        max_depth: Optional[int] = None,
+        prune_hidden: bool = False
+    ) -> Iterator[Tuple[str, TreeEntry]]:
+        """
+        Yield (path relative to `root` with '/' separators, entry) for everything
+        under `root`, at most `max_depth` levels deep: the entries of a directory
+        sorted by name, then the contents of its subdirectories the same way.
+        Excluded and ignored directories (and hidden ones with `prune_hidden`,
+        like grep_search) are pruned and ignored files skipped.
+        """
+        for rel_dir, _, entries in self.walk_dirs(root, exclude_dirs, use_gitignore, max_depth, prune_hidden):
+            for entry in entries:
+                yield rel_dir + entry.name, entry
+
+    def walk_dirs(
+        self,
+        root: str,
+        exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS,
+        use_gitignore: bool = True,
+        max_depth: Optional[int] = None,
+        prune_hidden: bool = False
+    ) -> Iterator[Tuple[str, int, Tuple[TreeEntry, ...]]]:
+        """
+        The directories `walk` visits, in the same order, as (path relative to
+        `root` ending in '/', "" for `root` itself; directory mtime_ns; entries
+        left after exclusion and ignore rules). Costs one stat per directory.
+        """
+        exclude = frozenset(exclude_dirs)
+        abs_root = os.path.abspath(root)
+        rules = IgnoreRules.for_root(abs_root) if use_gitignore else IgnoreRules()
+        stack: List[Tuple[str, str, IgnoreRules, int]] = [("", abs_root, rules, 1)]
+        while stack:
+            rel_dir, abs_dir, rules, depth = stack.pop()
+            try:
+                listing = self._listing(abs_dir)
+            except OSError:
+                continue
+            # The root's own .gitignore is part of IgnoreRules.for_root
+            if use_gitignore and rel_dir and any(e.name == IgnoreRules.FILENAME for e in listing.entries):
+                rules = rules.child(abs_dir)
+            # Filtering is reused while the listing and the rules that apply are unchanged
+            key = (exclude, prune_hidden, rules.signature)
+            visible = listing.visible
+            if visible is None or visible[0] != key:
+                prefix = os.path.join(abs_dir, "")
+                visible = listing.visible = (key, tuple(
+                    entry for entry in listing.entries
+                    if not (entry.kind == DIR and (entry.name in exclude or prune_hidden and entry.name.startswith(".")))
+                    and not rules.is_ignored(prefix + entry.name, entry.is_dir, entry.name)
+                ))
+            yield rel_dir, listing.mtime_ns, visible[1]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for entry in reversed(visible[1]):
+                if entry.kind == DIR:
+                    stack.append((rel_dir + entry.name + "/", os.path.join(abs_dir, entry.name), rules, depth + 1))
+
+    def glob(
+        self,
+        root: str,
+        pattern: str,
+        files_only: bool = False,
+        exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS
+    ) -> Iterator[str]:
+        """
+        Lazily yield paths under `root` matching the glob `pattern` (`*`, `?`,
+        `[...]`, `**` for any number of directories), in walk order, as
+        `root` joined with the match. A literal leading part of the pattern
+        (e.g. `src/pkg` in `src/pkg/**/*.py`) is looked up directly.
+        """
+        base, parts = self._split_glob(root, pattern)
+        if not parts:
+            return
+        flags = re.DOTALL | (re.IGNORECASE if os.name == "nt" else 0)
+        regex = re.compile(translate_glob("/".join(parts)) + r"\Z", flags)
+        # Without `**` nothing deeper than the pattern can match
+        max_depth = None if any("**" in part for part in parts) else len(parts)
+        for rel, entry in self.walk(base, exclude_dirs, max_depth=max_depth):
+            if files_only and entry.is_dir:
+                continue
+            if regex.match(rel):
+                yield os.path.join(base, *rel.split("/"))
+
+    def glob_base(self, root: str, pattern: str) -> str:
+        """The directory `glob(root, pattern)` walks: `root` plus the pattern's literal leading part."""
+        return self._split_glob(root, pattern)[0]
+
+    @staticmethod
+    def _split_glob(root: str, pattern: str) -> Tuple[str, List[str]]:
+        parts = [p for p in pattern.replace("\\", "/").split("/") if p not in ("", ".")]
+        literal = []
+        while len(parts) > 1 and not any(ch in parts[0] for ch in "*?["):
+            literal.append(parts.pop(0))
+        return os.path.join(root, *literal), parts
+
+    def fingerprint(self, root: str) -> int:
+        """
+        Hash of every name `walk(root)` yields: changes whenever an entry is
+        added, removed or renamed, or the ignore rules change what is walked.
+        """
+        return hash(tuple(self.walk(root)))
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+# Process-wide snapshot
+file_tree = FileTree()
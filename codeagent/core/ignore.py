@@ -0,0 +1,137 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+def translate_glob(pattern: str) -> str:
+    """Translate one gitignore glob to a regex body (`*`/`?` never cross `/`)."""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[^", i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+class IgnoreRule:
+    __slots__ = ("base", "source", "regex", "negate", "dir_only", "anchored")
+
+    def __init__(self, base: str, pattern: str):
+        self.base = base
+        self.source = pattern
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to the .gitignore directory
+        self.anchored = "/" in pattern
+        self.regex = re.compile(translate_glob(pattern.lstrip("/")) + r"\Z", re.DOTALL)
+
+    def matches(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return bool(self.regex.match(rel_path if self.anchored else name))
+
+class IgnoreRules:
+    """
+    `.gitignore` matcher for a directory walk.
+
+    Rules are immutable; `child(dir_path)` returns the rules for a
+    subdirectory, extended by its own `.gitignore` if it has one, so walkers
+    can carry them down the tree. The last matching rule wins and `!pattern`
+    re-includes. Supported: comments, negation, trailing `/` (directories
+    only), anchored patterns, `*`, `?`, `[...]` and `**`.
+    """
+    FILENAME = ".gitignore"
+
+    def __init__(self, rules: Tuple[IgnoreRule, ...] = ()):
+        self.rules = rules
+        # Equal for equal rule sets, e.g. to reuse decisions across walks
+        self.signature = tuple((rule.base, rule.source) for rule in rules)
+
+    @staticmethod
+    def parse(base: str, text: str) -> List[IgnoreRule]:
+        rules = []
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("\\#") or line.startswith("\\!"):
+                line = line[1:]
+            try:
+                rules.append(IgnoreRule(base, line))
+            except re.error:
+                continue  # Malformed pattern: git ignores it as well
+        return rules
+
+    def child(self, dir_path: str) -> "IgnoreRules":
+        """Rules for entries of `dir_path` (adds its .gitignore, if any)."""
+        try:
+            with open(os.path.join(dir_path, self.FILENAME), "r", encoding="utf-8", errors="ignore") as f:
+                added = self.parse(dir_path, f.read())
+        except OSError:
+            return self
+        return IgnoreRules(self.rules + tuple(added)) if added else self
+
+    @classmethod
+    def for_root(cls, root: str) -> "IgnoreRules":
+        """
+        Rules that apply inside `root`: the .gitignore files from the enclosing
+        git work tree (the nearest ancestor with `.git`) down to `root` itself.
+        """
+        root = os.path.abspath(root)
+        chain = [root]
+        current = root
+        while not os.path.exists(os.path.join(current, ".git")):
+            parent = os.path.dirname(current)
+            if parent == current:
+                chain = [root]  # Not in a git work tree: only root and below
+                break
+            current = parent
+            chain.append(current)
+        rules = cls()
+        for directory in reversed(chain):
+            rules = rules.child(directory)
+        return rules
+
+    def is_ignored(self, path: str, is_dir: bool, name: Optional[str] = None) -> bool:
+        if not self.rules:
+            return False
+        name = name or os.path.basename(path)
+        ignored = False
+        for rule in self.rules:
+            if ignored == (not rule.negate):
+                continue  # This rule could not change the outcome
+            rel = path[len(rule.base) + 1:]
+            if os.sep != "/":
+                rel = rel.replace(os.sep, "/")
+            if rule.matches(rel, name, is_dir):
+                ignored = not rule.negate
+        return ignored
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SessionJournal:
+    """
+    Append-only JSONL journal of a Session.
+
+    Record types:
+      - meta:       written once when the journal is created (session id, system prompt, layout)
+      - message:    one appended history message with its token count
+      - checkpoint: the complete history, written whenever it changes in place
+                    (compression, inserted context, clear)
+
+    Every record is flushed to the OS right away, so a crashed process loses
+    nothing; fsync is batched (every `FSYNC_EVERY` records or `FSYNC_INTERVAL`
+    seconds) to survive machine crashes without paying a disk flush per message.
+    Loading only parses records from the last checkpoint on.
+    """
+    FSYNC_EVERY = 64
+    FSYNC_INTERVAL = 1.0
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")  # Terminate a torn final record so appends stay parseable
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def path_for(directory: str, session_id: str) -> Path:
+        return Path(directory) / f"{session_id}.jsonl"
+
+    def write(self, record: Dict[str, Any]):
+        try:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.FSYNC_EVERY or time.monotonic() - self._last_sync >= self.FSYNC_INTERVAL:
+                self.sync()
+        except Exception as e:
+            logger.warning(f"Failed to write session journal {self.path}: {e}")
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self._file.flush()
+            self.sync()
+        finally:
+            self._file.close()
+
+    @staticmethod
+    def load(path: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Read a journal.
+
+        Returns:
+            (meta, last checkpoint or None, message records after it)
+        Raises:
+            FileNotFoundError: If the journal does not exist.
+            ValueError: If it has no meta record.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if not lines:
+            raise ValueError(f"Session journal {path} is empty")
+        meta = json.loads(lines[0])
+        if meta.get("type") != "meta":
+            raise ValueError(f"Session journal {path} has no meta record")
+
+        # Find the last complete checkpoint without parsing everything before it
+        checkpoint = None
+        start = 1
+        for i in range(len(lines) - 1, 0, -1):
+            if lines[i].startswith('{"type":"checkpoint"'):
+                try:
+                    checkpoint = json.loads(lines[i])
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash, use an earlier one
+                start = i + 1
+                break
+
+        tail = lines[start:]
+        try:
+            # One parser call for the whole tail is much faster than one per line
+            parsed = json.loads("[" + ",".join(line.rstrip("\n") for line in tail if line.strip()) + "]")
+        except json.JSONDecodeError:
+            parsed = []
+            for line in tail:
+                try:
+                    parsed.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping torn record in session journal {path}")
+        records = [record for record in parsed if record.get("type") == "message"]
+        return meta, checkpoint, records
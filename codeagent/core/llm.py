@@ -1,67 +1,284 @@
-from typing import List, Optional, Dict, Any
-from openai import AsyncOpenAI
+from typing import List, Optional, Dict, Any, AsyncGenerator, Tuple, Union
 from tenacity import retry, stop_after_attempt, wait_exponential
 import json
+import time
 import logging
-import datetime
 from pathlib import Path
 
 from codeagent.config import Settings
 from codeagent.core.message import Message
+from codeagent.core.llm_cache import ResponseCache
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.core.trace import TraceSink
+from codeagent.core.metrics import metrics
+from codeagent.core.context import current_token_usage
 
 logger = logging.getLogger(__name__)
 
+def _count_retry(retry_state):
+    """tenacity hook: called before sleeping between attempts."""
+    metrics.inc("llm_retries_total")
+
+class ToolCallReady:
+    """
+    Stream event emitted by `LLMClient.chat_stream` as soon as a tool call's
+    arguments are complete, before the rest of the completion has arrived.
+    `index` is the call's position in the final `tool_calls` list.
+    """
+    def __init__(self, index: int, call: Dict[str, Any]):
+        self.index = index
+        self.call = call
+
+    @property
+    def name(self) -> str:
+        return self.call["function"]["name"]
+
+class ToolCallAssembler:
+    """
+    Incrementally assembles streamed tool-call deltas into complete tool calls.
+    Deltas for the same call share an `index`; `id` and `name` arrive once,
+    `arguments` arrives in fragments that have to be concatenated.
+    """
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, Any]] = {}
+        self._complete: set = set()
+        self._next_ready = 0
+
+    def add(self, delta_tool_calls: List[Any]) -> List[ToolCallReady]:
+        """
+        Merge deltas and return the tool calls that became complete, in index order.
+        A call is complete once its arguments parse as a JSON object (a complete
+        object cannot be extended further) or once a later call has started.
+        """
+        for delta in delta_tool_calls:
+            call = self._calls.setdefault(delta.index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if delta.id:
+                call["id"] = delta.id
+            if delta.function:
+                if delta.function.name:
+                    call["function"]["name"] += delta.function.name
+                if delta.function.arguments:
+                    call["function"]["arguments"] += delta.function.arguments
+
+            # A new call starting means every earlier one is finished
+            self._complete.update(i for i in self._calls if i < delta.index)
+            if delta.index not in self._complete and self._arguments_complete(call):
+                self._complete.add(delta.index)
+        return self._drain_ready()
+
+    def finish(self) -> List[ToolCallReady]:
+        """Mark every remaining call complete (end of stream)."""
+        self._complete.update(self._calls)
+        return self._drain_ready()
+
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """All tool calls seen so far, in index order."""
+        return [self._calls[i] for i in sorted(self._calls)]
+
+    @staticmethod
+    def _arguments_complete(call: Dict[str, Any]) -> bool:
+        arguments = call["function"]["arguments"]
+        # Cheap pre-check so partial arguments are not re-parsed on every fragment
+        if not call["id"] or not arguments.rstrip().endswith("}"):
+            return False
+        try:
+            return isinstance(json.loads(arguments), dict)
+        except json.JSONDecodeError:
+            return False
+
+    def _drain_ready(self) -> List[ToolCallReady]:
+        ready = []
+        ordered = sorted(self._calls)
+        while self._next_ready < len(ordered) and ordered[self._next_ready] in self._complete:
+            ready.append(ToolCallReady(self._next_ready, self._calls[ordered[self._next_ready]]))
+            self._next_ready += 1
+        return ready
+
 class LLMClient:
     """
     Wrapper around OpenAI compatible API.
     """
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_base_url
-        )
+        # Shared per (base_url, api_key) so sub-agents reuse warm connections
+        self.client = LLMClientPool.get(settings.openai_base_url, settings.openai_api_key)
         self.model = settings.openai_model
         
-        # Setup trace logging if debug mode is on
-        self.trace_file = None
+        # Setup trace logging if debug mode is on (written by a background thread)
+        self.tracer = None
         if settings.debug_mode:
-            log_dir = Path("logs")
-            log_dir.mkdir(exist_ok=True)
-            self.trace_file = log_dir / "trace.log"
+            self.tracer = TraceSink.open(
+                str(Path("logs") / "trace.log"),
+                max_bytes=settings.trace_max_bytes,
+                backup_count=settings.trace_backup_count
+            )
+
+        # Optional on-disk cache of deterministic (temperature 0) responses
+        self.response_cache = None
+        if settings.llm_cache_enabled:
+            self.response_cache = ResponseCache(settings.llm_cache_dir, settings.llm_cache_max_bytes)
 
     def _log_trace(self, event: str, data: Any):
-        """Log trace data to file if debug mode is enabled."""
-        if not self.trace_file:
+        """Queue trace data for the trace log if debug mode is enabled."""
+        if self.tracer:
+            self.tracer.emit(event, data)
+
+    def _build_params(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict]]) -> Dict[str, Any]:
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.0  # Deterministic for code generation
+        }
+        if tools:
+            params["tools"] = tools
+            params["tool_choice"] = "auto"
+        return params
+
+    @staticmethod
+    def _record_usage_metrics(usage: Any, mode: str):
+        totals = current_token_usage.get()
+        if totals is not None:
+            totals["requests"] = totals.get("requests", 0) + 1
+        if usage is None:
+            return
+        for field in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                metrics.inc(f"llm_{field}_total", value, mode=mode)
+                if totals is not None:
+                    totals[field] = totals.get(field, 0) + value
+
+    def _record_usage_sample(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict]], usage: Any):
+        """Append a request/usage pair for tokenizer calibration (benchmarks/calibrate_tokenizer.py)."""
+        if not self.settings.token_samples_file or usage is None:
             return
-            
         try:
-            timestamp = datetime.datetime.now().isoformat()
-            entry = {
-                "timestamp": timestamp,
-                "event": event,
-                "data": data
+            sample = {
+                "model": self.model,
+                "messages": messages,
+                "tools": tools,
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens
             }
-            with open(self.trace_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            with open(self.settings.token_samples_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(sample, ensure_ascii=False) + "\n")
         except Exception as e:
-            logger.warning(f"Failed to write trace log: {e}")
+            logger.warning(f"Failed to record token usage sample: {e}")
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def _cache_lookup(self, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[Message]]:
+        """Return (cache key, cached response). The key is None when caching is disabled."""
+        if not self.response_cache:
+            return None, None
+        key = ResponseCache.make_key({**params, "base_url": self.settings.openai_base_url})
+        data = self.response_cache.get(key)
+        if data is None:
+            return key, None
+        self._log_trace("LLM_CACHE_HIT", {"key": key})
+        metrics.inc("llm_cache_hits_total")
+        return key, Message.assistant(content=data.get("content"), tool_calls=data.get("tool_calls"))
+
+    def _cache_store(self, key: Optional[str], message: Message):
+        if key and self.response_cache:
+            self.response_cache.put(key, {"content": message.content, "tool_calls": message.tool_calls})
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), before_sleep=_count_retry)
+    async def _open_stream(self, params: Dict[str, Any]):
+        """Open a streaming completion. Only connection setup is retried, never a half-read stream."""
+        return await self.client.chat.completions.create(**params, stream=True)
+
+    async def chat_stream(
+        self, messages: List[Dict[str, Any]], tools: Optional[List[Dict]] = None
+    ) -> AsyncGenerator[Union[str, ToolCallReady, Message], None]:
+        """
+        Send a streaming chat completion request.
+
+        Yields:
+            str: Text deltas as they arrive.
+            ToolCallReady: Each tool call, in order, as soon as its arguments are complete.
+            Message: The fully assembled assistant message, as the last item.
+        """
+        params = self._build_params(messages, tools)
+        if self.settings.token_samples_file:
+            # Usage is only reported for streams when explicitly requested
+            params["stream_options"] = {"include_usage": True}
+        self._log_trace("LLM_REQUEST", {
+            "model": self.model,
+            "stream": True,
+            "full_messages_count": len(messages),
+            "last_message": messages[-1] if messages else None
+        })
+
+        try:
+            cache_key, cached = self._cache_lookup(params)
+            if cached:
+                if cached.content:
+                    yield cached.content
+                for index, call in enumerate(cached.tool_calls or []):
+                    yield ToolCallReady(index, call)
+                yield cached
+                return
+
+            started = time.perf_counter()
+            stream = await self._open_stream(params)
+            content_parts: List[str] = []
+            assembler = ToolCallAssembler()
+
+            usage = None
+            first_token = True
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta is None:
+                    continue
+                if first_token and (delta.content or delta.tool_calls):
+                    first_token = False
+                    metrics.observe("llm_first_token_seconds", time.perf_counter() - started)
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield delta.content
+                if delta.tool_calls:
+                    for ready in assembler.add(delta.tool_calls):
+                        yield ready
+
+            for ready in assembler.finish():
+                yield ready
+
+            content = "".join(content_parts) or None
+            tool_calls = assembler.tool_calls() or None
+
+            self._log_trace("LLM_RESPONSE", {
+                "content": content,
+                "tool_calls": tool_calls
+            })
+
+            metrics.observe("llm_request_seconds", time.perf_counter() - started, mode="stream")
+            metrics.inc("llm_requests_total", mode="stream")
+            self._record_usage_metrics(usage, "stream")
+            self._record_usage_sample(messages, tools, usage)
+
+            message = Message.assistant(content=content, tool_calls=tool_calls)
+            self._cache_store(cache_key, message)
+            yield message
+
+        except Exception as e:
+            self._log_trace("LLM_ERROR", str(e))
+            metrics.inc("llm_errors_total", mode="stream")
+            raise e
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), before_sleep=_count_retry)
     async def chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict]] = None) -> Message:
         """
         Send chat completion request.
         """
         try:
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.0  # Deterministic for code generation
-            }
-            
-            if tools:
-                params["tools"] = tools
-                params["tool_choice"] = "auto"
+            params = self._build_params(messages, tools)
 
             # Log Request
             self._log_trace("LLM_REQUEST", {
@@ -72,10 +289,19 @@ class LLMClient:
                 "last_message": messages[-1] if messages else None
             })
 
+            cache_key, cached = self._cache_lookup(params)
+            if cached:
+                return cached
+
+            started = time.perf_counter()
             response = await self.client.chat.completions.create(**params)
+            metrics.observe("llm_request_seconds", time.perf_counter() - started, mode="chat")
+            metrics.inc("llm_requests_total", mode="chat")
             
             choice = response.choices[0]
             msg = choice.message
+            self._record_usage_metrics(getattr(response, "usage", None), "chat")
+            self._record_usage_sample(messages, tools, getattr(response, "usage", None))
             
             # Log Response
             self._log_trace("LLM_RESPONSE", {
@@ -84,11 +310,14 @@ class LLMClient:
             })
             
             # Convert OpenAI Message to internal Message model
-            return Message.assistant(
+            message = Message.assistant(
                 content=msg.content,
                 tool_calls=[tc.model_dump() for tc in msg.tool_calls] if msg.tool_calls else None
             )
+            self._cache_store(cache_key, message)
+            return message
             
         except Exception as e:
             self._log_trace("LLM_ERROR", str(e))
+            metrics.inc("llm_errors_total", mode="chat")
             raise e
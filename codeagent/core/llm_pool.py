@@ -0,0 +1,61 @@
+import logging
+import threading
+from typing import Dict, Tuple, Optional
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+logger = logging.getLogger(__name__)
+
+class LLMClientPool:
+    """
+    Process-wide pool of `AsyncOpenAI` clients keyed by (base_url, api_key).
+
+    Every `LLMClient` (main agent and sub-agents) with the same endpoint and key
+    shares one client and therefore one keep-alive HTTP connection pool, so
+    sub-agents reuse warm connections instead of paying TCP/TLS setup.
+    Call `aclose()` on shutdown.
+    """
+    max_connections = 20
+    max_keepalive_connections = 10
+    keepalive_expiry = 30.0
+
+    _clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_connections: int, max_keepalive_connections: Optional[int] = None):
+        """Set the connection limits used for clients created from now on."""
+        cls.max_connections = max_connections
+        if max_keepalive_connections is not None:
+            cls.max_keepalive_connections = max_keepalive_connections
+
+    @classmethod
+    def _http_client(cls):
+        limits = httpx.Limits(
+            max_connections=cls.max_connections,
+            max_keepalive_connections=min(cls.max_keepalive_connections, cls.max_connections),
+            keepalive_expiry=cls.keepalive_expiry
+        )
+        return DefaultAsyncHttpxClient(limits=limits)
+
+    @classmethod
+    def get(cls, base_url: str, api_key: str) -> AsyncOpenAI:
+        key = (base_url, api_key)
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=cls._http_client())
+                cls._clients[key] = client
+            return client
+
+    @classmethod
+    async def aclose(cls):
+        """Close all pooled clients and their connections."""
+        with cls._lock:
+            clients = list(cls._clients.values())
+            cls._clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close LLM client: {e}")
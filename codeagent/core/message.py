@@ -1,5 +1,5 @@
 from typing import Optional, Literal, Dict, Any, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 RoleType = Literal["system", "user", "assistant", "tool"]
 
@@ -13,6 +13,9 @@ class Message(BaseModel):
     tool_call_id: Optional[str] = Field(None, description="ID of the tool call this message responds to")
     name: Optional[str] = Field(None, description="Name of the tool that generated this output")
 
+    # Estimated token cost, computed once by the Session that first accounts for it
+    _tokens: Optional[int] = PrivateAttr(default=None)
+
     def to_openai_format(self) -> Dict[str, Any]:
         """
         Convert to OpenAI API compatible dictionary format.
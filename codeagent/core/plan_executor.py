@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import AsyncGenerator, Awaitable, Callable, Dict
+
+from codeagent.core.task_manager import TaskManager, Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+class PlanExecutor:
+    """
+    Runs a TaskManager plan with independent tasks in parallel.
+
+    Every task whose dependencies are met is started (at most `max_concurrency`
+    at once) through `run_task`, normally a `submit_task` sub-agent. As soon as
+    one finishes, its result is fed back into the TaskManager and newly
+    unblocked tasks are started.
+    """
+    def __init__(
+        self,
+        task_manager: TaskManager,
+        run_task: Callable[[Task], Awaitable[str]],
+        max_concurrency: int = 3
+    ):
+        self.task_manager = task_manager
+        self.run_task = run_task
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def _run_one(self, task: Task) -> str:
+        try:
+            return await self.run_task(task)
+        except Exception as e:
+            logger.error(f"Task {task.id} failed: {e}")
+            return f"Error: {str(e)}"
+
+    async def run(self) -> AsyncGenerator[str, None]:
+        """
+        Execute the plan until no task can be started anymore.
+
+        Yields:
+            str: One progress line per task start and completion.
+        """
+        tm = self.task_manager
+        running: Dict[asyncio.Task, Task] = {}
+        total = len(tm.tasks)
+        finished = 0
+
+        try:
+            while True:
+                # Fill free slots from the frontier
+                for task in tm.get_ready_tasks():
+                    if len(running) >= self.max_concurrency:
+                        break
+                    tm.update_task(task.id, TaskStatus.IN_PROGRESS)
+                    running[asyncio.ensure_future(self._run_one(task))] = task
+                    yield f"[Plan] Task {task.id} started: {task.description}"
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    output = future.result()
+                    finished += 1
+                    # Same heuristic as the submit_task automation in Agent.run
+                    if output.startswith("Error"):
+                        tm.update_task(task.id, TaskStatus.FAILED, error=output)
+                        yield f"[Plan] Task {task.id} failed ({finished}/{total}): {output[:200]}"
+                    else:
+                        tm.update_task(task.id, TaskStatus.COMPLETED, result=output)
+                        yield f"[Plan] Task {task.id} completed ({finished}/{total})"
+        finally:
+            # Don't leave sub-agents running if the caller stopped early
+            for future, task in running.items():
+                future.cancel()
+                tm.update_task(task.id, TaskStatus.PENDING)
@@ -1,47 +1,105 @@
-from typing import List, Optional, TYPE_CHECKING
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 from codeagent.core.message import Message
+from codeagent.core.tokenizer import Tokenizer, get_tokenizer
+from codeagent.core.journal import SessionJournal
+from codeagent.core.trace import trace_span
+from codeagent.core.metrics import metrics
+from codeagent.core.file_tree import file_tree
 
 if TYPE_CHECKING:
     from codeagent.core.llm import LLMClient
 
+logger = logging.getLogger(__name__)
+
 class Session:
     """
     Manages the conversation history and context window.
+
+    In prefix-stable mode the history is laid out so that each request repeats
+    the previous one as a prefix, which lets providers reuse their prompt/KV cache:
+    injected context goes into fixed slots right after the system prompt (only
+    while nothing has been sent yet) and is appended otherwise.
+
+    With a `SessionJournal` attached, every appended message is journaled and
+    in-place changes (compression, inserted context, clear) write a checkpoint,
+    so the session can be restored with `Session.resume`.
     """
-    def __init__(self, system_prompt: str = "You are a helpful coding assistant."):
+    def __init__(
+        self,
+        system_prompt: str = "You are a helpful coding assistant.",
+        prefix_stable: bool = False,
+        tokenizer: Optional[Tokenizer] = None,
+        compression_concurrency: int = 4,
+        session_id: Optional[str] = None
+    ):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.journal: Optional[SessionJournal] = None
         self.system_prompt = system_prompt
+        self.tokenizer = tokenizer or get_tokenizer()
         self.history: List[Message] = []
+        # Running token totals, kept up to date on every history change
+        self._total_tokens = 0
+        self._role_tokens: Dict[str, int] = {}
         # Initialize with system prompt
-        self.history.append(Message.system(content=system_prompt))
+        self.add_message(Message.system(content=system_prompt))
         
         # Context Management
         self.max_tokens = 200000 # Default for high-capacity models (e.g. Claude 3.5 Sonnet)
         self.reserved_output_tokens = 8192
         self.compression_boundary = 0
+        # Watermarks as fractions of the effective window
+        self.compression_soft_ratio = 0.7  # Start summarizing in the background
+        self.compression_hard_ratio = 0.9  # Block the turn until compressed
+        # Hierarchical summaries: chunk size and how many chunks are summarized at once
+        self.compression_chunk_tokens = 16000
+        self.compression_concurrency = compression_concurrency
+        self._compression_task: Optional[asyncio.Future] = None
+        self._compression_snapshot: Optional[List[Message]] = None
+
+        # Prompt prefix stability
+        self.prefix_stable = prefix_stable
+        self.context_slots = 0  # Injected context messages at history[1:1 + context_slots]
+        self._last_request: Optional[List[Message]] = None
+        self.prefix_stats: Dict[str, int] = {"reused_messages": 0, "reused_tokens": 0, "prompt_tokens": 0}
 
     @property
     def effective_window(self) -> int:
         return self.max_tokens - self.reserved_output_tokens
 
     def _estimate_tokens(self, text: str) -> int:
-        """Rough estimation of tokens: 1 token ~= 4 chars"""
+        """Estimate tokens with the configured tokenizer (offline heuristic by default)"""
         if not text:
             return 0
-        return len(text) // 4
+        return self.tokenizer.count(text)
 
-    def _count_tokens(self) -> int:
-        """Count total tokens in history"""
-        total = 0
-        for msg in self.history:
-            content = msg.content or ""
+    def _message_tokens(self, msg: Message) -> int:
+        """Token cost of a message, computed once and cached on the message."""
+        if msg._tokens is None:
+            total = self._estimate_tokens(msg.content or "")
             # If tool_calls exist, they also consume tokens. Rough estimate.
             if msg.tool_calls:
                 for tc in msg.tool_calls:
                     # function name + args
                     total += self._estimate_tokens(str(tc))
-            
-            total += self._estimate_tokens(content)
-        return total
+            msg._tokens = total
+        return msg._tokens
+
+    def _account(self, msg: Message, sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) a message from the running totals."""
+        tokens = self._message_tokens(msg) * sign
+        self._total_tokens += tokens
+        self._role_tokens[msg.role] = self._role_tokens.get(msg.role, 0) + tokens
+
+    def _count_tokens(self) -> int:
+        """Count total tokens in history (maintained incrementally)"""
+        return self._total_tokens
+
+    def token_usage_by_role(self) -> Dict[str, int]:
+        """Estimated tokens in history per role (system/user/assistant/tool)."""
+        return dict(self._role_tokens)
 
     def token_usage_ratio(self) -> float:
         current = self._count_tokens()
@@ -52,15 +110,132 @@ class Session:
     def add_message(self, message: Message):
         """Add a message to the history."""
         self.history.append(message)
+        self._account(message)
+        if self.journal:
+            self.journal.write(self._message_record(message, "message"))
+
+    def _message_record(self, message: Message, record_type: Optional[str] = None) -> Dict[str, Any]:
+        record = {"type": record_type} if record_type else {}
+        record["message"] = message.to_openai_format()
+        record["tokens"] = self._message_tokens(message)
+        return record
+
+    def _checkpoint(self):
+        """Journal the complete history after an in-place change."""
+        if not self.journal:
+            return
+        self.journal.write({
+            "type": "checkpoint",
+            "history": [self._message_record(m) for m in self.history],
+            "compression_boundary": self.compression_boundary,
+            "context_slots": self.context_slots
+        })
+
+    def attach_journal(self, journal: SessionJournal):
+        """Start journaling this session (writes the meta record and a checkpoint)."""
+        self.journal = journal
+        journal.write({
+            "type": "meta",
+            "session_id": self.session_id,
+            "system_prompt": self.system_prompt,
+            "prefix_stable": self.prefix_stable,
+            "tokenizer": self.tokenizer.name
+        })
+        self._checkpoint()
+
+    @classmethod
+    def resume(cls, journal_path: str, **kwargs) -> "Session":
+        """
+        Restore a session from its journal and keep journaling to it.
+        Only the last checkpoint and the messages after it are replayed.
+        Extra keyword arguments are passed to the constructor (e.g. tokenizer).
+        """
+        meta, checkpoint, records = SessionJournal.load(journal_path)
+        session = cls(
+            system_prompt=meta["system_prompt"],
+            prefix_stable=meta.get("prefix_stable", False),
+            session_id=meta["session_id"],
+            **kwargs
+        )
+        # Stored token counts are only valid for the same tokenizer
+        reuse_tokens = meta.get("tokenizer") == session.tokenizer.name
+
+        entries = records
+        if checkpoint:
+            entries = checkpoint["history"] + records
+            session.history = []
+            session._total_tokens = 0
+            session._role_tokens = {}
+            session.compression_boundary = checkpoint.get("compression_boundary", 0)
+            session.context_slots = checkpoint.get("context_slots", 0)
+
+        # Same bookkeeping as _account, inlined for sessions with many messages
+        history = session.history
+        role_tokens = session._role_tokens
+        total = session._total_tokens
+        for entry in entries:
+            message = Message.model_validate(entry["message"])
+            tokens = entry.get("tokens") if reuse_tokens else None
+            if tokens is None:
+                tokens = session._message_tokens(message)
+            else:
+                message._tokens = tokens
+            history.append(message)
+            total += tokens
+            role_tokens[message.role] = role_tokens.get(message.role, 0) + tokens
+        session._total_tokens = total
+
+        session.journal = SessionJournal(journal_path)
+        return session
+
+    def close(self):
+        """Cancel background work and flush the journal."""
+        self.cancel_background_compression()
+        if self.journal:
+            self.journal.close()
         
     def get_messages(self) -> List[dict]:
-        """Get all messages in OpenAI format."""
+        """
+        Get all messages in OpenAI format.
+        Each call is treated as an outgoing request and updates `prefix_stats`.
+        """
+        self._track_prefix()
         return [msg.to_openai_format() for msg in self.history]
+
+    def _track_prefix(self):
+        """Measure how many leading tokens are unchanged since the previous request."""
+        previous = self._last_request or []
+        reused = 0
+        for old, new in zip(previous, self.history):
+            if old is not new:
+                break
+            reused += 1
+
+        # Only the (usually short) diverging tail of the previous request needs summing
+        previous_tokens = self.prefix_stats["prompt_tokens"] if previous else 0
+        reused_tokens = previous_tokens - sum(self._message_tokens(m) for m in previous[reused:])
+
+        self.prefix_stats = {
+            "reused_messages": reused,
+            "reused_tokens": reused_tokens,
+            "prompt_tokens": self._total_tokens
+        }
+        # reused / prompt over all requests is the prefix cache hit rate to expect
+        metrics.inc("prompt_tokens_total", self._total_tokens)
+        metrics.inc("prompt_prefix_reused_tokens_total", reused_tokens)
+        self._last_request = list(self.history)
     
     def clear(self):
         """Clear history but keep system prompt."""
-        self.history = [Message.system(content=self.system_prompt)]
+        self.history = []
+        self._total_tokens = 0
+        self._role_tokens = {}
+        self.add_message(Message.system(content=self.system_prompt))
         self.compression_boundary = 0
+        self.cancel_background_compression()
+        self.context_slots = 0
+        self._last_request = None
+        self._checkpoint()
     
     async def resolve_reference(self, input_text: str) -> str:
         import re
@@ -75,16 +250,23 @@ class Session:
         if not keywords:
             return ""
         
+        MAX_FILES = 10
         files = []
         seen = set()
         for kw in keywords:
             try:
                 if "/" in kw or "\\" in kw:
                     base = project_root
-                    matches = list(base.glob(kw)) if any(ch in kw for ch in "*?[]") else [base.joinpath(kw)]
+                    if any(ch in kw for ch in "*?[]"):
+                        matches = file_tree.glob(str(base), kw, files_only=True)
+                    else:
+                        matches = [base.joinpath(kw)]
                 else:
-                    matches = list(project_root.rglob(f"*{kw}*"))
-                for m in matches:
+                    # Lazy walk of the shared tree snapshot (skips .git, .venv, ignored paths)
+                    matches = file_tree.glob(str(project_root), f"**/*{kw}*", files_only=True)
+                for m in map(Path, matches):
+                    if len(files) >= MAX_FILES:
+                        break
                     if not m.exists() or not m.is_file():
                         continue
                     rp = m.resolve()
@@ -103,7 +285,6 @@ class Session:
         if not files:
             return "<Context><Warning>No files matched for references.</Warning></Context>"
         
-        MAX_FILES = 10
         MAX_LINES = 1000
         MAX_BYTES = 200 * 1024
         
@@ -130,34 +311,54 @@ class Session:
         parts.append("</Context>")
         return "\n".join(parts)
 
-    async def compress_context(self, llm_client: "LLMClient"):
-        """
-        Compress context when usage ratio is high.
-        Strategy: Summarize messages between compression_boundary and recent messages.
-        """
-        # Double check ratio to avoid unnecessary work if called speculatively
-        if self.token_usage_ratio() < 0.9:
-            return
-
-        # 1. Identify Range
+    def _compression_range(self) -> Optional[Tuple[int, int]]:
+        """History range [start, end) that compression may summarize, or None."""
         # Keep system prompt (index 0)
         # Keep recent N messages (e.g. last 10)
         preserve_count = 10
         
         # Calculate start index (after system prompt + previous boundary)
         # Initial boundary is 1 (after system prompt).
-        start_index = max(1, self.compression_boundary)
+        # Prefix-stable sessions also keep the injected context slots verbatim.
+        first_index = 1 + self.context_slots if self.prefix_stable else 1
+        start_index = max(first_index, self.compression_boundary)
         end_index = max(start_index, len(self.history) - preserve_count)
         
         # If there are not enough messages to compress
         if end_index <= start_index:
-            return
+            return None
+        return start_index, end_index
 
-        messages_to_summarize = self.history[start_index:end_index]
-        if not messages_to_summarize:
-            return
+    def _chunk_messages(self, messages: List[Message]) -> List[List[Message]]:
+        """
+        Split messages into chunks of at most `compression_chunk_tokens`.
+        An assistant message with tool_calls stays in the same chunk as its tool results.
+        """
+        # Group each tool-calling assistant message with the tool results that follow it
+        groups: List[List[Message]] = []
+        for msg in messages:
+            if msg.role == "tool" and groups and (groups[-1][0].tool_calls or groups[-1][0].role == "tool"):
+                groups[-1].append(msg)
+            else:
+                groups.append([msg])
+
+        chunks: List[List[Message]] = []
+        current: List[Message] = []
+        current_tokens = 0
+        for group in groups:
+            group_tokens = sum(self._message_tokens(m) for m in group)
+            if current and current_tokens + group_tokens > self.compression_chunk_tokens:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.extend(group)
+            current_tokens += group_tokens
+        if current:
+            chunks.append(current)
+        return chunks
 
-        # 2. Generate Summary
+    async def _summarize_chunk(self, messages_to_summarize: List[Message], llm_client: "LLMClient") -> str:
+        """Ask the LLM for a summary of one chunk of messages."""
         # We need to construct a prompt for the LLM to summarize these messages.
         summary_prompt = "Summarize the following conversation history, focusing on key decisions, tool outputs, and current state. Preserve file paths and critical code snippets."
         
@@ -171,28 +372,183 @@ class Session:
         summary_request = [
             {"role": "user", "content": f"{summary_prompt}\n\nConversation:\n{conversation_text}"}
         ]
+        summary_msg = await llm_client.chat(summary_request)
+        return summary_msg.content
+
+    async def _merge_summaries(self, summaries: List[str], llm_client: "LLMClient") -> str:
+        """Reduce the per-chunk summaries (in order) into one summary."""
+        merge_prompt = "Merge these consecutive partial summaries of one conversation into a single summary. Keep key decisions, file paths, critical code snippets and the latest state."
+        parts = "\n\n".join(f"Part {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+        try:
+            merged = await llm_client.chat([{"role": "user", "content": f"{merge_prompt}\n\n{parts}"}])
+            return merged.content
+        except Exception as e:
+            logger.warning(f"Merging context summaries failed, keeping them separate: {e}")
+            return "\n\n".join(summaries)
+
+    async def _summarize(self, messages_to_summarize: List[Message], llm_client: "LLMClient") -> Optional[List[Message]]:
+        """
+        Hierarchical (map-reduce) summary of `messages_to_summarize`.
+
+        The range is split into token-bounded chunks that are summarized
+        concurrently (at most `compression_concurrency` at once) and then merged.
+        Chunks whose summary fails keep their raw messages, so the result is the
+        list of messages that replaces the range, or None if nothing was summarized.
+        """
+        chunks = self._chunk_messages(messages_to_summarize)
+        semaphore = asyncio.Semaphore(max(1, self.compression_concurrency))
+
+        async def summarize(chunk: List[Message]) -> Optional[str]:
+            async with semaphore:
+                try:
+                    return await self._summarize_chunk(chunk, llm_client)
+                except Exception as e:
+                    logger.warning(f"Summarizing a history chunk failed: {e}")
+                    return None
+
+        with trace_span("compression", messages=len(messages_to_summarize), chunks=len(chunks)) as span, \
+                metrics.timer("compression_seconds"):
+            summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+            span["failed_chunks"] = sum(1 for summary in summaries if summary is None)
+            metrics.inc("compression_chunks_total", len(chunks))
+            metrics.inc("compression_chunk_failures_total", span["failed_chunks"])
+            merged = None
+            if all(summary is not None for summary in summaries):
+                merged = summaries[0] if len(summaries) == 1 else await self._merge_summaries(summaries, llm_client)
+
+        if merged is not None:
+            return [Message.system(content=f"<Previous Context Summary>: {merged}")]
+        if all(summary is None for summary in summaries):
+            return None
+
+        # Partial failure: summaries for the chunks that worked, raw messages for the rest
+        replacement: List[Message] = []
+        for chunk, summary in zip(chunks, summaries):
+            if summary is None:
+                replacement.extend(chunk)
+            else:
+                replacement.append(Message.system(content=f"<Previous Context Summary>: {summary}"))
+        return replacement
+
+    def _apply_summary(self, summarized: List[Message], replacement: List[Message]) -> bool:
+        """
+        Replace the `summarized` messages with `replacement` (summary messages,
+        plus the raw messages of chunks whose summary failed).
+        The messages are located by identity, so the swap is skipped (returns False)
+        if they are no longer a contiguous run of the history.
+        """
+        start_index = next((i for i, m in enumerate(self.history) if m is summarized[0]), None)
+        if start_index is None:
+            return False
+        end_index = start_index + len(summarized)
+        current = self.history[start_index:end_index]
+        if len(current) != len(summarized) or any(a is not b for a, b in zip(current, summarized)):
+            return False
+
+        # New history: 
+        # history[0:start_index] + [Summaries] + history[end_index:]
+        self.history = self.history[:start_index] + replacement + self.history[end_index:]
+        for msg in summarized:
+            self._account(msg, -1)
+        for msg in replacement:
+            self._account(msg)
         
+        # The next compression starts after the leading summaries; raw messages of
+        # chunks that failed to summarize stay after the boundary and are retried
+        summarized_ids = {id(m) for m in summarized}
+        done = next((i for i, m in enumerate(replacement) if id(m) in summarized_ids), len(replacement))
+        self.compression_boundary = start_index + done
+        self._checkpoint()
+        return True
+
+    def start_background_compression(self, llm_client: "LLMClient") -> bool:
+        """
+        Start summarizing the compressible range in a background task.
+        The result is swapped in later by `apply_background_compression`.
+        """
+        if self._compression_task is not None:
+            return False
+        compression_range = self._compression_range()
+        if compression_range is None:
+            return False
+        start_index, end_index = compression_range
+        self._compression_snapshot = self.history[start_index:end_index]
+        self._compression_task = asyncio.ensure_future(
+            self._summarize(self._compression_snapshot, llm_client)
+        )
+        return True
+
+    def apply_background_compression(self) -> bool:
+        """
+        Swap in a finished background summary. Must only be called at a turn
+        boundary (no request in flight), so the swap is atomic from the model's view.
+        """
+        task = self._compression_task
+        if task is None or not task.done():
+            return False
+        snapshot = self._compression_snapshot
+        self._compression_task = None
+        self._compression_snapshot = None
+
+        if task.cancelled():
+            return False
+        if task.exception() is not None:
+            logger.error("Background context compression failed", exc_info=task.exception())
+            return False
+        if task.result() is None:
+            return False
+        return self._apply_summary(snapshot, task.result())
+
+    def cancel_background_compression(self):
+        if self._compression_task is not None:
+            self._compression_task.cancel()
+        self._compression_task = None
+        self._compression_snapshot = None
+
+    async def maybe_compress(self, llm_client: "LLMClient"):
+        """
+        Turn-boundary hook called before every LLM request.
+        Applies a finished background summary, starts a new one above the soft
+        watermark and only blocks (compress_context) above the hard limit.
+        """
+        self.apply_background_compression()
+        ratio = self.token_usage_ratio()
+        if ratio >= self.compression_hard_ratio:
+            await self.compress_context(llm_client)
+        elif ratio >= self.compression_soft_ratio:
+            self.start_background_compression(llm_client)
+
+    async def compress_context(self, llm_client: "LLMClient"):
+        """
+        Compress context when usage ratio is high (blocking fallback).
+        Strategy: Summarize messages between compression_boundary and recent messages.
+        An in-flight background summary is awaited and used first.
+        """
+        # Double check ratio to avoid unnecessary work if called speculatively
+        if self.token_usage_ratio() < self.compression_hard_ratio:
+            return
+
+        if self._compression_task is not None:
+            await asyncio.wait([self._compression_task])
+            self.apply_background_compression()
+            if self.token_usage_ratio() < self.compression_hard_ratio:
+                return
+
+        # 1. Identify Range
+        compression_range = self._compression_range()
+        if compression_range is None:
+            return
+        start_index, end_index = compression_range
+        messages_to_summarize = self.history[start_index:end_index]
+
+        # 2. Generate Summary and 3. Replace
         try:
-            summary_msg = await llm_client.chat(summary_request)
-            summary_content = summary_msg.content
-            
-            # 3. Replace
-            # Create a System message with the summary
-            summary_message = Message.system(content=f"<Previous Context Summary>: {summary_content}")
-            
-            # New history: 
-            # history[0:start_index] + [New Summary] + history[end_index:]
-            new_history = self.history[:start_index] + [summary_message] + self.history[end_index:]
-            self.history = new_history
-            
-            # Update boundary
-            # The new summary is at index `start_index`.
-            # The next compression should start after this summary.
-            self.compression_boundary = start_index + 1
-            
+            replacement = await self._summarize(messages_to_summarize, llm_client)
+            if replacement is not None:
+                self._apply_summary(messages_to_summarize, replacement)
         except Exception as e:
-            # Log error but don't crash. In a real system, we might want to log this to trace.log
-            print(f"Error compressing context: {e}")
+            # Compression is best effort: keep the uncompressed history
+            logger.exception(f"Error compressing context: {e}")
 
     async def summarize_relevant_context(self) -> str:
         """
@@ -209,5 +565,21 @@ class Session:
     
     def inject_context(self, context_summary: str):
         """Inject a context summary from parent agent."""
-        # Add as a system message after the main system prompt
-        self.history.insert(1, Message.system(content=f"Context from Parent Agent:\n{context_summary}"))
+        message = Message.system(content=f"Context from Parent Agent:\n{context_summary}")
+        self._account(message)
+        if not self.prefix_stable:
+            # Add as a system message after the main system prompt
+            self.history.insert(1, message)
+            self._checkpoint()
+            return
+
+        if self._last_request is None:
+            # Nothing sent yet: fill the next fixed slot after the system prompt
+            self.history.insert(1 + self.context_slots, message)
+            self.context_slots += 1
+            self._checkpoint()
+        else:
+            # Inserting now would invalidate the provider's cached prefix
+            self.history.append(message)
+            if self.journal:
+                self.journal.write(self._message_record(message, "message"))
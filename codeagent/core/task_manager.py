@@ -1,4 +1,6 @@
-from typing import Dict, List, Optional
+import heapq
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
 from enum import Enum
 from pydantic import BaseModel, Field
 
@@ -17,14 +19,35 @@ class Task(BaseModel):
     result: Optional[str] = None # Summary of the result
     error: Optional[str] = None  # Error message if failed
 
+STATUS_ICONS = {
+    TaskStatus.PENDING: "[ ]",
+    TaskStatus.IN_PROGRESS: "[>]",
+    TaskStatus.COMPLETED: "[X]",
+    TaskStatus.FAILED: "[!]",
+    TaskStatus.SKIPPED: "[-]"
+}
+
 class TaskManager:
     """
     Manages the lifecycle and state of tasks in Plan Mode.
+
+    The plan is a DAG scheduled by indegree: every task keeps the number of
+    dependencies that are not COMPLETED yet, and PENDING tasks at zero sit in a
+    ready set. `update_task` adjusts only the dependents of the changed task,
+    and a FAILED or SKIPPED task marks all pending tasks depending on it as SKIPPED.
+    When it is retried (or completed) later, those tasks become PENDING again.
     """
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
-        # We don't strictly need an execution queue if we check dependencies dynamically,
-        # but a queue helps with ordering. For now, we'll just store tasks.
+        self._position: Dict[str, int] = {}  # Plan order, used to order the ready set
+        self._dependents: Dict[str, List[str]] = {}
+        self._indegree: Dict[str, int] = {}  # Dependencies not COMPLETED yet
+        self._ready: Set[str] = set()
+        self._ready_heap: List[Tuple[int, str]] = []  # (position, id), stale entries skipped lazily
+        self._auto_skipped: Set[str] = set()  # Skipped by `_skip_dependents`, not by the LLM
+        # Status bookkeeping for compact plan deltas
+        self._status_counts: Dict[TaskStatus, int] = {status: 0 for status in TaskStatus}
+        self._changed: Dict[str, None] = {}  # Ordered set of tasks changed since last shown
 
     def create_plan(self, tasks_data: List[dict]):
         """
@@ -32,11 +55,60 @@ class TaskManager:
         
         Args:
             tasks_data: List of dicts with keys: id, description, dependencies
+
+        Raises:
+            ValueError: On duplicate IDs, unknown dependencies or dependency cycles.
+                The previous plan is kept in that case.
         """
-        self.tasks = {}
+        tasks: Dict[str, Task] = {}
         for task_data in tasks_data:
             task = Task(**task_data)
-            self.tasks[task.id] = task
+            if task.id in tasks:
+                raise ValueError(f"Duplicate task ID: {task.id}")
+            tasks[task.id] = task
+
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in tasks}
+        for task in tasks.values():
+            for dep_id in task.dependencies:
+                if dep_id not in tasks:
+                    raise ValueError(f"Task {task.id} depends on unknown task {dep_id}")
+                dependents[dep_id].append(task.id)
+
+        self._check_acyclic(tasks, dependents)
+
+        self.tasks = tasks
+        self._position = {task_id: i for i, task_id in enumerate(tasks)}
+        self._dependents = dependents
+        self._indegree = {
+            task.id: sum(1 for dep_id in task.dependencies if tasks[dep_id].status != TaskStatus.COMPLETED)
+            for task in tasks.values()
+        }
+        self._ready = set()
+        self._ready_heap = []
+        self._auto_skipped = set()
+        self._status_counts = {status: 0 for status in TaskStatus}
+        for task in tasks.values():
+            self._status_counts[task.status] += 1
+        self._changed = {}
+        for task_id in tasks:
+            self._refresh_ready(task_id)
+
+    @staticmethod
+    def _check_acyclic(tasks: Dict[str, Task], dependents: Dict[str, List[str]]):
+        """Kahn's algorithm: every task must be reachable from the dependency-free ones."""
+        indegree = {task_id: len(task.dependencies) for task_id, task in tasks.items()}
+        queue = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+        visited = 0
+        while queue:
+            task_id = queue.popleft()
+            visited += 1
+            for dependent in dependents[task_id]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        if visited != len(tasks):
+            cyclic = sorted(task_id for task_id, degree in indegree.items() if degree > 0)
+            raise ValueError(f"Dependency cycle between tasks: {', '.join(cyclic)}")
 
     def get_task(self, task_id: str) -> Optional[Task]:
         return self.tasks.get(task_id)
@@ -46,20 +118,19 @@ class TaskManager:
         Get the next executable task (PENDING and all dependencies COMPLETED).
         Returns None if no task is ready or all are finished.
         """
-        # Simple iteration. In a large graph, we'd want a better algo.
-        for task_id, task in self.tasks.items():
-            if task.status == TaskStatus.PENDING:
-                # Check dependencies
-                dependencies_met = True
-                for dep_id in task.dependencies:
-                    dep_task = self.tasks.get(dep_id)
-                    if not dep_task or dep_task.status != TaskStatus.COMPLETED:
-                        dependencies_met = False
-                        break
-                
-                if dependencies_met:
-                    return task
-        return None
+        heap = self._ready_heap
+        while heap and heap[0][1] not in self._ready:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return self.tasks[heap[0][1]]
+
+    def get_ready_tasks(self) -> List[Task]:
+        """
+        Get every executable task (PENDING and all dependencies COMPLETED),
+        i.e. the current frontier of the plan, in plan order.
+        """
+        return [self.tasks[task_id] for task_id in sorted(self._ready, key=self._position.__getitem__)]
 
     def update_task(self, task_id: str, status: TaskStatus, result: str = None, error: str = None):
         """Update task status and result."""
@@ -67,28 +138,91 @@ class TaskManager:
         if not task:
             raise ValueError(f"Task {task_id} not found.")
         
-        task.status = status
+        old = task.status
+        self._auto_skipped.discard(task_id)
+        self._set_status(task, status)
         if result:
             task.result = result
         if error:
             task.error = error
 
+        blocked = (TaskStatus.FAILED, TaskStatus.SKIPPED)
+        if status in blocked:
+            self._skip_dependents(task)
+        elif old in blocked:
+            self._restore_dependents(task)
+
+    def _set_status(self, task: Task, status: TaskStatus):
+        """Change a status and update the indegrees of its dependents: O(out-degree)."""
+        old = task.status
+        task.status = status
+        if old == status:
+            return
+        self._status_counts[old] -= 1
+        self._status_counts[status] += 1
+        self._changed[task.id] = None
+
+        if status == TaskStatus.COMPLETED or old == TaskStatus.COMPLETED:
+            delta = -1 if status == TaskStatus.COMPLETED else 1
+            for dependent_id in self._dependents[task.id]:
+                self._indegree[dependent_id] += delta
+                self._refresh_ready(dependent_id)
+        self._refresh_ready(task.id)
+
+    def _refresh_ready(self, task_id: str):
+        if self.tasks[task_id].status == TaskStatus.PENDING and self._indegree[task_id] == 0:
+            if task_id not in self._ready:
+                self._ready.add(task_id)
+                heapq.heappush(self._ready_heap, (self._position[task_id], task_id))
+        else:
+            self._ready.discard(task_id)
+
+    def _skip_dependents(self, task: Task):
+        """Mark every pending task that (transitively) depends on `task` as SKIPPED."""
+        queue = deque([task.id])
+        while queue:
+            failed_id = queue.popleft()
+            for dependent_id in self._dependents[failed_id]:
+                dependent = self.tasks[dependent_id]
+                if dependent.status != TaskStatus.PENDING:
+                    continue
+                self._set_status(dependent, TaskStatus.SKIPPED)
+                dependent.error = f"Skipped: dependency {failed_id} did not complete"
+                self._auto_skipped.add(dependent_id)
+                queue.append(dependent_id)
+
+    def _restore_dependents(self, task: Task):
+        """
+        Undo `_skip_dependents` for `task`: tasks it skipped become PENDING
+        again once none of their dependencies is FAILED or SKIPPED.
+        """
+        blocked = (TaskStatus.FAILED, TaskStatus.SKIPPED)
+        queue = deque([task.id])
+        while queue:
+            restored_id = queue.popleft()
+            for dependent_id in self._dependents[restored_id]:
+                dependent = self.tasks[dependent_id]
+                if dependent_id not in self._auto_skipped:
+                    continue
+                if any(self.tasks[dep_id].status in blocked for dep_id in dependent.dependencies):
+                    continue  # Still skipped because of another dependency
+                self._auto_skipped.discard(dependent_id)
+                self._set_status(dependent, TaskStatus.PENDING)
+                dependent.error = None
+                queue.append(dependent_id)
+
     def get_plan_summary(self) -> str:
         """
         Generate a summary of the current plan status for the LLM.
+        Also marks every task as seen for `get_plan_delta`.
         """
+        self._changed.clear()
         if not self.tasks:
             return "No plan active."
             
         summary = "Current Task Plan:\n"
         for task_id, task in self.tasks.items():
-            status_icon = {
-                TaskStatus.PENDING: "[ ]",
-                TaskStatus.IN_PROGRESS: "[>]",
-                TaskStatus.COMPLETED: "[X]",
-                TaskStatus.FAILED: "[!]",
-                TaskStatus.SKIPPED: "[-]"
-            }.get(task.status, "[?]")
+            status_icon = STATUS_ICONS.get(task.status, "[?]")
             
             deps = f" (Deps: {', '.join(task.dependencies)})" if task.dependencies else ""
             summary += f"{status_icon} Task {task.id}: {task.description}{deps}\n"
@@ -98,3 +232,31 @@ class TaskManager:
                 summary += f"    Error: {task.error}\n"
                 
         return summary
+
+    def get_plan_counts(self) -> str:
+        counts = self._status_counts
+        return (
+            f"{counts[TaskStatus.COMPLETED]}/{len(self.tasks)} completed, "
+            f"{counts[TaskStatus.IN_PROGRESS]} in progress, {counts[TaskStatus.PENDING]} pending, "
+            f"{counts[TaskStatus.FAILED]} failed, {counts[TaskStatus.SKIPPED]} skipped"
+        )
+
+    def get_plan_delta(self) -> str:
+        """
+        Compact plan update for the LLM: only the tasks whose status changed
+        since the plan was last shown (full summary or delta), plus counts.
+        Keeps history growth per step proportional to what changed, not to the plan size.
+        """
+        if not self.tasks:
+            return "No plan active."
+
+        changed = [self.tasks[task_id] for task_id in self._changed]
+        self._changed.clear()
+        summary = f"Plan update ({self.get_plan_counts()}):\n"
+        if not changed:
+            return summary + "No task status changes.\n"
+        for task in changed:
+            summary += f"{STATUS_ICONS.get(task.status, '[?]')} Task {task.id}: {task.description}\n"
+            if task.error:
+                summary += f"    Error: {task.error[:200]}\n"
+        return summary
@@ -0,0 +1,138 @@
+import os
+import re
+import logging
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class Tokenizer(ABC):
+    """
+    Interface for token counting used by Session to track context usage.
+    """
+    name = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Number of tokens `text` takes up in a request."""
+
+class CharRatioTokenizer(Tokenizer):
+    """Legacy estimate: 1 token ~= 4 chars. Badly undercounts CJK text."""
+    name = "chars"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(text) // 4
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Offline estimator that weighs character classes separately.
+
+    BPE vocabularies encode one CJK character as roughly one token, a common
+    English word as one token, digits in groups of ~3 and most punctuation
+    as its own token; plain ASCII prose is ~4 chars per token. Counting each
+    class on its own keeps Chinese prompts from being undercounted 3-4x.
+    `scale` lets a calibration run (benchmarks/calibrate_tokenizer.py) correct
+    the overall bias for a specific provider.
+    """
+    name = "heuristic"
+
+    CJK_WEIGHT = 1.0
+    PUNCT_WEIGHT = 0.8
+    OTHER_WEIGHT = 1.0  # Non-CJK, non-ASCII characters (accents, Cyrillic, emoji...)
+
+    # CJK ideographs, kana, hangul, and CJK/full-width punctuation
+    _CJK_RE = re.compile(
+        r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+        r"\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+    )
+    _WORD_RE = re.compile(r"[A-Za-z]+")
+    _DIGITS_RE = re.compile(r"[0-9]+")
+    _PUNCT_RE = re.compile(r"[!-/:-@\[-`{-~]")
+    # Runs of layout whitespace (indentation, blank lines); single spaces merge into words
+    _SPACE_RUN_RE = re.compile(r"\n|[ \t]{2,}")
+    _ASCII_RE = re.compile(r"[\x00-\x7f]")
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        cjk = len(self._CJK_RE.findall(text))
+        # Long words split into several sub-word tokens
+        words = sum(1 + len(w) // 8 for w in self._WORD_RE.findall(text))
+        digits = sum((len(d) + 2) // 3 for d in self._DIGITS_RE.findall(text))
+        punct = len(self._PUNCT_RE.findall(text))
+        spaces = len(self._SPACE_RUN_RE.findall(text))
+
+        ascii_chars = len(self._ASCII_RE.findall(text))
+        other = max(0, len(text) - ascii_chars - cjk)
+
+        estimate = (
+            cjk * self.CJK_WEIGHT
+            + words
+            + digits
+            + punct * self.PUNCT_WEIGHT
+            + spaces
+            + other * self.OTHER_WEIGHT
+        )
+        return int(estimate * self.scale + 0.5)
+
+class BPETokenizer(Tokenizer):
+    """
+    Exact token counts from a local vocabulary file.
+
+    Supports HuggingFace `tokenizer.json` files (via the optional `tokenizers`
+    package) and tiktoken `.tiktoken` rank files (via the optional `tiktoken`
+    package). Nothing is downloaded.
+    """
+    name = "bpe"
+
+    # Pre-tokenization pattern used by cl100k-style tiktoken vocabularies
+    TIKTOKEN_PATTERN = (
+        r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+    )
+
+    def __init__(self, vocab_file: str):
+        self.vocab_file = vocab_file
+        if vocab_file.endswith(".json"):
+            from tokenizers import Tokenizer as HFTokenizer
+            hf = HFTokenizer.from_file(vocab_file)
+            self._encode = lambda text: hf.encode(text, add_special_tokens=False).ids
+        else:
+            import tiktoken
+            from tiktoken.load import load_tiktoken_bpe
+            encoding = tiktoken.Encoding(
+                name=os.path.basename(vocab_file),
+                pat_str=self.TIKTOKEN_PATTERN,
+                mergeable_ranks=load_tiktoken_bpe(vocab_file),
+                special_tokens={}
+            )
+            self._encode = encoding.encode_ordinary
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._encode(text))
+
+@lru_cache()
+def get_tokenizer(vocab_file: Optional[str] = None, scale: float = 1.0) -> Tokenizer:
+    """
+    Return the exact BPE tokenizer when a local vocab file is configured and its
+    backend is installed, otherwise the offline heuristic estimator.
+    """
+    if vocab_file:
+        if os.path.isfile(vocab_file):
+            try:
+                return BPETokenizer(vocab_file)
+            except ImportError as e:
+                logger.warning(f"BPE tokenizer backend not installed ({e}), using heuristic estimator")
+            except Exception as e:
+                logger.warning(f"Failed to load tokenizer vocab {vocab_file}: {e}, using heuristic estimator")
+        else:
+            logger.warning(f"Tokenizer vocab file not found: {vocab_file}, using heuristic estimator")
+    return HeuristicTokenizer(scale=scale)
@@ -0,0 +1,145 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from codeagent.core.file_tree import file_tree
+
+logger = logging.getLogger(__name__)
+
+class _CacheEntry:
+    __slots__ = ("value", "paths", "stamps", "size")
+
+    def __init__(self, value: str, paths: List[str], stamps: Tuple, size: int):
+        self.value = value
+        self.paths = paths
+        self.stamps = stamps
+        self.size = size
+
+class ToolResultCache:
+    """
+    LRU cache for results of idempotent tools (read_file, glob_search, ...).
+
+    Each entry is keyed by tool name + arguments + working directory and is
+    validated against the mtimes/sizes of the paths the result depends on,
+    so edits made outside the agent are picked up as well.
+    Eviction is by total cached bytes.
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(tool_name: str, call_args: tuple, call_kwargs: Dict[str, Any]) -> str:
+        args = [a.model_dump(mode="json") if hasattr(a, "model_dump") else a for a in call_args]
+        payload = {"tool": tool_name, "args": args, "kwargs": call_kwargs, "cwd": os.getcwd()}
+        return json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @classmethod
+    def _tree_stamp(cls, root: str) -> Tuple:
+        """
+        Fingerprint the names under a directory tree, as walked by the shared
+        `FileTree` (one stat per directory while its listings are cached).
+        File contents are not covered.
+        """
+        return (cls._stat(root), file_tree.fingerprint(root))
+
+    def snapshot(self, paths: List[str], recursive: bool = False) -> Tuple:
+        """
+        Capture the current state of `paths`.
+        Directories are fingerprinted recursively (names, not contents) when
+        `recursive` is set, otherwise only their own mtime is used (enough for list_dir).
+        """
+        stamps = []
+        for path in paths:
+            if recursive and os.path.isdir(path):
+                stamps.append(self._tree_stamp(path))
+            else:
+                stamps.append(self._stat(path))
+        return tuple(stamps)
+
+    def get(self, key: str, stamps: Tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.stamps != stamps:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: str, paths: List[str], stamps: Tuple):
+        size = len(value.encode("utf-8", errors="ignore"))
+        if not self.enabled or size > self.max_bytes:
+            return
+        abs_paths = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, abs_paths, stamps, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_paths(self, paths: List[str]):
+        """Drop entries depending on any of `paths`, their parents or their children."""
+        targets = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if any(self._overlaps(dep, target) for dep in entry.paths for target in targets)
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    @staticmethod
+    def _overlaps(a: str, b: str) -> bool:
+        if a == b:
+            return True
+        return a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TraceSink:
+    """
+    Non-blocking trace writer for `logs/trace.log`.
+
+    `emit` only puts the raw event on a bounded queue; a daemon thread
+    serializes events in batches, appends them, and rotates the file by size
+    (`trace.log.1` ... `trace.log.<backup_count>`). When the queue is full the
+    event is dropped and counted instead of blocking the event loop.
+
+    One sink is shared per process (see `TraceSink.open` / `TraceSink.active`).
+    """
+    BATCH_SIZE = 256
+    FLUSH_INTERVAL = 0.5
+
+    _active: Optional["TraceSink"] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+        queue_size: int = 10000
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Tuple[float, str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="codeagent-trace", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def open(cls, path: str, **kwargs) -> "TraceSink":
+        """Return the process-wide sink for `path`, starting it if needed."""
+        with cls._lock:
+            if cls._active is None or cls._active.path != Path(path):
+                if cls._active is not None:
+                    cls._active.close()
+                cls._active = cls(path, **kwargs)
+                atexit.register(cls._active.close)
+            return cls._active
+
+    @classmethod
+    def active(cls) -> Optional["TraceSink"]:
+        return cls._active
+
+    @classmethod
+    def shutdown(cls):
+        """Flush and stop the process-wide sink."""
+        with cls._lock:
+            sink, cls._active = cls._active, None
+        if sink:
+            sink.close()
+
+    def emit(self, event: str, data: Any):
+        """Queue an event. Never blocks; `data` must not be mutated afterwards."""
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait((time.time(), event, data))
+        except queue.Full:
+            self.dropped += 1
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Emit a SPAN event with the duration and outcome of the wrapped block."""
+        start = time.time()
+        started = time.perf_counter()
+        status = "ok"
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            status = "error"
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            data: Dict[str, Any] = {
+                "name": name,
+                "start": start,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "status": status,
+                **attrs
+            }
+            if error:
+                data["error"] = error
+            self.emit("SPAN", data)
+
+    def close(self, timeout: float = 5.0):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        file = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            file = open(self.path, "a", encoding="utf-8")
+            running = True
+            while running:
+                try:
+                    item = self._queue.get(timeout=self.FLUSH_INTERVAL)
+                except queue.Empty:
+                    continue
+                batch: List[Tuple[float, str, Any]] = []
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if item is None:
+                    running = False
+                if batch:
+                    file.write("".join(self._format(entry) for entry in batch))
+                    file.flush()
+                    if self.max_bytes and file.tell() >= self.max_bytes:
+                        file.close()
+                        self._rotate()
+                        file = open(self.path, "a", encoding="utf-8")
+        except Exception as e:
+            logger.warning(f"Trace writer stopped: {e}")
+        finally:
+            if file:
+                file.close()
+
+    @staticmethod
+    def _format(entry: Tuple[float, str, Any]) -> str:
+        timestamp, event, data = entry
+        record = {
+            "timestamp": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+            "event": event,
+            "data": data
+        }
+        try:
+            return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        except Exception:
+            record["data"] = repr(data)
+            return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _rotate(self):
+        """trace.log -> trace.log.1 -> ... -> trace.log.<backup_count> (oldest dropped)."""
+        if self.backup_count <= 0:
+            open(self.path, "w").close()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+@contextmanager
+def trace_span(name: str, **attrs):
+    """`TraceSink.span` on the active sink; a no-op when tracing is off."""
+    sink = TraceSink.active()
+    if sink is None:
+        yield attrs
+        return
+    with sink.span(name, **attrs) as span_attrs:
+        yield span_attrs
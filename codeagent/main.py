@@ -5,26 +5,79 @@ from rich.console import Console
 
 from codeagent.config import get_settings
 from codeagent.cli.repl import run_repl
+from codeagent.cli.batch import run_batch
+from codeagent.cli.server import run_server, check_bind
+from codeagent.core.journal import SessionJournal
 
 console = Console()
 
+def option_value(argv, name, usage):
+    """Value following `name` in argv, None if the flag is absent."""
+    if name not in argv:
+        return None
+    index = argv.index(name)
+    if index + 1 >= len(argv) or argv[index + 1].startswith("--"):
+        console.print(f"[bold red]Usage:[/bold red] {usage}")
+        sys.exit(2)
+    return argv[index + 1]
+
+def fail(message: str):
+    console.print(f"[bold red]Error:[/bold red] {message}")
+    sys.exit(1)
+
 def main():
+    # Startup errors (configuration, arguments, missing files) are reported
+    # briefly; anything raised once a mode is running keeps its traceback
     try:
-        # Load configuration
         settings = get_settings()
-        
-        # Parse plan mode from CLI flag or environment
-        argv = sys.argv[1:]
-        plan_mode = ("--plan" in argv) or (os.environ.get("CODEAGENT_PLAN_MODE", "").strip() in ("1", "true", "True"))
-        
-        # Start REPL
-        run_repl(settings, plan_mode=plan_mode)
-        
     except ValidationError as e:
         console.print("[bold red]Configuration Error:[/bold red]")
         console.print(str(e))
         console.print("\n[yellow]Hint: Copy .env.example to .env and fill in your API keys.[/yellow]")
         sys.exit(1)
+
+    # Parse plan mode from CLI flag or environment
+    argv = sys.argv[1:]
+    plan_mode = ("--plan" in argv) or (os.environ.get("CODEAGENT_PLAN_MODE", "").strip() in ("1", "true", "True"))
+
+    # Resume a journaled session: --resume <id>
+    resume_id = option_value(argv, "--resume", "--resume <session_id>")
+    if resume_id and not SessionJournal.path_for(settings.session_dir, resume_id).exists():
+        fail(f"No saved session '{resume_id}' in {settings.session_dir}")
+
+    try:
+        # Headless batch: --batch in.jsonl --out out.jsonl [--concurrency N]
+        batch_usage = "--batch <in.jsonl> --out <out.jsonl> [--concurrency N]"
+        batch_in = option_value(argv, "--batch", batch_usage)
+        if batch_in:
+            batch_out = option_value(argv, "--out", batch_usage)
+            concurrency = option_value(argv, "--concurrency", batch_usage)
+            if not batch_out or (concurrency and not concurrency.isdigit()):
+                console.print(f"[bold red]Usage:[/bold red] {batch_usage}")
+                sys.exit(2)
+            if not os.path.isfile(batch_in):
+                fail(f"Batch input {batch_in} not found")
+            sys.exit(run_batch(settings, batch_in, batch_out, int(concurrency) if concurrency else None, plan_mode=plan_mode))
+
+        # Multi-session server: --serve [--host H] [--port P] [--allow-remote]
+        if "--serve" in argv:
+            serve_usage = "--serve [--host <host>] [--port <port>] [--allow-remote]"
+            host = option_value(argv, "--host", serve_usage)
+            port = option_value(argv, "--port", serve_usage)
+            if port and not port.isdigit():
+                console.print(f"[bold red]Usage:[/bold red] {serve_usage}")
+                sys.exit(2)
+            allow_remote = ("--allow-remote" in argv) or settings.server_allow_remote
+            try:
+                check_bind(host or settings.server_host, allow_remote)
+            except ValueError as e:
+                fail(str(e))
+            run_server(settings, host=host, port=int(port) if port else None, allow_remote=allow_remote)
+            return
+
+        # Start REPL
+        run_repl(settings, plan_mode=plan_mode, resume_id=resume_id)
+
     except KeyboardInterrupt:
         console.print("\n[yellow]Goodbye![/yellow]")
         sys.exit(0)
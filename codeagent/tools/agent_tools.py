@@ -22,17 +22,22 @@ async def submit_task(args: TaskArgs) -> str:
         # Avoid circular imports by importing inside the function
         from codeagent.core.agent import Agent
         from codeagent.core.session import Session
+        from codeagent.core.tokenizer import get_tokenizer
         
+        settings = get_settings()
+
         # Create a new session for the sub-agent
         sub_session = Session(
             system_prompt=f"You are a sub-agent working on a specific task: {args.goal}.\n"
                           "Use available tools to complete the task.\n"
-                          "When finished, provide a concise summary of what you did."
+                          "When finished, provide a concise summary of what you did.",
+            prefix_stable=settings.prefix_stable_context,
+            tokenizer=get_tokenizer(settings.tokenizer_vocab_file, settings.tokenizer_scale),
+            compression_concurrency=settings.compression_concurrency
         )
         
         # Create sub-agent
         # Force plan_mode=False for sub-agents to avoid infinite recursion
-        settings = get_settings()
         sub_agent = Agent(settings, session=sub_session, plan_mode=False)
         
         # Run the sub-agent
@@ -45,9 +50,13 @@ async def submit_task(args: TaskArgs) -> str:
             initial_context.append("Hints:\n" + args.hints)
         if initial_context:
             sub_session.inject_context("\n\n".join(initial_context))
-        async for chunk in sub_agent.run(args.goal, context_summary=args.context_summary):
-            # For now, we just accumulate the text response
-            final_answer += chunk
+        try:
+            async for chunk in sub_agent.run(args.goal, context_summary=args.context_summary):
+                # For now, we just accumulate the text response
+                final_answer += chunk
+        finally:
+            # The sub-session is discarded, so a pending summary is wasted work
+            sub_session.cancel_background_compression()
             
         return final_answer or "Task completed (no output)."
 
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from codeagent.tools.registry import tool
+from codeagent.core.context import current_artifact_store
+
+class ReadArtifactArgs(BaseModel):
+    handle: str = Field(..., description="Artifact handle from a tool output, e.g. art_0123456789ab")
+    offset: int = Field(0, description="First line to return (0-based)")
+    limit: int = Field(200, description="Maximum number of lines to return")
+    column: int = Field(0, description="First character of the first line, to continue a line longer than one page")
+
+@tool(read_only=True)
+def read_artifact(args: ReadArtifactArgs) -> str:
+    """Page through a large tool output that was stored as an artifact."""
+    store = current_artifact_store.get()
+    if not store:
+        return "Error: No artifact store is active for this session."
+    try:
+        return store.read(args.handle, args.offset, args.limit, args.column)
+    except Exception as e:
+        return f"Error reading artifact: {str(e)}"
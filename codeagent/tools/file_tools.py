@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from pydantic import BaseModel, Field
 from codeagent.tools.registry import tool
+from codeagent.core.file_tree import file_tree
 
 class ReadFileArgs(BaseModel):
     path: str = Field(..., description="Path to the file to read")
@@ -13,7 +14,7 @@ class WriteFileArgs(BaseModel):
 class ListDirArgs(BaseModel):
     path: str = Field(".", description="Directory path to list")
 
-@tool
+@tool(idempotent=True, cache_paths=lambda args: [args.path])
 def read_file(args: ReadFileArgs) -> str:
     """Read contents of a file."""
     try:
@@ -24,7 +25,7 @@ def read_file(args: ReadFileArgs) -> str:
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
-@tool
+@tool(invalidates=lambda args: [args.path])
 def write_file(args: WriteFileArgs) -> str:
     """Write content to a file. Overwrites if exists."""
     try:
@@ -35,7 +36,7 @@ def write_file(args: WriteFileArgs) -> str:
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
-@tool
+@tool(idempotent=True, cache_paths=lambda args: [args.path])
 def list_dir(args: ListDirArgs) -> str:
     """List files and directories in a given path."""
     try:
@@ -43,9 +44,10 @@ def list_dir(args: ListDirArgs) -> str:
         if not path.exists():
             return f"Error: Directory not found at {path}"
         
+        # Cached listing, reused while the directory's mtime is unchanged
         entries = []
-        for entry in path.iterdir():
-            prefix = "[DIR] " if entry.is_dir() else "[FILE]"
+        for entry in file_tree.listdir(str(path)):
+            prefix = "[DIR] " if entry.is_dir else "[FILE]"
             entries.append(f"{prefix} {entry.name}")
             
         return "\n".join(entries)
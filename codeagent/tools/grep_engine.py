@@ -0,0 +1,335 @@
+"""
+Search engine behind `grep_search`.
+
+Files are found with an `os.scandir` walk that prunes excluded and hidden
+directories and honors `.gitignore`. Each file is sniffed for binary content
+(NUL byte in the first block) and then matched with a compiled bytes regex
+over a memory-mapped buffer, so lines are never decoded or lowercased unless
+they match. The first `PARALLEL_MIN_FILES` files are scanned in-process (most
+searches stop there); larger trees are handed in batches to a process pool,
+consumed in walk order so results stay deterministic, and the search stops
+as soon as `max_results` matches are collected.
+"""
+import os
+import re
+import mmap
+import atexit
+import itertools
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+from codeagent.core.ignore import IgnoreRules
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 8192
+MAX_LINE_BYTES = 1000  # Only this much of a matching line is decoded
+PARALLEL_MIN_FILES = 512
+BATCH_FILES = 128
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+PREFILTER_WINDOW = 256 * 1024  # Memory-mapped files are lowercased this much at a time
+
+# Skipped without opening the file
+BINARY_EXTENSIONS = frozenset((
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tif", ".tiff", ".psd",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar", ".war", ".whl", ".egg",
+    ".pyc", ".pyo", ".so", ".dll", ".dylib", ".exe", ".bin", ".o", ".a", ".lib", ".obj", ".class",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+    ".mp3", ".mp4", ".wav", ".avi", ".mov", ".mkv", ".flac", ".ogg",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot", ".db", ".sqlite", ".sqlite3", ".npy", ".npz", ".pkl"
+))
+
+Match = Tuple[str, int, str]  # (path, line number, line)
+# (regex source, flags, lowercase literal that must occur in the lowercased file or None).
+# Compiled in each worker (re caches it).
+PatternSpec = Tuple[bytes, int, Optional[bytes]]
+
+def compile_pattern(pattern: str, regex: bool = False, case_sensitive: bool = False) -> PatternSpec:
+    """
+    Build the bytes regex for a search.
+
+    Raises:
+        ValueError: If `regex` is set and the pattern is invalid.
+
+    Case-insensitive matching of bytes only folds ASCII; for literal patterns
+    other cased characters get an explicit (lower|upper) alternative instead.
+    In regex mode classes like `\\w` are ASCII-only as well.
+
+    Case-insensitive regex search is ~10x slower than a plain scan, so ASCII
+    literals also get a prefilter: files whose lowercased bytes do not
+    contain the lowercased pattern are skipped before the regex runs.
+    """
+    flags = re.MULTILINE
+    if regex:
+        source = pattern.encode("utf-8")
+        if not case_sensitive:
+            flags |= re.IGNORECASE
+        try:
+            re.compile(source, flags)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+        return source, flags, None
+
+    if case_sensitive:
+        return re.escape(pattern.encode("utf-8")), flags, None
+    flags |= re.IGNORECASE
+    if pattern.isascii():
+        return re.escape(pattern.encode("utf-8")), flags, pattern.lower().encode("utf-8")
+    parts = []
+    for ch in pattern:
+        lower, upper = ch.lower(), ch.upper()
+        if ch.isascii() or lower == upper:
+            parts.append(re.escape(ch.encode("utf-8")))
+        else:
+            parts.append(b"(?:" + re.escape(lower.encode("utf-8")) + b"|" + re.escape(upper.encode("utf-8")) + b")")
+    return b"".join(parts), flags, None
+
+def iter_files(root: str, exclude_dirs: Iterable[str] = (), use_gitignore: bool = True) -> Iterator[str]:
+    """
+    Yield the files under `root` in a stable order: the files of a directory
+    sorted by name, then its subdirectories the same way (see `walk_order_key`).
+    Directories in `exclude_dirs` or starting with '.' are pruned.
+    """
+    return (entry.path for entry in iter_entries(root, exclude_dirs, use_gitignore))
+
+def walk_order_key(rel_path: str) -> Tuple[Tuple[int, str], ...]:
+    """Sort key that orders relative paths the way `iter_files` yields them."""
+    parts = rel_path.replace(os.sep, "/").split("/")
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+def iter_entries(root: str, exclude_dirs: Iterable[str] = (), use_gitignore: bool = True) -> Iterator[os.DirEntry]:
+    """`os.DirEntry` of every file `iter_files` yields."""
+    exclude = set(exclude_dirs)
+    abs_root = os.path.abspath(root)
+    rules = IgnoreRules.for_root(abs_root) if use_gitignore else IgnoreRules()
+    stack: List[Tuple[str, str, IgnoreRules]] = [(root, abs_root, rules)]
+    while stack:
+        directory, abs_directory, rules = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            abs_path = os.path.join(abs_directory, entry.name)
+            if is_dir:
+                if entry.name in exclude or entry.name.startswith("."):
+                    continue
+                if not rules.is_ignored(abs_path, True, entry.name):
+                    subdirs.append((entry.path, abs_path))
+            elif not rules.is_ignored(abs_path, False, entry.name):
+                yield entry
+        for path, abs_path in reversed(subdirs):
+            stack.append((path, abs_path, rules.child(abs_path) if use_gitignore else rules))
+
+def contains_lower(data, needle: bytes) -> bool:
+    """
+    Whether the ASCII-lowercased `data` contains `needle` (lowercase). bytes
+    are lowercased in one go; other buffers (mmap) in overlapping windows, so
+    memory stays bounded and each window is still in cache when searched.
+    """
+    if isinstance(data, bytes):
+        return needle in data.lower()
+    view = memoryview(data)
+    try:
+        size = len(view)
+        overlap = len(needle) - 1
+        for pos in range(0, size, PREFILTER_WINDOW):
+            if needle in view[pos:pos + PREFILTER_WINDOW + overlap].tobytes().lower():
+                return True
+        return False
+    finally:
+        view.release()
+
+def scan_buffer(data, compiled: "re.Pattern[bytes]", limit: int, prefilter: Optional[bytes] = None) -> List[Tuple[int, str]]:
+    """Matching (line number, line) pairs of a bytes-like buffer, one per line."""
+    results: List[Tuple[int, str]] = []
+    size = len(data)
+    if prefilter is not None and not contains_lower(data, prefilter):
+        return results
+    line_no = 1
+    counted = 0
+    pos = 0
+    while len(results) < limit and pos <= size:
+        m = compiled.search(data, pos)
+        if m is None:
+            break
+        start = data.rfind(b"\n", 0, m.start()) + 1
+        end = data.find(b"\n", m.end())
+        if end == -1:
+            end = size
+        line_no += data[counted:start].count(b"\n")
+        counted = start
+        line = data[start:min(end, start + MAX_LINE_BYTES)].decode("utf-8", errors="ignore")
+        results.append((line_no, line))
+        pos = end + 1
+    return results
+
+def scan_file(path: str, compiled: "re.Pattern[bytes]", limit: int, prefilter: Optional[bytes] = None) -> List[Tuple[int, str]]:
+    """Matches in one file; binary and unreadable files yield nothing."""
+    if os.path.splitext(path)[1].lower() in BINARY_EXTENSIONS:
+        return []
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if not head or b"\0" in head:
+                return []
+            if len(head) < SNIFF_BYTES:
+                return scan_buffer(head, compiled, limit, prefilter)  # Whole file already read
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return scan_buffer(data, compiled, limit, prefilter)
+    except (OSError, ValueError):
+        return []
+
+def scan_batch(paths: List[str], spec: PatternSpec, limit: int) -> List[Match]:
+    """Worker entry point: matches of `paths` in order, at most `limit`."""
+    source, flags, prefilter = spec
+    compiled = re.compile(source, flags)
+    matches: List[Match] = []
+    for path in paths:
+        for line_no, line in scan_file(path, compiled, limit - len(matches), prefilter):
+            matches.append((path, line_no, line))
+        if len(matches) >= limit:
+            break
+    return matches
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if MAX_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                # spawn: safe with the agent's threads and the same on every platform
+                _pool = ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                atexit.register(shutdown_pool)
+            except (OSError, ValueError, NotImplementedError) as e:
+                logger.warning(f"Parallel grep unavailable, scanning in-process: {e}")
+                return None
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def search(
+    root: str,
+    pattern: str,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    exclude_dirs: Iterable[str] = (),
+    max_results: int = 100,
+    use_gitignore: bool = True,
+    files: Optional[List[str]] = None
+) -> Tuple[List[Match], bool]:
+    """
+    Search the files under `root`, or only `files` (e.g. index candidates,
+    in the order given) when provided.
+
+    Returns:
+        (matches in walk order, True if the search stopped at `max_results`)
+    Raises:
+        ValueError: For an invalid regex.
+    """
+    spec = compile_pattern(pattern, regex, case_sensitive)
+    compiled = re.compile(spec[0], spec[1])
+    prefilter = spec[2]
+
+    def walk() -> Iterator[str]:
+        return iter(files) if files is not None else iter_files(root, exclude_dirs, use_gitignore)
+
+    paths = walk()
+    matches: List[Match] = []
+
+    # Small trees (and the head of large ones) are not worth a round trip to the pool
+    head = itertools.islice(paths, PARALLEL_MIN_FILES)
+    if _scan_sequential(head, compiled, prefilter, matches, max_results):
+        return matches, True
+    # Peek whether the walk continues past the head
+    rest = next(paths, None)
+    if rest is None:
+        return matches, False
+    paths = itertools.chain((rest,), paths)
+
+    pool = _get_pool()
+    if pool is not None:
+        scanned = len(matches)
+        try:
+            return _search_parallel(pool, paths, spec, matches, max_results)
+        except BrokenProcessPool:
+            logger.warning("Grep worker pool broke, falling back to an in-process scan")
+            shutdown_pool()
+            # The walk was partly consumed by lost batches: restart it after the head
+            del matches[scanned:]
+            paths = itertools.islice(walk(), PARALLEL_MIN_FILES, None)
+    truncated = _scan_sequential(paths, compiled, prefilter, matches, max_results)
+    return matches, truncated
+
+def _scan_sequential(
+    files: Iterable[str],
+    compiled: "re.Pattern[bytes]",
+    prefilter: Optional[bytes],
+    matches: List[Match],
+    max_results: int
+) -> bool:
+    """Scan in-process; True once `max_results` is reached."""
+    for path in files:
+        for line_no, line in scan_file(path, compiled, max_results - len(matches), prefilter):
+            matches.append((path, line_no, line))
+        if len(matches) >= max_results:
+            return True
+    return False
+
+def _search_parallel(
+    pool: ProcessPoolExecutor,
+    files: Iterator[str],
+    spec: PatternSpec,
+    matches: List[Match],
+    max_results: int
+) -> Tuple[List[Match], bool]:
+    pending: Deque[Future] = deque()
+
+    def collect_head() -> bool:
+        """Merge the oldest batch; True once the limit is reached."""
+        matches.extend(pending.popleft().result())
+        return len(matches) >= max_results
+
+    try:
+        batch: List[str] = []
+        for path in files:
+            batch.append(path)
+            if len(batch) < BATCH_FILES:
+                continue
+            pending.append(pool.submit(scan_batch, batch, spec, max_results - len(matches)))
+            batch = []
+            # Merge finished batches in order; bound the work queued ahead of them
+            while pending and (pending[0].done() or len(pending) >= MAX_WORKERS * 2):
+                if collect_head():
+                    return matches[:max_results], True
+        if batch:
+            pending.append(pool.submit(scan_batch, batch, spec, max_results - len(matches)))
+        while pending:
+            if collect_head():
+                return matches[:max_results], True
+        return matches, False
+    finally:
+        for future in pending:
+            future.cancel()
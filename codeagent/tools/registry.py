@@ -1,28 +1,156 @@
-from typing import Callable, Dict, Any, List, Optional, Type, get_type_hints
-from pydantic import BaseModel
+from typing import Callable, Dict, Any, List, Optional, Tuple, Type, Union, get_type_hints
+from pydantic import BaseModel, ValidationError
 import inspect
+import json
+
+class ToolArgumentError(ValueError):
+    """
+    Raised when tool call arguments cannot be parsed or validated.
+    `errors` holds one {"field", "message"} dict per problem, so callers
+    can report them back to the LLM in a structured way.
+    """
+    def __init__(self, tool_name: str, message: str, errors: Optional[List[Dict[str, str]]] = None):
+        self.tool_name = tool_name
+        self.errors = errors or []
+        if self.errors:
+            details = "; ".join(f"{e['field']}: {e['message']}" for e in self.errors)
+            message = f"{message} ({details})"
+        super().__init__(message)
+
+class ToolEntry:
+    """
+    Compiled dispatch entry for a registered tool.
+    All reflection (type hints, coroutine check, schema) happens once at registration.
+    """
+    def __init__(
+        self,
+        func: Callable,
+        read_only: bool = False,
+        idempotent: bool = False,
+        cache_paths: Optional[Callable[[Any], List[str]]] = None,
+        cache_recursive: bool = False,
+        invalidates: Optional[Callable[[Any], List[str]]] = None
+    ):
+        self.name = func.__name__
+        self.func = func
+        # Idempotent tools never have side effects
+        self.read_only = read_only or idempotent
+        self.idempotent = idempotent
+        self.cache_paths = cache_paths
+        self.cache_recursive = cache_recursive
+        self.invalidates = invalidates
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.args_model = self._find_args_model(func)
+        self.schema = ToolRegistry._generate_schema(func)
+
+    @staticmethod
+    def _find_args_model(func: Callable) -> Optional[Type[BaseModel]]:
+        try:
+            type_hints = get_type_hints(func)
+        except Exception:
+            return None
+        first_param_type = next((t for n, t in type_hints.items() if n != "return"), None)
+        if inspect.isclass(first_param_type) and issubclass(first_param_type, BaseModel):
+            return first_param_type
+        return None
+
+    def validate(self, arguments: Union[str, Dict[str, Any], None]) -> Tuple[tuple, Dict[str, Any]]:
+        """
+        Parse and validate raw tool call arguments.
+
+        Returns:
+            (call_args, call_kwargs) ready to be passed to `func`.
+        Raises:
+            ToolArgumentError: If the arguments are not valid JSON or fail validation.
+        """
+        if isinstance(arguments, dict):
+            args_dict = arguments
+        else:
+            try:
+                args_dict = json.loads(arguments or "{}")
+            except json.JSONDecodeError:
+                raise ToolArgumentError(self.name, f"Invalid JSON arguments: {arguments}")
+        if not isinstance(args_dict, dict):
+            raise ToolArgumentError(self.name, f"Arguments must be a JSON object, got: {arguments}")
+
+        if self.args_model is None:
+            return (), args_dict
+
+        try:
+            return (self.args_model.model_validate(args_dict),), {}
+        except ValidationError as e:
+            errors = [
+                {
+                    "field": ".".join(str(part) for part in err["loc"]) or "(root)",
+                    "message": err["msg"]
+                }
+                for err in e.errors()
+            ]
+            raise ToolArgumentError(self.name, f"Invalid arguments for tool '{self.name}'", errors)
 
 class ToolRegistry:
     """
     Singleton registry for all available tools.
     """
-    _tools: Dict[str, Callable] = {}
+    _entries: Dict[str, ToolEntry] = {}
     _schemas: List[Dict[str, Any]] = []
 
     @classmethod
-    def register(cls, func: Callable):
+    def register(
+        cls,
+        func: Optional[Callable] = None,
+        *,
+        read_only: bool = False,
+        idempotent: bool = False,
+        cache_paths: Optional[Callable[[Any], List[str]]] = None,
+        cache_recursive: bool = False,
+        invalidates: Optional[Callable[[Any], List[str]]] = None
+    ):
         """
         Decorator to register a function as a tool.
         The function must have type hints and a docstring.
         If the first argument is a Pydantic model, it's used for schema generation.
+
+        Can be used bare (`@tool`) or with options (`@tool(read_only=True)`).
+        Read-only tools have no side effects and may be executed concurrently.
+
+        Idempotent tools have their results cached. `cache_paths(args)` lists the
+        paths the result depends on (their mtimes validate the cache entry), and
+        `cache_recursive` fingerprints the names under directories recursively
+        (through the shared FileTree; file contents are not covered).
+        Side-effecting tools may declare `invalidates(args)` to drop only the cache
+        entries touching those paths; otherwise the whole cache is flushed after them.
         """
-        cls._tools[func.__name__] = func
-        cls._schemas.append(cls._generate_schema(func))
-        return func
+        def decorator(f: Callable) -> Callable:
+            cls._entries[f.__name__] = ToolEntry(
+                f,
+                read_only=read_only,
+                idempotent=idempotent,
+                cache_paths=cache_paths,
+                cache_recursive=cache_recursive,
+                invalidates=invalidates
+            )
+            # Sorted by name so the prompt prefix doesn't depend on import order
+            cls._schemas = [cls._entries[name].schema for name in sorted(cls._entries)]
+            return f
+
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    @classmethod
+    def get_entry(cls, name: str) -> Optional[ToolEntry]:
+        return cls._entries.get(name)
 
     @classmethod
     def get_tool(cls, name: str) -> Optional[Callable]:
-        return cls._tools.get(name)
+        entry = cls._entries.get(name)
+        return entry.func if entry else None
+
+    @classmethod
+    def is_read_only(cls, name: str) -> bool:
+        entry = cls._entries.get(name)
+        return bool(entry and entry.read_only)
 
     @classmethod
     def get_schemas(cls) -> List[Dict[str, Any]]:
@@ -1,14 +1,20 @@
-import os
-import fnmatch
+import itertools
 from pathlib import Path
 from typing import List
 from pydantic import BaseModel, Field
 from codeagent.tools.registry import tool
+from codeagent.core.file_tree import file_tree
+from codeagent.tools import grep_engine
+from codeagent.tools.trigram_index import TrigramIndex
+
+MAX_GREP_RESULTS = 100
+MAX_GLOB_RESULTS = 100
 
 class GrepArgs(BaseModel):
     pattern: str = Field(..., description="String pattern to search for")
     path: str = Field(".", description="Directory to search in (default: current dir)")
     case_sensitive: bool = Field(False, description="Whether search should be case sensitive")
+    regex: bool = Field(False, description="Treat the pattern as a regular expression")
     exclude_dirs: List[str] = Field(
         default_factory=lambda: [".git", ".venv", "__pycache__", "node_modules"],
         description="Directories to exclude"
@@ -18,77 +24,69 @@ class GlobArgs(BaseModel):
     pattern: str = Field(..., description="Glob pattern (e.g. **/*.py)")
     path: str = Field(".", description="Root directory to search in")
 
-@tool
+# Not cached: validating a result would mean stat'ing every file under the path,
+# which is what the index freshness check already does
+@tool(read_only=True)
 def grep_search(args: GrepArgs) -> str:
     """
-    Search for a string pattern in files (recursive).
+    Search for a string or regex pattern in text files (recursive).
+    Binary files and paths ignored by .gitignore are skipped.
+    Uses the trigram index (if enabled and built) to scan only candidate files.
     Returns 'FilePath:LineNumber: Content'.
     """
-    results = []
     root_path = Path(args.path)
     
     if not root_path.exists():
         return f"Error: Path {root_path} does not exist"
     
-    # Pre-process exclude dirs for faster lookup
-    exclude_set = set(args.exclude_dirs)
-    
-    search_pattern = args.pattern if args.case_sensitive else args.pattern.lower()
-    
     try:
-        for root, dirs, files in os.walk(root_path):
-            # Modify dirs in-place to prune excluded directories
-            dirs[:] = [d for d in dirs if d not in exclude_set and not d.startswith('.')]
-            
-            for file in files:
-                file_path = Path(root) / file
-                
-                # Skip binary files or common non-text extensions could be added here
-                # For MVP we try to read everything as text
-                try:
-                    # Try reading with utf-8, ignore errors to skip binary-like files
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for i, line in enumerate(f, 1):
-                            line_content = line if args.case_sensitive else line.lower()
-                            if search_pattern in line_content:
-                                # Truncate long lines
-                                display_line = line.strip()[:200]
-                                results.append(f"{file_path}:{i}: {display_line}")
-                                
-                                # Limit total results to prevent context overflow
-                                if len(results) >= 100:
-                                    results.append("... (results truncated after 100 matches)")
-                                    return "\n".join(results)
-                except Exception:
-                    continue
-                    
-        if not results:
-            return "No matches found."
-            
-        return "\n".join(results)
-        
+        search_args = dict(
+            regex=args.regex,
+            case_sensitive=args.case_sensitive,
+            exclude_dirs=args.exclude_dirs,
+            max_results=MAX_GREP_RESULTS
+        )
+        index = TrigramIndex.for_path(str(root_path)) if root_path.is_dir() else None
+        result = index.search(str(root_path), args.pattern, **search_args) if index else None
+        if result is None:
+            # No index, not built yet, or a query it cannot narrow down
+            result = grep_engine.search(str(root_path), args.pattern, **search_args)
+        matches, truncated = result
+    except ValueError as e:
+        return f"Error: {str(e)}"
     except Exception as e:
         return f"Error during grep: {str(e)}"
+        
+    if not matches:
+        return "No matches found."
+    
+    # Truncate long lines
+    results = [f"{path}:{line_no}: {line.strip()[:200]}" for path, line_no, line in matches]
+    if truncated:
+        # Limit total results to prevent context overflow
+        results.append(f"... (results truncated after {MAX_GREP_RESULTS} matches)")
+    return "\n".join(results)
 
-@tool
+@tool(idempotent=True, cache_paths=lambda args: [file_tree.glob_base(args.path, args.pattern)], cache_recursive=True)
 def glob_search(args: GlobArgs) -> str:
     """
     Find files matching a glob pattern (e.g. **/*.py).
+    Excluded directories (.git, .venv, ...) and paths ignored by .gitignore are skipped.
     """
     try:
         root_path = Path(args.path)
         if not root_path.exists():
             return f"Error: Path {root_path} does not exist"
             
-        results = list(root_path.glob(args.pattern))
+        # Lazy walk of the shared tree snapshot: stops after the first extra match
+        results = list(itertools.islice(file_tree.glob(str(root_path), args.pattern), MAX_GLOB_RESULTS + 1))
         
         if not results:
             return "No matching files found."
             
-        # Convert to string paths and limit
-        result_strs = [str(p) for p in results[:100]]
-        if len(results) > 100:
-            result_strs.append(f"... ({len(results) - 100} more files)")
+        result_strs = results[:MAX_GLOB_RESULTS]
+        if len(results) > MAX_GLOB_RESULTS:
+            result_strs.append(f"... (results truncated after {MAX_GLOB_RESULTS} files)")
             
         return "\n".join(result_strs)
         
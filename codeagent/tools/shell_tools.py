@@ -1,5 +1,6 @@
 from codeagent.tools.registry import tool
 from codeagent.core.shell import ShellExecutor
+from codeagent.core.context import current_artifact_store
 from pydantic import BaseModel, Field
 
 class RunShellInput(BaseModel):
@@ -28,8 +29,10 @@ def run_shell(args: RunShellInput) -> str:
         output = "[Command finished with no output]"
         
     # Simple truncation to avoid blowing up context immediately
+    # (with an active artifact store the full output is spilled to disk instead)
     MAX_LEN = 5000
-    if len(output) > MAX_LEN:
+    store = current_artifact_store.get()
+    if len(output) > MAX_LEN and (store is None or not store.enabled):
          output = output[:MAX_LEN] + f"\n... [Output Truncated, total length {len(output)} chars]"
          
     return output
@@ -1,8 +1,14 @@
+import logging
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from codeagent.tools.registry import tool
-from codeagent.core.context import current_task_manager
+from codeagent.core.context import current_task_manager, current_progress
 from codeagent.core.task_manager import TaskStatus
+from codeagent.core.plan_executor import PlanExecutor
+from codeagent.tools.agent_tools import submit_task, TaskArgs
+from codeagent.config import get_settings
+
+logger = logging.getLogger(__name__)
 
 class TaskItem(BaseModel):
     id: str = Field(..., description="Unique ID for the task")
@@ -12,13 +18,16 @@ class TaskItem(BaseModel):
 class PlanTaskArgs(BaseModel):
     tasks: List[TaskItem] = Field(..., description="List of tasks to create the plan")
 
+class RunPlanArgs(BaseModel):
+    max_parallel: Optional[int] = Field(None, description="Maximum number of tasks run at the same time (default: PLAN_CONCURRENCY)")
+
 class UpdateTaskArgs(BaseModel):
     task_id: str = Field(..., description="ID of the task to update")
     status: TaskStatus = Field(..., description="New status of the task")
     result: Optional[str] = Field(None, description="Summary of the result")
     error: Optional[str] = Field(None, description="Error message if failed")
 
-@tool
+@tool(invalidates=lambda args: [])
 def plan_task(args: PlanTaskArgs) -> str:
     """
     Create or overwrite the current task plan.
@@ -30,11 +39,25 @@ def plan_task(args: PlanTaskArgs) -> str:
     
     # Convert args to dicts for TaskManager
     tasks_data = [t.model_dump() for t in args.tasks]
-    tm.create_plan(tasks_data)
+    try:
+        tm.create_plan(tasks_data)
+    except ValueError as e:
+        return f"Error creating plan: {str(e)}"
     
     return "Plan created successfully.\n" + tm.get_plan_summary()
 
-@tool
+@tool(read_only=True)
+def show_plan() -> str:
+    """
+    Show the full current task plan with every task, its status, result and error.
+    Tool outputs only report plan changes; use this when the whole plan is needed.
+    """
+    tm = current_task_manager.get()
+    if not tm:
+        return "Error: Plan Mode is not active."
+    return tm.get_plan_summary()
+
+@tool(invalidates=lambda args: [])
 def update_task_status(args: UpdateTaskArgs) -> str:
     """
     Update the status of a specific task.
@@ -51,6 +74,40 @@ def update_task_status(args: UpdateTaskArgs) -> str:
             result=args.result,
             error=args.error
         )
-        return f"Task {args.task_id} updated to {args.status}.\n" + tm.get_plan_summary()
+        return f"Task {args.task_id} updated to {args.status}.\n" + tm.get_plan_delta()
     except ValueError as e:
         return f"Error updating task: {str(e)}"
+
+@tool
+async def run_plan(args: RunPlanArgs) -> str:
+    """
+    Execute all pending tasks of the current plan with sub-agents.
+    Tasks whose dependencies are completed run in parallel.
+    Only available in Plan Mode.
+    """
+    tm = current_task_manager.get()
+    if not tm:
+        return "Error: Plan Mode is not active or TaskManager is not initialized."
+    if not tm.tasks:
+        return "Error: No plan active. Create one with plan_task first."
+
+    async def run_task(task) -> str:
+        # Hand the results of prerequisite tasks to the sub-agent
+        dep_results = [
+            f"Task {dep_id}: {tm.tasks[dep_id].result}"
+            for dep_id in task.dependencies
+            if dep_id in tm.tasks and tm.tasks[dep_id].result
+        ]
+        context_summary = "Results of prerequisite tasks:\n" + "\n".join(dep_results) if dep_results else None
+        return await submit_task(TaskArgs(goal=task.description, task_id=task.id, context_summary=context_summary))
+
+    max_parallel = args.max_parallel or get_settings().plan_concurrency
+    report = current_progress.get()
+    progress = []
+    # Plans can run for minutes: report each start and completion as it happens
+    async for line in PlanExecutor(tm, run_task, max_parallel).run():
+        progress.append(line)
+        logger.info(line)
+        if report:
+            report(line)
+    return "\n".join(progress) + "\n\n" + tm.get_plan_delta()
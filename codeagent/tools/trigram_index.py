@@ -0,0 +1,768 @@
+"""
+Persistent trigram index that narrows `grep_search` down to candidate files.
+
+Every indexed file contributes the set of byte trigrams of its (ASCII
+lowercased) content. A query extracts the trigrams any match must contain,
+intersects their posting lists, and only the resulting files are scanned by
+`grep_engine`, which verifies the actual matches. Patterns without usable
+trigrams (shorter than 3 characters, pure alternations, ...) fall back to a
+full scan.
+
+The index lives on disk as a list of immutable segments of at most
+`SEGMENT_DOCS` files each:
+
+    seg-N.lex        "CATG", version, trigram keys u32[K], offsets u32[K+1]
+    seg-N.post       posting lists (u16 document ids)
+    seg-N.docs.json  [relative path, mtime_ns, size, indexed] per document id
+    meta.json        segment names and byte order, replaced atomically
+
+`.lex`/`.post` are memory-mapped and searched with bisect, so opening an
+index parses nothing but the document tables. A path is live only in the
+newest segment that lists it: refreshes append segments with the files whose
+mtime or size changed and tombstones (size -1) for deleted ones, and the index
+is rebuilt once there are too many segments or superseded documents.
+
+Indexes are built and refreshed on a background thread; until one is ready,
+`grep_search` scans the tree as before. Paths written by the agent are
+reported through `notify_changed` and scanned unconditionally until the next
+refresh; after unknown side effects (run_shell) queries fall back to a full
+scan until the refresh they trigger has finished. Edits made outside the
+agent are checked incrementally by every query: the shared `FileTree` gives
+the mtime of each directory below the searched path (one stat per directory),
+files in directories modified since the last refresh started (created,
+deleted, renamed or saved by replacement) and the candidate files are
+stat'ed, and the ones added or changed are scanned too and trigger a refresh.
+A file rewritten in place in an untouched directory that is not a candidate
+is found after the next refresh, which queries schedule every
+`REFRESH_INTERVAL` seconds.
+"""
+import os
+import sys
+import stat
+import json
+import mmap
+import time
+import bisect
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from codeagent.core.ignore import IgnoreRules
+from codeagent.core.executor import ToolExecutor
+from codeagent.core.file_tree import FILE, file_tree
+from codeagent.tools import grep_engine
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CATG"
+VERSION = 1
+HEADER_BYTES = 8
+SEGMENT_DOCS = 4096  # Document ids are u16
+MAX_FILE_BYTES = 4 * 1024 * 1024  # Larger files are not indexed and always scanned
+MAX_SEGMENTS = 8
+COMPACT_RATIO = 0.3  # Rebuild once this share of the stored documents is superseded
+REFRESH_INTERVAL = 5.0
+EXTRACT_BATCH = 256
+# Queries with more candidates than this share of the indexed files (and
+# MIN_CANDIDATES) scan the tree instead: a walk stops early at max_results
+CANDIDATE_RATIO = 0.5
+MIN_CANDIDATES = 512
+# Directories modified this close before a refresh started may have changed
+# unseen within the same mtime tick (coarse filesystem timestamps)
+RACY_WINDOW_NS = 2_000_000_000
+# The directories grep_search excludes by default; queries excluding less scan the tree
+INDEX_EXCLUDE_DIRS = frozenset((".git", ".venv", "__pycache__", "node_modules"))
+
+Doc = Tuple[str, int, int, bool]  # (relative path, mtime_ns, size, indexed); size -1: deleted
+
+def file_trigrams(path: str) -> Optional[bytes]:
+    """
+    Sorted trigram keys `(a << 16) | (b << 8) | c` of a file's lowercased
+    content as native u32 bytes. b"" for files grep never matches (binary,
+    empty, unreadable), None for files too large to index.
+    """
+    if os.path.splitext(path)[1].lower() in grep_engine.BINARY_EXTENSIONS:
+        return b""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return b""
+    if len(data) > MAX_FILE_BYTES:
+        return None
+    if not data or b"\0" in data[:grep_engine.SNIFF_BYTES]:
+        return b""
+    grams: Set[Tuple[int, int, int]] = set()
+    # Matches never span lines; repeated lines are common in source files
+    for line in set(data.lower().split(b"\n")):
+        grams.update(zip(line, line[1:], line[2:]))
+    return array("I", sorted((a << 16) | (b << 8) | c for a, b, c in grams)).tobytes()
+
+def extract_batch(paths: List[str]) -> List[Optional[bytes]]:
+    """Worker entry point: `file_trigrams` of each path."""
+    return [file_trigrams(path) for path in paths]
+
+_QUANTIFIER_RE = re.compile(r"[*+?]|\{(\d*)(?:,\d*)?\}")
+_LOOKAROUND_PREFIXES = ("(?=", "(?!", "(?<=", "(?<!")
+
+def _required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Literal strings every match of regex `pattern` contains, read from the
+    pattern text (conservative: anything unusual only ends a literal run).
+    None if the pattern cannot be decomposed this way and the index must not
+    narrow the search.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+    groups: List[List] = []  # [len(runs) at the group start, contents optional]
+    n = len(pattern)
+    i = 0
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def quantifier(pos: int) -> Tuple[int, Optional[int]]:
+        """(position after a quantifier at `pos`, its minimum count; None without one)"""
+        m = _QUANTIFIER_RE.match(pattern, pos)
+        if m is None:
+            return pos, None
+        end = m.end()
+        if end < n and pattern[end] in "?+":  # Lazy or possessive
+            end += 1
+        token = m.group(0)
+        if token == "+":
+            return end, 1
+        if token in ("*", "?"):
+            return end, 0
+        return end, int(m.group(1) or 0)
+
+    while i < n:
+        ch = pattern[i]
+        literal = None
+        if ch == "\\":
+            if i + 1 >= n:
+                return None
+            escaped = pattern[i + 1]
+            i += 2
+            # Classes, anchors, backreferences and character escapes only end the run
+            if not escaped.isalnum():
+                literal = escaped
+        elif ch == "[":
+            j = i + 1
+            if j < n and pattern[j] == "^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+        elif ch == "(":
+            flush()
+            if pattern.startswith("(?", i) and not pattern.startswith(("(?:", "(?P<"), i):
+                if pattern.startswith(_LOOKAROUND_PREFIXES, i):
+                    groups.append([len(runs), True])  # Zero-width: nothing is consumed
+                    i += 3 if pattern[i + 2] in "=!" else 4
+                    continue
+                m = re.match(r"\(\?([aiLmsux-]*)([:)])", pattern[i:])
+                if m is None or "x" in m.group(1):
+                    return None  # Comments, conditionals, named backreferences, verbose mode
+                i += m.end()
+                if m.group(2) == ":":
+                    groups.append([len(runs), False])
+                continue
+            groups.append([len(runs), False])
+            i = pattern.index(">", i) + 1 if pattern.startswith("(?P<", i) else i + (3 if pattern.startswith("(?:", i) else 1)
+            continue
+        elif ch == ")":
+            flush()
+            if not groups:
+                return None
+            start, optional = groups.pop()
+            i, minimum = quantifier(i + 1)
+            if optional or minimum == 0:
+                del runs[start:]
+            continue
+        elif ch == "|":
+            flush()
+            if not groups:
+                return None  # Top-level alternation: no literal is required
+            # Neither branch is required; the literals of this group are dropped at ")"
+            groups[-1][1] = True
+            i += 1
+            continue
+        elif ch in ".^$":
+            i += 1
+        else:
+            literal = ch
+            i += 1
+
+        i, minimum = quantifier(i)
+        if literal is not None and minimum != 0:
+            current.append(literal)
+        if minimum is not None or literal is None:
+            flush()
+            if literal is not None and minimum:
+                current.append(literal)  # The repeated character also starts the next run
+    flush()
+    if groups:
+        return None
+    return runs
+
+def query_trigrams(pattern: str, regex: bool = False, case_sensitive: bool = False) -> List[int]:
+    """
+    Trigram keys every file matching the search must contain; empty when the
+    pattern gives none and the index cannot narrow the search.
+    """
+    if regex:
+        literals = _required_literals(pattern)
+        if literals is None:
+            return []
+        runs = [literal.encode("utf-8") for literal in literals]
+    else:
+        runs = [pattern.encode("utf-8")]
+    # Non-ASCII letters of case-insensitive literals match other byte sequences
+    skip_non_ascii = not regex and not case_sensitive
+    keys = set()
+    for run in runs:
+        run = run.lower()
+        for a, b, c in zip(run, run[1:], run[2:]):
+            if 10 in (a, b, c) or skip_non_ascii and max(a, b, c) > 127:
+                continue
+            keys.add((a << 16) | (b << 8) | c)
+    return sorted(keys)
+
+def _find_work_tree(path: str) -> str:
+    """The enclosing git work tree of `path`, or `path` itself."""
+    current = path
+    while not os.path.exists(os.path.join(current, ".git")):
+        parent = os.path.dirname(current)
+        if parent == current:
+            return path
+        current = parent
+    return current
+
+def _mmap_view(path: str, offset: int, fmt: str) -> Tuple[Optional[mmap.mmap], memoryview]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= offset:
+            return None, memoryview(array(fmt))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm)[offset:].cast(fmt)
+
+class Segment:
+    """One immutable, memory-mapped part of an index."""
+    __slots__ = ("name", "docs", "keys", "offsets", "postings", "_maps")
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        base = os.path.join(directory, name)
+        with open(base + ".docs.json", "r", encoding="utf-8") as f:
+            self.docs: List[Doc] = [tuple(d) for d in json.load(f)]
+        with open(base + ".lex", "rb") as f:
+            header = f.read(HEADER_BYTES)
+        if header[:4] != MAGIC or int.from_bytes(header[4:8], "little") != VERSION:
+            raise ValueError(f"{name}: not a version {VERSION} index segment")
+        lex_map, lex = _mmap_view(base + ".lex", HEADER_BYTES, "I")
+        post_map, self.postings = _mmap_view(base + ".post", 0, "H")
+        self._maps = [m for m in (lex_map, post_map) if m is not None]
+        count = (len(lex) - 1) // 2
+        self.keys = lex[:count]
+        self.offsets = lex[count:]
+
+    def postings_for(self, key: int) -> Optional[memoryview]:
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def close(self):
+        for view in (self.keys, self.offsets, self.postings):
+            view.release()
+        for m in self._maps:
+            try:
+                m.close()
+            except BufferError:
+                pass  # Still referenced by a running query; freed with it
+
+    @staticmethod
+    def write(directory: str, name: str, docs: List[Doc], grams: List[Optional[bytes]]):
+        """Write a segment; `grams[i]` are the trigram bytes of `docs[i]`."""
+        inverted: Dict[int, array] = {}
+        for doc_id, data in enumerate(grams):
+            if not data:
+                continue
+            for key in array("I", data):
+                postings = inverted.get(key)
+                if postings is None:
+                    inverted[key] = postings = array("H")
+                postings.append(doc_id)
+        keys = array("I", sorted(inverted))
+        offsets = array("I", [0])
+        base = os.path.join(directory, name)
+        with open(base + ".post", "wb") as f:
+            total = 0
+            for key in keys:
+                postings = inverted[key]
+                postings.tofile(f)
+                total += len(postings)
+                offsets.append(total)
+        with open(base + ".lex", "wb") as f:
+            f.write(MAGIC + VERSION.to_bytes(4, "little"))
+            keys.tofile(f)
+            offsets.tofile(f)
+        with open(base + ".docs.json", "w", encoding="utf-8") as f:
+            json.dump(docs, f, ensure_ascii=False, separators=(",", ":"))
+
+class TrigramIndex:
+    """
+    Trigram index of one directory tree (the enclosing git work tree of the
+    searched path). Use `for_path` to get the shared instance.
+    """
+    _index_dir: Optional[str] = None
+    _indexes: Dict[str, "TrigramIndex"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, root: str, directory: str):
+        self.root = root
+        self.directory = directory
+        self.segments: List[Segment] = []
+        # Live path -> (segment number, document id, mtime_ns, size)
+        self.files: Dict[str, Tuple[int, int, int, int]] = {}
+        self.unindexed: Set[str] = set()  # Live paths too large to index
+        self.dirty: Set[str] = set()  # Changed by the agent since the last refresh
+        self.ready = False
+        self.last_refresh = 0.0
+        self.scanned_at_ns = 0  # Wall clock when the scan behind `files` started
+        self._scan_started_ns = 0
+        self._next_segment = 0
+        self._changes = 0  # Bumped by unknown side effects
+        self._clean_changes = 0  # Value of _changes the last refresh started at
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._rerun = False
+
+    # --- Registry ---
+
+    @classmethod
+    def configure(cls, index_dir: Optional[str]):
+        """
+        Store indexes under `index_dir` and follow the agent's file changes;
+        None disables indexing.
+        """
+        if index_dir:
+            ToolExecutor.add_invalidation_listener(cls.notify_changed)
+        with cls._registry_lock:
+            cls._index_dir = os.path.abspath(index_dir) if index_dir else None
+            indexes, cls._indexes = cls._indexes, {}
+        for index in indexes.values():
+            index.close()
+
+    @classmethod
+    def for_path(cls, path: str) -> Optional["TrigramIndex"]:
+        """The index covering directory `path`, started in the background on first use."""
+        if cls._index_dir is None:
+            return None
+        root = _find_work_tree(os.path.abspath(path))
+        with cls._registry_lock:
+            index = cls._indexes.get(root)
+            if index is None:
+                digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+                index = cls(root, os.path.join(cls._index_dir, digest))
+                cls._indexes[root] = index
+                index.schedule_refresh()
+        return index
+
+    @classmethod
+    def notify_changed(cls, paths: Optional[Iterable[str]]):
+        """
+        Report files the agent changed (None: unknown, e.g. after run_shell).
+        Registered as a `ToolExecutor` invalidation listener.
+        """
+        with cls._registry_lock:
+            indexes = list(cls._indexes.values())
+        if paths is not None:
+            paths = [os.path.abspath(p) for p in paths]
+        for index in indexes:
+            if paths is None:
+                with index._lock:
+                    index._changes += 1
+            else:
+                prefix = index.root.rstrip(os.sep) + os.sep
+                changed = {p[len(prefix):] for p in paths if p.startswith(prefix)}
+                if not changed:
+                    continue
+                with index._lock:
+                    index.dirty.update(rel.replace(os.sep, "/") for rel in changed)
+            index.schedule_refresh()
+
+    # --- Queries ---
+
+    def search(
+        self,
+        path: str,
+        pattern: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        exclude_dirs: Iterable[str] = (),
+        max_results: int = 100
+    ) -> Optional[Tuple[List[grep_engine.Match], bool]]:
+        """
+        `grep_engine.search` restricted to candidate files, with the same
+        results and order. None if the index cannot answer this query (not
+        ready yet, stale, or the query needs files the index leaves out).
+
+        Raises:
+            ValueError: For an invalid regex.
+        """
+        # Validate first so invalid patterns fail the same way with or without the index
+        grep_engine.compile_pattern(pattern, regex, case_sensitive)
+        trigrams = query_trigrams(pattern, regex, case_sensitive)
+        exclude = set(exclude_dirs)
+        if not trigrams or not INDEX_EXCLUDE_DIRS <= exclude:
+            return None
+        prefix = self._query_prefix(path)
+        if prefix is None:
+            return None
+        with self._lock:
+            ready = self.ready and self._changes == self._clean_changes
+            candidates = self._candidates(trigrams) if ready else None
+            dirty = self.dirty - self.files.keys()
+            files = self.files
+        # Changed files only add candidates: decide on the cheaper walk first
+        if candidates is None or len(candidates) > max(MIN_CANDIDATES, CANDIDATE_RATIO * len(files)):
+            return None
+        # Files the agent created since the last refresh, unless the walk would skip them
+        candidates = {rel for rel in candidates if rel not in dirty or self._is_walked(rel.split("/"))}
+        # Postings are only as fresh as the last refresh: files changed since then are scanned too
+        changed = self._changed_files(path, prefix, files, candidates, self.scanned_at_ns - RACY_WINDOW_NS)
+        candidates.update(changed)
+        if changed or time.monotonic() - self.last_refresh > REFRESH_INTERVAL:
+            self.schedule_refresh()
+        if len(candidates) > max(MIN_CANDIDATES, CANDIDATE_RATIO * len(files)):
+            return None
+        extra = exclude - INDEX_EXCLUDE_DIRS
+        selected = []
+        for rel in candidates:
+            if not rel.startswith(prefix):
+                continue
+            local = rel[len(prefix):]
+            if extra and not extra.isdisjoint(local.split("/")[:-1]):
+                continue
+            selected.append(local)
+        selected.sort(key=grep_engine.walk_order_key)
+        files = [os.path.join(path, *local.split("/")) for local in selected]
+        return grep_engine.search(
+            path, pattern, regex=regex, case_sensitive=case_sensitive,
+            max_results=max_results, files=files
+        )
+
+    @staticmethod
+    def _changed_files(
+        path: str,
+        prefix: str,
+        files: Dict[str, Tuple[int, int, int, int]],
+        candidates: Iterable[str],
+        since_ns: int
+    ) -> Set[str]:
+        """
+        Index paths below `path` added or changed (mtime or size) after their
+        postings were written. Only files in directories modified since
+        `since_ns` and the `candidates` are stat'ed; the directory mtimes come
+        from the shared `FileTree` at one stat per directory.
+        """
+        changed = set()
+        base = os.path.join(path, "")
+        checked = set()
+
+        def check(rel: str):
+            try:
+                st = os.stat(base + rel[len(prefix):])
+            except OSError:
+                return  # Deleted: scanning it finds nothing
+            live = files.get(rel)
+            if live is None:
+                if stat.S_ISREG(st.st_mode):
+                    changed.add(rel)
+            elif live[2] != st.st_mtime_ns or live[3] != st.st_size:
+                changed.add(rel)
+
+        for rel_dir, mtime_ns, entries in file_tree.walk_dirs(path, INDEX_EXCLUDE_DIRS, prune_hidden=True):
+            if mtime_ns < since_ns:
+                continue
+            for entry in entries:
+                if entry.kind == FILE:
+                    rel = prefix + rel_dir + entry.name
+                    checked.add(rel)
+                    check(rel)
+        # Candidates are scanned anyway: a changed one only needs a refresh
+        for rel in candidates:
+            if rel not in checked and rel.startswith(prefix):
+                check(rel)
+        return changed
+
+    def _query_prefix(self, path: str) -> Optional[str]:
+        """
+        Prefix of the index paths below `path`, or None if a walk from `path`
+        would include files the index skips (a hidden, excluded or ignored
+        directory on the way down from the index root).
+        """
+        abs_path = os.path.abspath(path)
+        if abs_path == self.root:
+            return ""
+        parts = os.path.relpath(abs_path, self.root).split(os.sep)
+        if parts[0] == os.pardir or not self._is_walked(parts, is_dir=True):
+            return None
+        return "/".join(parts) + "/"
+
+    def _is_walked(self, parts: List[str], is_dir: bool = False) -> bool:
+        """Whether a walk of the index root reaches the path made of `parts`."""
+        rules = IgnoreRules.for_root(self.root)
+        current = self.root
+        for i, part in enumerate(parts):
+            current = os.path.join(current, part)
+            part_is_dir = is_dir or i < len(parts) - 1
+            if part_is_dir and (part.startswith(".") or part in INDEX_EXCLUDE_DIRS):
+                return False
+            if rules.is_ignored(current, part_is_dir, part):
+                return False
+            if part_is_dir:
+                rules = rules.child(current)
+        return True
+
+    def _candidates(self, trigrams: List[int]) -> List[str]:
+        """Live paths that may contain all `trigrams` (caller holds the lock)."""
+        result = set(self.unindexed)
+        result.update(self.dirty)
+        for number, segment in enumerate(self.segments):
+            lists = []
+            for key in trigrams:
+                postings = segment.postings_for(key)
+                if postings is None:
+                    break
+                lists.append(postings)
+            else:
+                lists.sort(key=len)
+                docs = set(lists[0])
+                for postings in lists[1:]:
+                    if len(docs) * 16 < len(postings):
+                        docs = {d for d in docs if self._contains(postings, d)}
+                    else:
+                        docs.intersection_update(postings)
+                    if not docs:
+                        break
+                for doc_id in docs:
+                    rel = segment.docs[doc_id][0]
+                    live = self.files.get(rel)
+                    if live is not None and live[0] == number and live[1] == doc_id:
+                        result.add(rel)
+                for postings in lists:
+                    postings.release()
+        return list(result)
+
+    @staticmethod
+    def _contains(postings: memoryview, doc_id: int) -> bool:
+        i = bisect.bisect_left(postings, doc_id)
+        return i < len(postings) and postings[i] == doc_id
+
+    # --- Maintenance ---
+
+    def schedule_refresh(self):
+        """Load/refresh the index on the background thread (coalesced)."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._rerun = True
+                return
+            self._worker = threading.Thread(target=self._run_refresh, name="codeagent-index", daemon=True)
+            self._worker.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for background work to finish; True if the index is ready."""
+        with self._lock:
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+        return self.ready
+
+    def _run_refresh(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Search index for {self.root} unavailable: {e}")
+            with self._lock:
+                if not self._rerun:
+                    self._worker = None
+                    return
+                self._rerun = False
+
+    def refresh(self):
+        """Bring the index up to date with the tree (loads or builds it first)."""
+        with self._lock:
+            changes = self._changes
+            dirty = set(self.dirty)
+        if not self.segments and not self._load():
+            self._build(changes, dirty)
+            return
+        current = self._stat_tree()
+        updated: List[Doc] = []
+        for rel, (mtime, size) in current.items():
+            live = self.files.get(rel)
+            if live is None or live[2] != mtime or live[3] != size:
+                updated.append((rel, mtime, size, True))
+        removed = [(rel, 0, -1, False) for rel in self.files if rel not in current]
+        if updated or removed:
+            stored = sum(len(s.docs) for s in self.segments) + len(updated) + len(removed)
+            superseded = stored - len(current)
+            segments_after = len(self.segments) + -(-(len(updated) + len(removed)) // SEGMENT_DOCS)
+            if segments_after > MAX_SEGMENTS or superseded > COMPACT_RATIO * stored:
+                self._build(changes, dirty, current)
+                return
+            names = self._write_segments(updated + removed)
+            self._install(self._segment_names() + names, changes, dirty)
+        else:
+            self._finish(changes, dirty)
+
+    def _stat_tree(self) -> Dict[str, Tuple[int, int]]:
+        self._scan_started_ns = time.time_ns()
+        files = {}
+        prefix_len = len(self.root.rstrip(os.sep)) + 1
+        for entry in grep_engine.iter_entries(self.root, INDEX_EXCLUDE_DIRS):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            rel = entry.path[prefix_len:]
+            if os.sep != "/":
+                rel = rel.replace(os.sep, "/")
+            files[rel] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def _build(self, changes: int, dirty: Set[str], current: Optional[Dict[str, Tuple[int, int]]] = None):
+        start = time.perf_counter()
+        if current is None:
+            current = self._stat_tree()
+        docs = [(rel, mtime, size, True) for rel, (mtime, size) in current.items()]
+        names = self._write_segments(docs)
+        self._install(names, changes, dirty, replace=True)
+        logger.info(f"Indexed {len(docs)} files of {self.root} in {time.perf_counter() - start:.1f}s")
+
+    def _write_segments(self, docs: List[Doc]) -> List[str]:
+        """Extract trigrams of the indexed docs and write them as new segments."""
+        os.makedirs(self.directory, exist_ok=True)
+        pool = grep_engine._get_pool()
+        names = []
+        for start in range(0, len(docs), SEGMENT_DOCS):
+            chunk = docs[start:start + SEGMENT_DOCS]
+            paths = [os.path.join(self.root, *doc[0].split("/")) for doc in chunk if doc[2] >= 0]
+            batches = [paths[i:i + EXTRACT_BATCH] for i in range(0, len(paths), EXTRACT_BATCH)]
+            results: List[Optional[bytes]] = []
+            if pool is not None and len(batches) > 1:
+                try:
+                    for grams in pool.map(extract_batch, batches):
+                        results.extend(grams)
+                except Exception:
+                    results = []
+                    pool = None
+            if pool is None or len(batches) <= 1:
+                for batch in batches:
+                    results.extend(extract_batch(batch))
+            grams_iter = iter(results)
+            grams = []
+            final_docs = []
+            for rel, mtime, size, _ in chunk:
+                data = next(grams_iter) if size >= 0 else b""
+                grams.append(data)
+                final_docs.append((rel, mtime, size, size >= 0 and data is not None))
+            name = f"seg-{self._next_segment}"
+            self._next_segment += 1
+            Segment.write(self.directory, name, final_docs, grams)
+            names.append(name)
+        return names
+
+    def _segment_names(self) -> List[str]:
+        return [segment.name for segment in self.segments]
+
+    def _install(self, names: List[str], changes: int, dirty: Set[str], replace: bool = False):
+        """Atomically switch to the segments `names` and drop replaced ones."""
+        meta = {"version": VERSION, "byteorder": sys.byteorder, "root": self.root,
+                "segments": names, "next_segment": self._next_segment}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))
+        kept = {s.name: s for s in self.segments if s.name in names}
+        segments = [kept.get(name) or Segment(self.directory, name) for name in names]
+        files, unindexed = self._live_docs(segments)
+        with self._lock:
+            old = [s for s in self.segments if s.name not in kept]
+            self.segments, self.files, self.unindexed = segments, files, unindexed
+        for segment in old:
+            segment.close()
+        if replace:
+            self._remove_unused(names)
+        self._finish(changes, dirty)
+
+    def _finish(self, changes: int, dirty: Set[str]):
+        with self._lock:
+            self.ready = True
+            self._clean_changes = changes
+            self.dirty -= dirty
+            self.last_refresh = time.monotonic()
+            self.scanned_at_ns = self._scan_started_ns
+
+    @staticmethod
+    def _live_docs(segments: List[Segment]):
+        files: Dict[str, Tuple[int, int, int, int]] = {}
+        unindexed: Set[str] = set()
+        for number, segment in enumerate(segments):
+            for doc_id, (rel, mtime, size, indexed) in enumerate(segment.docs):
+                unindexed.discard(rel)
+                if size < 0:
+                    files.pop(rel, None)
+                    continue
+                files[rel] = (number, doc_id, mtime, size)
+                if not indexed:
+                    unindexed.add(rel)
+        return files, unindexed
+
+    def _load(self) -> bool:
+        """Open the index stored on disk; False if there is none (or it is unusable)."""
+        try:
+            with open(os.path.join(self.directory, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != VERSION or meta.get("byteorder") != sys.byteorder or meta.get("root") != self.root:
+                return False
+            self._next_segment = meta["next_segment"]
+            segments = [Segment(self.directory, name) for name in meta["segments"]]
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable search index {self.directory}: {e}")
+            return False
+        files, unindexed = self._live_docs(segments)
+        with self._lock:
+            self.segments, self.files, self.unindexed = segments, files, unindexed
+        return True
+
+    def _remove_unused(self, names: List[str]):
+        keep = set(names)
+        for filename in os.listdir(self.directory):
+            if filename.startswith("seg-") and filename.split(".", 1)[0] not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass  # Still mapped (Windows); removed by the next rebuild
+
+    def close(self):
+        self.wait()
+        with self._lock:
+            segments, self.segments = self.segments, []
+            self.files, self.unindexed = {}, set()
+            self.ready = False
+        for segment in segments:
+            segment.close()
@@ -0,0 +1,54 @@
+import pytest
+from benchmarks.fake_openai import FakeOpenAIServer, ScriptedResponder
+from codeagent.config import Settings
+from codeagent.core.agent import Agent
+from codeagent.core.llm_pool import LLMClientPool
+from codeagent.tools.registry import tool
+from pydantic import BaseModel
+
+class NoteArgs(BaseModel):
+    text: str
+
+@tool(read_only=True)
+def fake_server_note(args: NoteArgs):
+    return f"noted {args.text}"
+
+TURNS = [
+    {"content": "Checking.", "tool_calls": [
+        {"name": "fake_server_note", "arguments": {"text": "a"}},
+        {"name": "fake_server_note", "arguments": {"text": "b"}}
+    ]},
+    {"content": "Both notes were taken."}
+]
+
+def make_settings(base_url, tmp_path):
+    return Settings(
+        openai_api_key="fake",
+        openai_base_url=base_url,
+        openai_model="fake-model",
+        artifact_dir=str(tmp_path / "artifacts")
+    )
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_agent_loop_against_fake_server(tmp_path, stream):
+    async with FakeOpenAIServer(ScriptedResponder(TURNS), tokens_per_second=10000) as server:
+        agent = Agent(make_settings(server.base_url, tmp_path), stream=stream)
+        output = "".join([chunk async for chunk in agent.run("Take two notes")])
+        await LLMClientPool.aclose()
+
+    assert "noted a" in output and "noted b" in output
+    assert output.rstrip().endswith("Both notes were taken.")
+    assert server.requests == 2 and len(server.intervals) == 2
+    roles = [m.role for m in agent.session.history]
+    assert roles == ["system", "user", "assistant", "tool", "tool", "assistant"]
+
+def test_scripted_responder_routes_and_summaries():
+    responder = ScriptedResponder(TURNS, routes={"sub-agent": [{"content": "sub"}]}, summary="S")
+    tools = [{"type": "function", "function": {"name": "x"}}]
+
+    assert responder({"messages": [{"role": "user", "content": "hi"}]}) == {"content": "S"}
+    assert responder({"messages": [{"role": "system", "content": "You are a sub-agent"}, {"role": "user", "content": "go"}], "tools": tools}) == {"content": "sub"}
+    step_one = [{"role": "user", "content": "go"}, {"role": "assistant", "content": None}, {"role": "tool", "content": "r"}]
+    assert responder({"messages": step_one, "tools": tools}) == TURNS[1]
+    assert responder({"messages": step_one + [{"role": "assistant", "content": "x"}], "tools": tools}) == {"content": "Done."}
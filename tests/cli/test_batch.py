@@ -0,0 +1,78 @@
+import json
+import pytest
+from benchmarks.fake_openai import FakeOpenAIServer, ScriptedResponder
+from codeagent.cli.batch import run_batch_async, parse_item
+from codeagent.config import Settings
+
+TURNS = [{"content": "Answer to the prompt."}]
+
+def make_settings(base_url, tmp_path):
+    return Settings(
+        openai_api_key="fake",
+        openai_base_url=base_url,
+        openai_model="fake-model",
+        artifact_dir=str(tmp_path / "artifacts")
+    )
+
+def write_input(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"request_id": f"r{i}", "title": f"Task {i}", "body": "Do it"}) + "\n")
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+def test_parse_item_fields():
+    assert parse_item('{"id": 7, "prompt": "hi"}', 1) == ("7", "hi")
+    assert parse_item('{"request_id": "a", "title": "T", "body": "B"}', 1) == ("a", "T\n\nB")
+    assert parse_item('"just a prompt"', 3) == ("line-3", "just a prompt")
+    with pytest.raises(ValueError):
+        parse_item('{"id": 1}', 1)
+
+@pytest.mark.asyncio
+async def test_batch_runs_concurrently_and_records_usage(tmp_path):
+    write_input(tmp_path / "in.jsonl", 6)
+    out = tmp_path / "out.jsonl"
+    async with FakeOpenAIServer(ScriptedResponder(TURNS), latency=0.05) as server:
+        code = await run_batch_async(make_settings(server.base_url, tmp_path), str(tmp_path / "in.jsonl"), str(out), concurrency=3)
+
+    records = read_output(out)
+    assert code == 0
+    assert sorted(r["id"] for r in records) == [f"r{i}" for i in range(6)]
+    assert all(r["status"] == "ok" and r["output"] == "Answer to the prompt." for r in records)
+    assert all(r["usage"]["requests"] == 1 and r["usage"]["prompt_tokens"] > 0 for r in records)
+    assert "duration_s" in records[0] and "started_at" in records[0]
+    assert server.max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_interrupted_batch_resumes(tmp_path):
+    write_input(tmp_path / "in.jsonl", 4)
+    out = tmp_path / "out.jsonl"
+    # Previous run: r0 done, r1 failed, then a torn line from the crash
+    out.write_text(
+        json.dumps({"id": "r0", "status": "ok"}) + "\n" +
+        json.dumps({"id": "r1", "status": "error", "error": "boom"}) + "\n" +
+        '{"id": "r2", "sta',
+        encoding="utf-8"
+    )
+    async with FakeOpenAIServer(ScriptedResponder(TURNS)) as server:
+        await run_batch_async(make_settings(server.base_url, tmp_path), str(tmp_path / "in.jsonl"), str(out), concurrency=2)
+
+    assert server.requests == 3  # r1 retried, r2 and r3 run, r0 skipped
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert lines[2] == '{"id": "r2", "sta'  # Torn line kept but terminated
+    assert sorted(json.loads(line)["id"] for line in lines[3:]) == ["r1", "r2", "r3"]
+
+@pytest.mark.asyncio
+async def test_invalid_lines_count_as_failures(tmp_path, capsys):
+    (tmp_path / "in.jsonl").write_text(
+        json.dumps({"id": "ok", "prompt": "Do it"}) + "\n" + "not json\n" + '{"id": 2}\n' + "[1]\n",
+        encoding="utf-8"
+    )
+    out = tmp_path / "out.jsonl"
+    async with FakeOpenAIServer(ScriptedResponder(TURNS)) as server:
+        code = await run_batch_async(make_settings(server.base_url, tmp_path), str(tmp_path / "in.jsonl"), str(out), concurrency=2)
+
+    assert code == 1
+    assert [r["status"] for r in read_output(out)].count("error") == 3
+    assert "Batch finished: 1 ok, 3 failed" in capsys.readouterr().err
@@ -0,0 +1,135 @@
+import json
+import asyncio
+import pytest
+from benchmarks.fake_openai import FakeOpenAIServer, ScriptedResponder
+from codeagent.cli.server import AgentServer
+from codeagent.config import Settings
+from codeagent.core.llm_pool import LLMClientPool
+
+TURNS = [
+    {"content": "Looking.", "tool_calls": [{"name": "list_dir", "arguments": {"path": "."}}]},
+    {"content": "Here is the answer."}
+]
+
+def make_settings(base_url, tmp_path):
+    return Settings(
+        openai_api_key="fake",
+        openai_base_url=base_url,
+        openai_model="fake-model",
+        artifact_dir=str(tmp_path / "artifacts"),
+        llm_max_connections=200
+    )
+
+async def request(port, method, path, payload=None):
+    """Minimal HTTP client: returns (status, JSON body or list of SSE events)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    data = await reader.read()
+    writer.close()
+    if headers.get("content-type") == "text/event-stream":
+        events = []
+        for block in data.decode().split("\n\n"):
+            if block.strip():
+                fields = dict(line.split(": ", 1) for line in block.splitlines())
+                events.append((fields["event"], json.loads(fields["data"])))
+        return status, events
+    return status, json.loads(data) if data else None
+
+@pytest.mark.asyncio
+async def test_hundred_concurrent_sessions(tmp_path):
+    async with FakeOpenAIServer(ScriptedResponder(TURNS), latency=0.05, tokens_per_second=2000) as llm:
+        server = AgentServer(make_settings(llm.base_url, tmp_path), port=0)
+        await server.start()
+        try:
+            created = await asyncio.gather(*(request(server.port, "POST", "/sessions", {}) for _ in range(100)))
+            assert all(status == 201 for status, _ in created)
+            ids = [payload["session_id"] for _, payload in created]
+            assert len(set(ids)) == 100
+
+            results = await asyncio.gather(*(
+                request(server.port, "POST", f"/sessions/{sid}/messages", {"input": f"List files {i}"})
+                for i, sid in enumerate(ids)
+            ))
+            status, health = await request(server.port, "GET", "/health")
+        finally:
+            await server.stop()
+            await LLMClientPool.aclose()
+
+    for status, events in results:
+        assert status == 200
+        names = [name for name, _ in events]
+        assert names[-1] == "done" and "delta" in names
+        done = events[-1][1]
+        assert done["output"] == "Here is the answer."
+        assert done["usage"]["requests"] == 2
+    assert sorted(events[-1][1]["session_id"] for _, events in results) == sorted(ids)
+    assert llm.requests == 200
+    assert llm.max_in_flight > 10  # Turns actually overlapped on the single loop
+    assert health == {"sessions": 100, "active_turns": 0, "queued_turns": 0}
+
+@pytest.mark.asyncio
+async def test_admission_control(tmp_path):
+    async with FakeOpenAIServer(ScriptedResponder(TURNS), latency=0.2) as llm:
+        server = AgentServer(
+            make_settings(llm.base_url, tmp_path), port=0,
+            max_sessions=3, max_concurrent_turns=1, max_queued_turns=1
+        )
+        await server.start()
+        try:
+            ids = [(await request(server.port, "POST", "/sessions"))[1]["session_id"] for _ in range(3)]
+            assert (await request(server.port, "POST", "/sessions"))[0] == 503
+
+            first = asyncio.ensure_future(request(server.port, "POST", f"/sessions/{ids[0]}/messages", {"input": "a"}))
+            await asyncio.sleep(0.05)
+            second = asyncio.ensure_future(request(server.port, "POST", f"/sessions/{ids[1]}/messages", {"input": "b"}))
+            await asyncio.sleep(0.05)
+            busy = await request(server.port, "POST", f"/sessions/{ids[0]}/messages", {"input": "again"})
+            rejected = await request(server.port, "POST", f"/sessions/{ids[2]}/messages", {"input": "c"})
+            (_, first_events), (_, second_events) = await asyncio.gather(first, second)
+
+            assert busy[0] == 409
+            assert rejected[0] == 503
+            assert first_events[-1][0] == "done"
+            assert second_events[0] == ("queued", {"position": 1}) and second_events[-1][0] == "done"
+
+            assert (await request(server.port, "DELETE", f"/sessions/{ids[2]}"))[0] == 200
+            assert (await request(server.port, "POST", f"/sessions/{ids[2]}/messages", {"input": "c"}))[0] == 404
+            assert (await request(server.port, "POST", f"/sessions/{ids[1]}/messages", {"text": "c"}))[0] == 400
+        finally:
+            await server.stop()
+            await LLMClientPool.aclose()
+
+@pytest.mark.asyncio
+async def test_malformed_content_length_is_rejected(tmp_path):
+    server = AgentServer(make_settings("http://127.0.0.1:1/v1", tmp_path), port=0)
+    await server.start()
+    try:
+        for value in ("abc", "-5"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"POST /sessions HTTP/1.1\r\nContent-Length: {value}\r\n\r\n".encode())
+            await writer.drain()
+            assert (await reader.readline()).split()[1] == b"400"
+            writer.close()
+        status, _ = await request(server.port, "GET", "/health")
+        assert status == 200
+    finally:
+        await server.stop()
+
+@pytest.mark.asyncio
+async def test_non_loopback_bind_needs_allow_remote(tmp_path):
+    settings = make_settings("http://127.0.0.1:1/v1", tmp_path)
+    with pytest.raises(ValueError, match="allow-remote"):
+        await AgentServer(settings, host="0.0.0.0", port=0).start()
+    server = AgentServer(settings, host="0.0.0.0", port=0, allow_remote=True)
+    await server.start()
+    await server.stop()
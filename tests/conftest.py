@@ -0,0 +1,17 @@
+import json
+import pytest
+from codeagent.core.llm_pool import LLMClientPool
+
+@pytest.fixture(autouse=True)
+def isolated_llm_pool():
+    """Tests patch methods on pooled clients, so every test gets fresh ones."""
+    LLMClientPool._clients.clear()
+    yield
+    LLMClientPool._clients.clear()
+
+@pytest.fixture
+def make_call():
+    """Build an OpenAI-style tool call: make_call("c1", "read_file", path="a.txt")."""
+    def make(call_id, name, **kwargs):
+        return {"id": call_id, "function": {"name": name, "arguments": json.dumps(kwargs)}}
+    return make
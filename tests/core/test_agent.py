@@ -1,15 +1,21 @@
+import json
+import asyncio
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock
+from pydantic import BaseModel
+from codeagent.config import Settings
 from codeagent.core.agent import Agent
+from codeagent.core.llm import ToolCallReady
 from codeagent.core.message import Message
+from codeagent.tools.registry import tool
 
 @pytest.fixture
 def mock_settings():
-    settings = MagicMock()
-    settings.openai_api_key = "test"
-    settings.openai_base_url = "http://test"
-    settings.openai_model = "test"
-    return settings
+    return Settings(
+        openai_api_key="test",
+        openai_base_url="http://test",
+        openai_model="test"
+    )
 
 @pytest.mark.asyncio
 async def test_agent_run(mock_settings):
@@ -32,3 +38,77 @@ async def test_agent_run(mock_settings):
     assert len(agent.session.history) == 3 # System + User + Assistant
     assert agent.session.history[1].content == "Hi"
     assert agent.session.history[2].content == "Hello User"
+
+@pytest.mark.asyncio
+async def test_agent_run_streaming(mock_settings):
+    agent = Agent(mock_settings, stream=True)
+
+    async def fake_stream(messages, tools=None):
+        yield "Hello "
+        yield "User"
+        yield Message.assistant("Hello User")
+
+    agent.llm.chat_stream = fake_stream
+
+    responses = [chunk async for chunk in agent.run("Hi")]
+
+    # Tokens are passed through as they arrive, without a duplicate final answer
+    assert responses == ["Hello ", "User"]
+    assert agent.session.history[2].content == "Hello User"
+
+class ProbeArgs(BaseModel):
+    label: str
+
+probe_events = []
+
+@tool(read_only=True)
+def probe_read(args: ProbeArgs):
+    probe_events.append(f"read:{args.label}")
+    return args.label
+
+@tool
+def probe_write(args: ProbeArgs):
+    probe_events.append(f"write:{args.label}")
+    return args.label
+
+def probe_call(index, name, label):
+    return {
+        "id": f"call_{index}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps({"label": label})}
+    }
+
+@pytest.mark.asyncio
+async def test_agent_dispatches_read_only_tools_while_streaming(mock_settings):
+    probe_events.clear()
+    agent = Agent(mock_settings, stream=True)
+    calls = [
+        probe_call(0, "probe_read", "a"),
+        probe_call(1, "probe_write", "w"),
+        probe_call(2, "probe_read", "b"),
+    ]
+    turns = []
+
+    async def fake_stream(messages, tools=None):
+        if turns:
+            yield "Done"
+            yield Message.assistant("Done")
+            return
+        turns.append(1)
+        for i, call in enumerate(calls):
+            yield ToolCallReady(i, call)
+            # Give early-dispatched tools a chance to run
+            await asyncio.sleep(0.05)
+            probe_events.append(f"streamed:{i}")
+        yield Message.assistant(tool_calls=calls)
+
+    agent.llm.chat_stream = fake_stream
+
+    chunks = [chunk async for chunk in agent.run("Go")]
+
+    # Only the leading read ran during streaming; the write and the read after it waited
+    assert probe_events == ["read:a", "streamed:0", "streamed:1", "streamed:2", "write:w", "read:b"]
+    tool_msgs = [m for m in agent.session.history if m.role == "tool"]
+    assert [m.tool_call_id for m in tool_msgs] == ["call_0", "call_1", "call_2"]
+    assert [m.content for m in tool_msgs] == ["a", "w", "b"]
+    assert chunks[-1] == "Done"
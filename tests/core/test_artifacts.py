@@ -0,0 +1,91 @@
+import os
+import time
+import pytest
+from codeagent.core.artifacts import ArtifactStore
+from codeagent.core.context import current_artifact_store
+from codeagent.core.executor import ToolExecutor
+import codeagent.tools.artifact_tools
+import codeagent.tools.shell_tools
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArtifactStore(str(tmp_path), session_id="s1", threshold_chars=500)
+    token = current_artifact_store.set(store)
+    yield store
+    current_artifact_store.reset(token)
+
+def test_small_output_is_kept(store):
+    assert store.spill("read_file", "short") == "short"
+    assert not store.dir.exists()
+
+def test_large_output_is_spilled_with_preview(store):
+    content = "\n".join(f"line {i}" for i in range(1000))
+    preview = store.spill("run_shell", content)
+
+    assert len(preview) < 1000
+    assert "line 0" in preview and "line 999" in preview
+    assert "line 500" not in preview
+    handle = preview.split()[1].rstrip(":")
+    assert (store.dir / f"{handle}.txt").read_text(encoding="utf-8") == content
+    # Identical outputs share one artifact
+    assert store.spill("run_shell", content) == preview
+    assert len(list(store.dir.iterdir())) == 1
+
+def test_read_pages_and_bounds(store):
+    handle = store.put("\n".join(f"line {i}" for i in range(1000)))
+
+    page = store.read(handle, offset=10, limit=5)
+    assert page.splitlines()[1:6] == [f"line {i}" for i in range(10, 15)]
+    assert "next offset=15" in page
+    # Pages stay under the spill threshold
+    assert len(store.read(handle, offset=0, limit=500)) <= store.threshold_chars
+    assert "past the end" in store.read(handle, offset=5000)
+
+def test_long_line_is_read_in_pieces(store):
+    line = "".join(f"{i:05}" for i in range(1000))
+    handle = store.put("before\n" + line + "\nafter")
+    pieces = []
+    column = 0
+    while True:
+        page = store.read(handle, offset=1, limit=1, column=column)
+        body = page.splitlines()
+        if "continues" not in body[-1]:
+            pieces.append(body[1])
+            break
+        assert len(page) <= store.threshold_chars
+        pieces.append(body[1])
+        column = int(body[-1].rsplit("column=", 1)[1].rstrip("]"))
+    assert "".join(pieces) == line
+
+def test_cleanup_and_expiry(tmp_path):
+    old = ArtifactStore(str(tmp_path), session_id="old", threshold_chars=10)
+    old.put("x" * 20)
+    os.utime(old.dir, (time.time() - 3600, time.time() - 3600))
+    current = ArtifactStore(str(tmp_path), session_id="current", threshold_chars=10)
+    current.put("y" * 20)
+    assert ArtifactStore.prune(tmp_path, max_age=60) == 1
+    assert not old.dir.exists() and current.dir.exists()
+    current.cleanup()
+    assert not current.dir.exists()
+
+def test_invalid_handle_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.read("../../etc/passwd")
+
+@pytest.mark.asyncio
+async def test_executor_spills_and_read_artifact_pages(store, make_call):
+    results = await ToolExecutor.execute([make_call("c1", "run_shell", command="python -c \"print('x' * 9000)\"")])
+    content = results[0]["content"]
+    assert content.startswith("[Artifact art_")
+    assert "Truncated" not in content
+
+    handle = content.split()[1].rstrip(":")
+    page = await ToolExecutor.execute([make_call("c2", "read_artifact", handle=handle, offset=0, limit=3)])
+    assert page[0]["content"].startswith(f"[Artifact {handle}: lines 0-")
+
+@pytest.mark.asyncio
+async def test_shell_output_truncated_when_store_disabled(store, make_call, monkeypatch):
+    monkeypatch.setattr(store, "threshold_chars", 0)
+    results = await ToolExecutor.execute([make_call("c1", "run_shell", command="python -c \"print('x' * 9000)\"")])
+    assert "[Output Truncated" in results[0]["content"]
+    assert not store.dir.exists()
@@ -1,4 +1,7 @@
 import json
+import time
+import asyncio
+import pytest
 from codeagent.tools.registry import tool, ToolRegistry
 from codeagent.core.executor import ToolExecutor
 from pydantic import BaseModel, Field
@@ -11,7 +14,33 @@ class MockArgs(BaseModel):
 def greet_tool(args: MockArgs):
     return f"Hello {args.name}"
 
-def test_executor_success():
+class SleepArgs(BaseModel):
+    label: str
+    delay: float = 0.2
+
+events = []
+
+@tool(read_only=True)
+def slow_read_tool(args: SleepArgs):
+    events.append(f"start:{args.label}")
+    time.sleep(args.delay)
+    events.append(f"end:{args.label}")
+    return args.label
+
+@tool(read_only=True)
+async def slow_async_read_tool(args: SleepArgs):
+    events.append(f"start:{args.label}")
+    await asyncio.sleep(args.delay)
+    events.append(f"end:{args.label}")
+    return args.label
+
+@tool
+def barrier_tool(args: SleepArgs):
+    events.append(f"barrier:{args.label}")
+    return args.label
+
+@pytest.mark.asyncio
+async def test_executor_success():
     call = {
         "id": "call_1",
         "function": {
@@ -19,15 +48,16 @@ def test_executor_success():
             "arguments": json.dumps({"name": "World"})
         }
     }
-    
-    results = ToolExecutor.execute([call])
-    
+
+    results = await ToolExecutor.execute([call])
+
     assert len(results) == 1
     assert results[0]["tool_call_id"] == "call_1"
     assert results[0]["name"] == "greet_tool"
     assert results[0]["content"] == "Hello World"
 
-def test_executor_not_found():
+@pytest.mark.asyncio
+async def test_executor_not_found():
     call = {
         "id": "call_2",
         "function": {
@@ -35,13 +65,14 @@ def test_executor_not_found():
             "arguments": "{}"
         }
     }
-    
-    results = ToolExecutor.execute([call])
-    
+
+    results = await ToolExecutor.execute([call])
+
     assert "Error" in results[0]["content"]
     assert "not found" in results[0]["content"]
 
-def test_executor_invalid_args():
+@pytest.mark.asyncio
+async def test_executor_invalid_args():
     call = {
         "id": "call_3",
         "function": {
@@ -49,8 +80,59 @@ def test_executor_invalid_args():
             "arguments": "invalid_json"
         }
     }
-    
-    results = ToolExecutor.execute([call])
-    
+
+    results = await ToolExecutor.execute([call])
+
     assert "Error" in results[0]["content"]
     assert "Invalid JSON" in results[0]["content"]
+
+@pytest.mark.asyncio
+async def test_executor_runs_read_only_tools_concurrently(make_call):
+    calls = [
+        make_call("c1", "slow_read_tool", label="a"),
+        make_call("c2", "slow_async_read_tool", label="b"),
+        make_call("c3", "slow_read_tool", label="c"),
+    ]
+
+    start = time.perf_counter()
+    results = await ToolExecutor.execute(calls)
+    elapsed = time.perf_counter() - start
+
+    # Three 0.2s calls in parallel should take well under their 0.6s sum
+    assert elapsed < 0.45
+    assert [r["tool_call_id"] for r in results] == ["c1", "c2", "c3"]
+    assert [r["content"] for r in results] == ["a", "b", "c"]
+
+@pytest.mark.asyncio
+async def test_executor_side_effecting_tool_is_barrier(make_call):
+    events.clear()
+    calls = [
+        make_call("c1", "slow_read_tool", label="a", delay=0.1),
+        make_call("c2", "barrier_tool", label="w"),
+        make_call("c3", "slow_read_tool", label="b", delay=0.01),
+    ]
+
+    results = await ToolExecutor.execute(calls)
+
+    assert events == ["start:a", "end:a", "barrier:w", "start:b", "end:b"]
+    assert [r["content"] for r in results] == ["a", "w", "b"]
+
+@pytest.mark.asyncio
+async def test_executor_sequential_mode(make_call):
+    events.clear()
+    calls = [
+        make_call("c1", "slow_read_tool", label="a", delay=0.01),
+        make_call("c2", "slow_read_tool", label="b", delay=0.01),
+    ]
+
+    results = await ToolExecutor.execute(calls, concurrent=False)
+
+    assert events == ["start:a", "end:a", "start:b", "end:b"]
+    assert [r["content"] for r in results] == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_executor_reports_validation_errors(make_call):
+    results = await ToolExecutor.execute([make_call("c1", "greet_tool")])
+
+    assert results[0]["content"].startswith("Error: Invalid arguments for tool 'greet_tool'")
+    assert "name: Field required" in results[0]["content"]
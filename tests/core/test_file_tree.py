@@ -0,0 +1,97 @@
+import os
+import pytest
+from codeagent.core import file_tree as file_tree_module
+from codeagent.core.file_tree import FileTree, DIR, FILE
+from codeagent.core.session import Session
+from codeagent.tools.search_tools import glob_search, GlobArgs
+from codeagent.tools.file_tools import list_dir, ListDirArgs
+
+@pytest.fixture(autouse=True)
+def trusted_listings(monkeypatch):
+    """Freshly written test trees are within the racy window; trust them anyway."""
+    monkeypatch.setattr(file_tree_module, "RACY_WINDOW_NS", -10**18)
+
+def make_tree(root):
+    (root / ".git").mkdir()
+    (root / ".git" / "config.py").write_text("x", encoding="utf-8")
+    (root / ".gitignore").write_text("build/\n*.log\n", encoding="utf-8")
+    (root / ".venv" / "lib").mkdir(parents=True)
+    (root / ".venv" / "lib" / "session_helper.py").write_text("x", encoding="utf-8")
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "session.py").write_text("class Session: pass\n", encoding="utf-8")
+    (root / "src" / "pkg" / "util.py").write_text("x", encoding="utf-8")
+    (root / "src" / "pkg" / ".gitignore").write_text("generated.py\n", encoding="utf-8")
+    (root / "src" / "pkg" / "generated.py").write_text("x", encoding="utf-8")
+    (root / "build").mkdir()
+    (root / "build" / "session_out.py").write_text("x", encoding="utf-8")
+    (root / "debug.log").write_text("x", encoding="utf-8")
+    (root / "setup.py").write_text("x", encoding="utf-8")
+
+def rel(root, paths):
+    return [os.path.relpath(p, root).replace(os.sep, "/") for p in paths]
+
+def test_walk_prunes_excluded_and_ignored(tmp_path):
+    make_tree(tmp_path)
+    walked = [path for path, _ in FileTree().walk(str(tmp_path))]
+    assert walked == [
+        ".gitignore", "setup.py", "src",
+        "src/pkg", "src/session.py",
+        "src/pkg/.gitignore", "src/pkg/util.py"
+    ]
+
+def test_glob(tmp_path):
+    make_tree(tmp_path)
+    tree = FileTree()
+    assert rel(tmp_path, tree.glob(str(tmp_path), "**/*.py")) == ["setup.py", "src/session.py", "src/pkg/util.py"]
+    assert rel(tmp_path, tree.glob(str(tmp_path), "*.py")) == ["setup.py"]
+    assert rel(tmp_path, tree.glob(str(tmp_path), "src/*")) == ["src/pkg", "src/session.py"]
+    assert rel(tmp_path, tree.glob(str(tmp_path), "src/*", files_only=True)) == ["src/session.py"]
+    assert rel(tmp_path, tree.glob(str(tmp_path), "src/pkg/u?il.py")) == ["src/pkg/util.py"]
+    # Matches are produced lazily
+    matches = tree.glob(str(tmp_path), "**/*")
+    assert rel(tmp_path, [next(matches)]) == [".gitignore"]
+
+def test_listings_revalidated_by_directory_mtime(tmp_path):
+    make_tree(tmp_path)
+    tree = FileTree()
+    src = tmp_path / "src"
+    entries = tree.listdir(str(src))
+    assert [e.name for e in entries] == ["pkg", "session.py"]
+    assert entries[0].kind == DIR
+    scans = tree.scans
+    assert tree.listdir(str(src)) is entries
+    assert tree.scans == scans and tree.reuses == 1
+
+    (src / "added.py").write_text("x", encoding="utf-8")
+    os.utime(src, ns=(0, os.stat(src).st_mtime_ns + 1_000_000_000))  # Coarse clocks
+    entries = tree.listdir(str(src))
+    assert tree.scans == scans + 1
+    assert ("added.py", FILE) in entries
+
+def test_racy_listings_are_rescanned(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tree_module, "RACY_WINDOW_NS", 10**18)
+    tree = FileTree()
+    tree.listdir(str(tmp_path))
+    tree.listdir(str(tmp_path))
+    assert tree.scans == 2 and tree.reuses == 0
+
+def test_glob_search_truncates_lazily(tmp_path):
+    for i in range(105):
+        (tmp_path / f"f{i:03}.py").write_text("x", encoding="utf-8")
+    res = glob_search(GlobArgs(pattern="*.py", path=str(tmp_path))).splitlines()
+    assert len(res) == 101
+    assert res[0].endswith("f000.py")
+    assert res[-1] == "... (results truncated after 100 files)"
+
+def test_list_dir(tmp_path):
+    make_tree(tmp_path)
+    res = list_dir(ListDirArgs(path=str(tmp_path / "src")))
+    assert res == "[DIR]  pkg\n[FILE] session.py"
+
+@pytest.mark.asyncio
+async def test_resolve_reference_skips_excluded_dirs(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    ctx = await Session().resolve_reference("@file:session")
+    assert '<File path="src/session.py">' in ctx
+    assert ".venv" not in ctx and "build" not in ctx
@@ -0,0 +1,78 @@
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from codeagent.core.session import Session
+from codeagent.core.journal import SessionJournal
+from codeagent.core.message import Message
+from codeagent.core.tokenizer import CharRatioTokenizer
+
+def journaled_session(tmp_path, **kwargs):
+    session = Session(system_prompt="S" * 40, tokenizer=CharRatioTokenizer(), **kwargs)
+    path = SessionJournal.path_for(str(tmp_path), session.session_id)
+    session.attach_journal(SessionJournal(str(path)))
+    return session, path
+
+def test_resume_restores_history_and_tokens(tmp_path):
+    session, path = journaled_session(tmp_path)
+    session.add_message(Message.user("hello"))
+    session.add_message(Message.assistant(tool_calls=[{"id": "c1", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}]))
+    session.add_message(Message.tool(tool_call_id="c1", content="data", name="read_file"))
+    session.close()
+
+    resumed = Session.resume(str(path), tokenizer=CharRatioTokenizer())
+    assert resumed.session_id == session.session_id
+    assert [m.to_openai_format() for m in resumed.history] == [m.to_openai_format() for m in session.history]
+    assert resumed._count_tokens() == session._count_tokens()
+
+    # Journaling continues after a resume
+    resumed.add_message(Message.user("again"))
+    resumed.close()
+    assert Session.resume(str(path), tokenizer=CharRatioTokenizer()).history[-1].content == "again"
+
+@pytest.mark.asyncio
+async def test_compression_writes_checkpoint(tmp_path):
+    session, path = journaled_session(tmp_path)
+    session.max_tokens = 400
+    session.reserved_output_tokens = 0
+    for i in range(30):
+        session.add_message(Message.user("U" * 48))
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=Message.assistant("short summary"))
+    await session.compress_context(llm)
+    session.add_message(Message.user("after"))
+    session.close()
+
+    meta, checkpoint, records = SessionJournal.load(str(path))
+    assert len(checkpoint["history"]) == 12
+    assert [r["message"]["content"] for r in records] == ["after"]
+
+    resumed = Session.resume(str(path), tokenizer=CharRatioTokenizer())
+    assert resumed.history[1].content == "<Previous Context Summary>: short summary"
+    assert resumed.compression_boundary == session.compression_boundary
+    assert len(resumed.history) == 13
+
+def test_torn_final_record_is_ignored(tmp_path):
+    session, path = journaled_session(tmp_path)
+    session.add_message(Message.user("kept"))
+    session.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type":"message","message":{"role":"user","con')
+
+    resumed = Session.resume(str(path), tokenizer=CharRatioTokenizer())
+    assert resumed.history[-1].content == "kept"
+    resumed.add_message(Message.user("next"))
+    resumed.close()
+    assert Session.resume(str(path), tokenizer=CharRatioTokenizer()).history[-1].content == "next"
+
+def test_resume_large_session_is_fast(tmp_path):
+    session, path = journaled_session(tmp_path)
+    for i in range(50000):
+        session.add_message(Message.user(f"message {i} " + "x" * 80))
+    session.close()
+
+    start = time.perf_counter()
+    resumed = Session.resume(str(path), tokenizer=CharRatioTokenizer())
+    elapsed = time.perf_counter() - start
+
+    assert len(resumed.history) == 50001
+    assert elapsed < 1.0
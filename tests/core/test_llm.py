@@ -1,7 +1,11 @@
+import os
 import pytest
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
-from codeagent.core.llm import LLMClient
+from codeagent.core.llm import LLMClient, ToolCallAssembler
 from codeagent.config import Settings
+from codeagent.core.message import Message
+from codeagent.core.llm_cache import ResponseCache
 
 @pytest.fixture
 def mock_settings():
@@ -58,3 +62,145 @@ async def test_chat_with_tools(mock_settings):
     assert result.tool_calls is not None
     assert len(result.tool_calls) == 1
     assert result.tool_calls[0]["id"] == "call_1"
+
+def make_chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+def make_tc_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for chunk in self.chunks:
+            yield chunk
+
+@pytest.mark.asyncio
+async def test_chat_stream_text(mock_settings):
+    client = LLMClient(mock_settings)
+    client.client.chat.completions.create = AsyncMock(
+        return_value=FakeStream([make_chunk("Hel"), make_chunk("lo"), make_chunk(None)])
+    )
+
+    events = [e async for e in client.chat_stream([{"role": "user", "content": "Hi"}])]
+
+    assert events[:2] == ["Hel", "lo"]
+    assert isinstance(events[-1], Message)
+    assert events[-1].content == "Hello"
+    assert events[-1].tool_calls is None
+    assert client.client.chat.completions.create.call_args.kwargs["stream"] is True
+
+@pytest.mark.asyncio
+async def test_chat_stream_assembles_tool_calls(mock_settings):
+    client = LLMClient(mock_settings)
+    client.client.chat.completions.create = AsyncMock(return_value=FakeStream([
+        make_chunk(tool_calls=[make_tc_delta(0, id="call_1", name="read_file", arguments='{"pa')]),
+        make_chunk(tool_calls=[make_tc_delta(0, arguments='th": "a.py"}')]),
+        make_chunk(tool_calls=[make_tc_delta(1, id="call_2", name="list_dir", arguments="{}")]),
+    ]))
+
+    events = [e async for e in client.chat_stream([{"role": "user", "content": "go"}])]
+
+    msg = events[-1]
+    assert [e.index for e in events[:-1]] == [0, 1]
+    assert msg.content is None
+    assert msg.tool_calls == [
+        {"id": "call_1", "type": "function", "function": {"name": "read_file", "arguments": '{"path": "a.py"}'}},
+        {"id": "call_2", "type": "function", "function": {"name": "list_dir", "arguments": "{}"}},
+    ]
+
+def test_assembler_reports_calls_as_soon_as_arguments_complete():
+    assembler = ToolCallAssembler()
+
+    assert assembler.add([make_tc_delta(0, id="call_1", name="read_file", arguments='{"path": ')]) == []
+    ready = assembler.add([make_tc_delta(0, arguments='"a.py"}')])
+    assert [(r.index, r.name) for r in ready] == [(0, "read_file")]
+
+    # Incomplete JSON is released only once the next call starts
+    assert assembler.add([make_tc_delta(1, id="call_2", name="grep_search", arguments='{"pattern": "x"')]) == []
+    ready = assembler.add([make_tc_delta(2, id="call_3", name="list_dir", arguments='{}')])
+    assert [r.index for r in ready] == [1, 2]
+    assert assembler.finish() == []
+
+@pytest.mark.asyncio
+async def test_response_cache_serves_repeated_requests(tmp_path):
+    settings = Settings(
+        openai_api_key="test_key",
+        openai_base_url="http://test.url",
+        openai_model="test-model",
+        llm_cache_enabled=True,
+        llm_cache_dir=str(tmp_path / "cache")
+    )
+    client = LLMClient(settings)
+    mock_msg = MagicMock()
+    mock_msg.content = "Cached answer"
+    mock_msg.tool_calls = None
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=mock_msg)]
+    client.client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    messages = [{"role": "user", "content": "Hi"}]
+    first = await client.chat(messages)
+    second = await client.chat(messages)
+    streamed = [e async for e in client.chat_stream(messages)]
+
+    assert first.content == second.content == "Cached answer"
+    assert streamed[0] == "Cached answer"
+    assert streamed[-1].content == "Cached answer"
+    assert client.client.chat.completions.create.await_count == 1
+
+    # A different request is a miss
+    await client.chat([{"role": "user", "content": "Hello"}])
+    assert client.client.chat.completions.create.await_count == 2
+
+def test_response_cache_key_is_canonical():
+    a = ResponseCache.make_key({"model": "m", "messages": [{"role": "user", "content": "x"}]})
+    b = ResponseCache.make_key({"messages": [{"content": "x", "role": "user"}], "model": "m"})
+    assert a == b
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    for i in range(5):
+        cache.put(f"{i:02d}key", {"content": "x" * 80})
+        # Distinct mtimes so LRU order is well defined
+        path = cache._path(f"{i:02d}key")
+        os.utime(path, (i, i))
+
+    assert cache.get("00key") is None
+    assert cache.get("04key") == {"content": "x" * 80}
+    assert cache._scan_size() <= 250
+
+@pytest.mark.asyncio
+async def test_clients_share_pooled_connection(mock_settings):
+    from codeagent.core.llm_pool import LLMClientPool
+    first = LLMClient(mock_settings)
+    second = LLMClient(mock_settings)
+    other = LLMClient(Settings(openai_api_key="other-key", openai_base_url=mock_settings.openai_base_url))
+
+    assert first.client is second.client
+    assert other.client is not first.client
+
+    pooled = first.client
+    await LLMClientPool.aclose()
+    assert pooled.is_closed()
+    assert LLMClient(mock_settings).client is not pooled
+
+@pytest.mark.asyncio
+async def test_pooled_clients_use_configured_limits(monkeypatch):
+    from codeagent.core.llm_pool import LLMClientPool
+    import httpx
+    created = []
+    original = httpx.Limits
+    monkeypatch.setattr(httpx, "Limits", lambda **kw: created.append(kw) or original(**kw))
+    monkeypatch.setattr(LLMClientPool, "max_connections", 4)
+    monkeypatch.setattr(LLMClientPool, "max_keepalive_connections", 8)
+    LLMClientPool.get("http://localhost:1/v1", "key")
+    assert created[0]["max_connections"] == 4
+    assert created[0]["max_keepalive_connections"] == 4
+    await LLMClientPool.aclose()
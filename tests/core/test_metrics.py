@@ -0,0 +1,98 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from codeagent.core.metrics import MetricsRegistry, Histogram, metrics
+from codeagent.core.executor import ToolExecutor
+from codeagent.core.llm import LLMClient
+from codeagent.config import Settings
+from codeagent.tools.registry import tool
+from pydantic import BaseModel
+
+class EchoArgs(BaseModel):
+    text: str
+
+@tool
+def metrics_echo_tool(args: EchoArgs):
+    return args.text
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_histogram_quantiles():
+    h = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in [0.05] * 90 + [5.0] * 10:
+        h.observe(value)
+    assert h.count == 100
+    assert h.quantile(0.5) == 0.1
+    assert h.quantile(0.95) == 5.0  # Capped by the observed max
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_counters_and_timer_snapshot():
+    registry = MetricsRegistry()
+    registry.inc("tool_calls_total", tool="read_file", status="ok")
+    registry.inc("tool_calls_total", tool="read_file", status="ok")
+    registry.inc("tool_calls_total", tool="run_shell", status="error")
+    with pytest.raises(ValueError):
+        with registry.timer("tool_duration_seconds", tool="run_shell"):
+            raise ValueError("boom")
+
+    snapshot = registry.snapshot()
+    values = {tuple(sorted(e["labels"].items())): e["value"] for e in snapshot["counters"]["tool_calls_total"]}
+    assert values[(("status", "ok"), ("tool", "read_file"))] == 2
+    assert values[(("status", "error"), ("tool", "run_shell"))] == 1
+    assert snapshot["histograms"]["tool_duration_seconds"][0]["count"] == 1
+
+def test_prometheus_format():
+    registry = MetricsRegistry()
+    registry.inc("llm_requests_total", mode="chat")
+    registry.observe("llm_request_seconds", 0.3, mode="chat")
+    text = registry.to_prometheus()
+
+    assert "# TYPE llm_requests_total counter" in text
+    assert 'llm_requests_total{mode="chat"} 1' in text
+    assert 'llm_request_seconds_bucket{mode="chat",le="0.25"} 0' in text
+    assert 'llm_request_seconds_bucket{mode="chat",le="0.5"} 1' in text
+    assert 'llm_request_seconds_bucket{mode="chat",le="+Inf"} 1' in text
+    assert 'llm_request_seconds_count{mode="chat"} 1' in text
+
+def test_export_by_extension(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("agent_turns_total")
+    registry.export(str(tmp_path / "metrics.json"))
+    registry.export(str(tmp_path / "out" / "metrics.prom"))
+
+    data = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert data["counters"]["agent_turns_total"][0]["value"] == 1
+    assert "agent_turns_total 1" in (tmp_path / "out" / "metrics.prom").read_text(encoding="utf-8")
+
+@pytest.mark.asyncio
+async def test_executor_records_tool_metrics():
+    await ToolExecutor.execute([
+        {"id": "call_1", "function": {"name": "metrics_echo_tool", "arguments": '{"text": "hi"}'}},
+        {"id": "call_2", "function": {"name": "nonexistent_tool", "arguments": "{}"}}
+    ])
+
+    snapshot = metrics.snapshot()
+    statuses = {e["labels"]["tool"]: e["labels"]["status"] for e in snapshot["counters"]["tool_calls_total"]}
+    assert statuses == {"metrics_echo_tool": "ok", "nonexistent_tool": "error"}
+    assert snapshot["histograms"]["tool_duration_seconds"][0]["labels"] == {"tool": "metrics_echo_tool"}
+
+@pytest.mark.asyncio
+async def test_llm_chat_records_latency_and_tokens():
+    client = LLMClient(Settings(openai_api_key="k", openai_base_url="http://test.url", openai_model="m"))
+    response = MagicMock()
+    response.choices[0].message.content = "hi"
+    response.choices[0].message.tool_calls = None
+    response.usage.prompt_tokens = 120
+    response.usage.completion_tokens = 8
+    client.client.chat.completions.create = AsyncMock(return_value=response)
+
+    await client.chat([{"role": "user", "content": "Hi"}])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["llm_prompt_tokens_total"][0]["value"] == 120
+    assert snapshot["counters"]["llm_completion_tokens_total"][0]["value"] == 8
+    assert snapshot["histograms"]["llm_request_seconds"][0]["labels"] == {"mode": "chat"}
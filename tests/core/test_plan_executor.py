@@ -0,0 +1,65 @@
+import time
+import asyncio
+import pytest
+from codeagent.core.task_manager import TaskManager, TaskStatus
+from codeagent.core.plan_executor import PlanExecutor
+
+def make_plan(tasks):
+    tm = TaskManager()
+    tm.create_plan([{"id": tid, "description": f"do {tid}", "dependencies": deps} for tid, deps in tasks])
+    return tm
+
+async def drain(executor):
+    return [line async for line in executor.run()]
+
+def test_ready_tasks_are_the_whole_frontier():
+    tm = make_plan([("1", []), ("2", []), ("3", ["1"]), ("4", ["1", "2"])])
+    assert [t.id for t in tm.get_ready_tasks()] == ["1", "2"]
+    tm.update_task("1", TaskStatus.COMPLETED)
+    assert [t.id for t in tm.get_ready_tasks()] == ["2", "3"]
+
+@pytest.mark.asyncio
+async def test_independent_tasks_run_in_parallel():
+    # 9 independent tasks plus a final one depending on all of them
+    tm = make_plan([(str(i), []) for i in range(9)] + [("final", [str(i) for i in range(9)])])
+    active = 0
+    peak = 0
+
+    async def run_task(task):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return f"done {task.id}"
+
+    start = time.perf_counter()
+    progress = await drain(PlanExecutor(tm, run_task, max_concurrency=3))
+    elapsed = time.perf_counter() - start
+
+    assert peak == 3
+    # 4 waves of 0.05s instead of 10 sequential runs
+    assert elapsed < 0.35
+    assert all(t.status == TaskStatus.COMPLETED for t in tm.tasks.values())
+    assert tm.get_task("final").result == "done final"
+    assert progress[-1] == "[Plan] Task final completed (10/10)"
+
+@pytest.mark.asyncio
+async def test_dependencies_are_respected_and_failures_recorded():
+    tm = make_plan([("a", []), ("b", ["a"]), ("c", []), ("d", ["c"])])
+    order = []
+
+    async def run_task(task):
+        order.append(task.id)
+        if task.id == "c":
+            raise RuntimeError("boom")
+        return "ok"
+
+    await drain(PlanExecutor(tm, run_task, max_concurrency=2))
+
+    assert order.index("a") < order.index("b")
+    assert tm.get_task("c").status == TaskStatus.FAILED
+    assert "boom" in tm.get_task("c").error
+    # Dependents of a failed task are never started
+    assert tm.get_task("d").status == TaskStatus.SKIPPED
+    assert tm.get_task("b").status == TaskStatus.COMPLETED
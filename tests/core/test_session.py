@@ -1,5 +1,10 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
 from codeagent.core.session import Session
 from codeagent.core.message import Message
+from codeagent.core.metrics import metrics
+from codeagent.core.tokenizer import CharRatioTokenizer
 
 def test_session_init():
     session = Session(system_prompt="Custom Prompt")
@@ -27,3 +32,237 @@ def test_clear_session():
     session.clear()
     assert len(session.history) == 1
     assert session.history[0].role == "system"
+
+def test_prefix_stable_inject_context_uses_fixed_slots():
+    session = Session(prefix_stable=True)
+    session.add_message(Message.user("Hi"))
+    session.inject_context("first")
+    session.inject_context("second")
+
+    # Slots fill in order, before the conversation
+    assert [m.content for m in session.history[1:3]] == [
+        "Context from Parent Agent:\nfirst",
+        "Context from Parent Agent:\nsecond"
+    ]
+    assert session.history[3].content == "Hi"
+
+    session.get_messages()
+    session.inject_context("late")
+
+    # After a request was sent, context is appended instead of shifting the prefix
+    assert session.history[-1].content == "Context from Parent Agent:\nlate"
+    session.get_messages()
+    assert session.prefix_stats["reused_messages"] == 4
+
+def test_legacy_inject_context_inserts_after_system_prompt():
+    session = Session()
+    session.add_message(Message.user("Hi"))
+    session.get_messages()
+    session.inject_context("ctx")
+
+    assert session.history[1].content == "Context from Parent Agent:\nctx"
+    session.get_messages()
+    assert session.prefix_stats["reused_messages"] == 1
+
+def test_prefix_stats_counts_reused_tokens():
+    session = Session(system_prompt="S" * 40, prefix_stable=True, tokenizer=CharRatioTokenizer())
+    session.add_message(Message.user("U" * 40))
+    session.get_messages()
+    assert session.prefix_stats["reused_tokens"] == 0
+
+    session.add_message(Message.assistant("A" * 40))
+    session.get_messages()
+    assert session.prefix_stats["reused_messages"] == 2
+    assert session.prefix_stats["reused_tokens"] == 20
+    assert session.prefix_stats["prompt_tokens"] == 30
+
+def test_prefix_stats_are_exported_as_metrics():
+    metrics.reset()
+    session = Session(system_prompt="S" * 40, prefix_stable=True, tokenizer=CharRatioTokenizer())
+    session.add_message(Message.user("U" * 40))
+    session.get_messages()
+    session.add_message(Message.assistant("A" * 40))
+    session.get_messages()
+    counters = metrics.snapshot()["counters"]
+    assert counters["prompt_tokens_total"][0]["value"] == 20 + 30
+    assert counters["prompt_prefix_reused_tokens_total"][0]["value"] == 20
+    metrics.reset()
+
+def test_token_totals_are_incremental():
+    session = Session(system_prompt="S" * 40, tokenizer=CharRatioTokenizer())
+    user = Message.user("U" * 80)
+    session.add_message(user)
+    session.add_message(Message.assistant(tool_calls=[{"id": "c", "function": {"name": "x"}}]))
+
+    assert user._tokens == 20
+    assert session._count_tokens() == sum(session._message_tokens(m) for m in session.history)
+    by_role = session.token_usage_by_role()
+    assert by_role["system"] == 10
+    assert by_role["user"] == 20
+    assert by_role["assistant"] > 0
+
+    session.inject_context("C" * 100)
+    assert session.token_usage_by_role()["system"] == 10 + session._message_tokens(session.history[1])
+
+    session.clear()
+    assert session._count_tokens() == 10
+    assert session.token_usage_by_role() == {"system": 10}
+
+@pytest.mark.asyncio
+async def test_compression_updates_token_totals():
+    session = Session(system_prompt="S" * 40, tokenizer=CharRatioTokenizer())
+    session.max_tokens = 400
+    session.reserved_output_tokens = 0
+    for i in range(30):
+        session.add_message(Message.user("U" * 48))
+
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=Message.assistant("short summary"))
+    await session.compress_context(llm)
+
+    assert len(session.history) == 12  # system + summary + last 10
+    assert session._count_tokens() == sum(session._message_tokens(m) for m in session.history)
+
+def make_full_session(count):
+    session = Session(system_prompt="S" * 40, tokenizer=CharRatioTokenizer())
+    session.max_tokens = 400
+    session.reserved_output_tokens = 0
+    for i in range(count):
+        session.add_message(Message.user("U" * 48))
+    return session
+
+@pytest.mark.asyncio
+async def test_background_compression_swaps_at_turn_boundary():
+    session = make_full_session(24)  # ~0.75 of the window
+    release = asyncio.Event()
+
+    async def slow_chat(messages):
+        await release.wait()
+        return Message.assistant("bg summary")
+
+    llm = MagicMock()
+    llm.chat = AsyncMock(side_effect=slow_chat)
+
+    await session.maybe_compress(llm)
+    assert session._compression_task is not None
+    assert len(session.history) == 25  # Not blocked, nothing replaced yet
+
+    # The conversation keeps growing while the summary is generated
+    session.add_message(Message.user("new"))
+    release.set()
+    await asyncio.wait([session._compression_task])
+
+    await session.maybe_compress(llm)
+    assert session.history[1].content == "<Previous Context Summary>: bg summary"
+    assert session.history[-1].content == "new"
+    assert len(session.history) == 13  # system + summary + 10 preserved + new
+    assert session._count_tokens() == sum(session._message_tokens(m) for m in session.history)
+    assert llm.chat.await_count == 1
+
+@pytest.mark.asyncio
+async def test_stale_background_summary_is_discarded():
+    session = make_full_session(24)
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=Message.assistant("bg summary"))
+
+    session.start_background_compression(llm)
+    snapshot = session._compression_snapshot
+    # Range was rewritten in the meantime (e.g. a blocking compression)
+    session.history.remove(snapshot[3])
+    await asyncio.wait([session._compression_task])
+
+    assert session.apply_background_compression() is False
+    assert all("Summary" not in (m.content or "") for m in session.history)
+
+@pytest.mark.asyncio
+async def test_hard_limit_awaits_in_flight_summary():
+    session = make_full_session(24)
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=Message.assistant("bg summary"))
+
+    session.start_background_compression(llm)
+    for i in range(6):
+        session.add_message(Message.user("U" * 48))
+    assert session.token_usage_ratio() >= session.compression_hard_ratio
+
+    await session.maybe_compress(llm)
+    assert session.history[1].content == "<Previous Context Summary>: bg summary"
+    assert session.token_usage_ratio() < session.compression_hard_ratio
+    assert llm.chat.await_count == 1
+
+def test_chunks_keep_tool_results_with_their_call():
+    session = Session(system_prompt="S", tokenizer=CharRatioTokenizer())
+    session.compression_chunk_tokens = 20
+    call = Message(role="assistant", content="A" * 40, tool_calls=[{"id": "c1", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}])
+    messages = [
+        Message.user("U" * 40),
+        call,
+        Message.tool(tool_call_id="c1", content="T" * 40, name="read_file"),
+        Message.user("U" * 40),
+    ]
+    chunks = session._chunk_messages(messages)
+    assert [len(c) for c in chunks] == [1, 2, 1]
+    assert chunks[1][0] is call
+
+@pytest.mark.asyncio
+async def test_hierarchical_compression_bounds_concurrency():
+    session = make_full_session(30)
+    session.compression_chunk_tokens = 50  # 4 messages per chunk
+    session.compression_concurrency = 2
+    active = 0
+    peak = 0
+    calls = []
+
+    async def chat(messages):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        calls.append(messages[0]["content"])
+        return Message.assistant(f"s{len(calls)}")
+
+    llm = MagicMock()
+    llm.chat = AsyncMock(side_effect=chat)
+    await session.compress_context(llm)
+
+    # 20 messages -> 5 chunk summaries + 1 merge
+    assert llm.chat.await_count == 6
+    assert peak == 2
+    assert calls[-1].startswith("Merge")
+    assert len(session.history) == 12
+    assert session.history[1].content == "<Previous Context Summary>: s6"
+
+@pytest.mark.asyncio
+async def test_failed_chunk_keeps_raw_messages():
+    session = make_full_session(14)
+    session.add_message(Message.user("keep me" + "U" * 41))
+    for i in range(15):
+        session.add_message(Message.user("U" * 48))
+    session.compression_chunk_tokens = 120  # 10 messages per chunk
+    raw_chunk = session.history[11:21]
+
+    async def chat(messages):
+        if "keep me" in messages[0]["content"]:
+            raise RuntimeError("summary failed")
+        return Message.assistant("ok")
+
+    llm = MagicMock()
+    llm.chat = AsyncMock(side_effect=chat)
+    await session.compress_context(llm)
+
+    assert session.history[1].content == "<Previous Context Summary>: ok"
+    assert session.history[2:12] == raw_chunk
+    assert len(session.history) == 1 + 1 + 10 + 10
+    assert session._count_tokens() == sum(session._message_tokens(m) for m in session.history)
+    # The failed chunk stays compressible and is retried by the next pass
+    assert session.compression_boundary == 2
+
+    llm.chat = AsyncMock(return_value=Message.assistant("retried"))
+    session.compression_hard_ratio = 0.0
+    await session.compress_context(llm)
+    assert [m.content for m in session.history[1:3]] == [
+        "<Previous Context Summary>: ok", "<Previous Context Summary>: retried"
+    ]
+    assert len(session.history) == 1 + 2 + 10
+    assert session.compression_boundary == 3
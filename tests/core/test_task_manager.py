@@ -0,0 +1,82 @@
+import pytest
+from codeagent.core.task_manager import TaskManager, TaskStatus
+
+def make_plan(tasks):
+    tm = TaskManager()
+    tm.create_plan([{"id": tid, "description": f"do {tid}", "dependencies": deps} for tid, deps in tasks])
+    return tm
+
+def test_next_task_follows_dependencies():
+    tm = make_plan([("1", []), ("2", ["1"]), ("3", ["1", "2"])])
+    assert tm.get_next_task().id == "1"
+    tm.update_task("1", TaskStatus.COMPLETED)
+    assert tm.get_next_task().id == "2"
+    tm.update_task("2", TaskStatus.IN_PROGRESS)
+    assert tm.get_next_task() is None
+    tm.update_task("2", TaskStatus.COMPLETED)
+    assert [t.id for t in tm.get_ready_tasks()] == ["3"]
+
+def test_reopening_a_completed_task_blocks_dependents():
+    tm = make_plan([("1", []), ("2", ["1"])])
+    tm.update_task("1", TaskStatus.COMPLETED)
+    assert tm.get_next_task().id == "2"
+    tm.update_task("1", TaskStatus.PENDING)
+    assert [t.id for t in tm.get_ready_tasks()] == ["1"]
+
+@pytest.mark.parametrize("tasks, message", [
+    ([("1", []), ("1", [])], "Duplicate task ID"),
+    ([("1", ["missing"])], "unknown task missing"),
+    ([("1", ["3"]), ("2", ["1"]), ("3", ["2"]), ("4", [])], "cycle between tasks: 1, 2, 3"),
+    ([("1", ["1"])], "cycle"),
+])
+def test_invalid_plans_are_rejected(tasks, message):
+    tm = make_plan([("old", [])])
+    with pytest.raises(ValueError, match=message):
+        tm.create_plan([{"id": tid, "description": tid, "dependencies": deps} for tid, deps in tasks])
+    # The previous plan stays active
+    assert list(tm.tasks) == ["old"]
+
+def test_failure_skips_transitive_dependents():
+    tm = make_plan([("1", []), ("2", ["1"]), ("3", ["2"]), ("4", []), ("5", ["3", "4"])])
+    tm.update_task("1", TaskStatus.FAILED, error="boom")
+
+    assert [tm.get_task(t).status for t in ("2", "3", "5")] == [TaskStatus.SKIPPED] * 3
+    assert "dependency 1" in tm.get_task("2").error
+    assert [t.id for t in tm.get_ready_tasks()] == ["4"]
+
+def test_retrying_a_failed_task_restores_skipped_dependents():
+    tm = make_plan([("1", []), ("2", ["1"]), ("3", ["2"]), ("4", []), ("5", ["3", "4"]), ("6", [])])
+    tm.update_task("6", TaskStatus.SKIPPED)  # Skipped by the LLM itself
+    tm.update_task("4", TaskStatus.FAILED, error="boom")
+    tm.update_task("1", TaskStatus.FAILED, error="boom")
+
+    tm.update_task("1", TaskStatus.IN_PROGRESS)
+    assert [tm.get_task(t).status for t in ("2", "3")] == [TaskStatus.PENDING] * 2
+    assert tm.get_task("2").error is None
+    # 5 still waits on the failed 4; 6 was not skipped because of a dependency
+    assert tm.get_task("5").status == TaskStatus.SKIPPED
+    assert tm.get_task("6").status == TaskStatus.SKIPPED
+    assert tm.get_ready_tasks() == []
+
+    tm.update_task("1", TaskStatus.COMPLETED)
+    assert [t.id for t in tm.get_ready_tasks()] == ["2"]
+    tm.update_task("4", TaskStatus.COMPLETED)
+    assert tm.get_task("5").status == TaskStatus.PENDING
+
+def test_plan_delta_lists_only_changes_since_last_shown():
+    tm = make_plan([(str(i), []) for i in range(50)])
+    tm.get_plan_summary()
+    tm.update_task("3", TaskStatus.COMPLETED, result="ok")
+    tm.update_task("7", TaskStatus.FAILED, error="boom")
+
+    delta = tm.get_plan_delta()
+    assert "1/50 completed" in delta and "1 failed" in delta and "48 pending" in delta
+    assert "[X] Task 3" in delta and "[!] Task 7" in delta and "Error: boom" in delta
+    assert "Task 4:" not in delta
+    assert "No task status changes" in tm.get_plan_delta()
+
+def test_full_summary_resets_delta():
+    tm = make_plan([("1", []), ("2", ["1"])])
+    tm.update_task("1", TaskStatus.FAILED, error="boom")
+    assert "[-] Task 2" in tm.get_plan_summary()
+    assert "No task status changes" in tm.get_plan_delta()
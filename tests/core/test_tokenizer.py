@@ -0,0 +1,40 @@
+import pytest
+from codeagent.core.tokenizer import Tokenizer, CharRatioTokenizer, HeuristicTokenizer, get_tokenizer
+from codeagent.core.session import Session
+
+def test_heuristic_counts_cjk_per_character():
+    tokenizer = HeuristicTokenizer()
+    text = "请帮我重构这个函数让它更快"
+    # One token per ideograph instead of len // 4
+    assert tokenizer.count(text) == len(text)
+    assert CharRatioTokenizer().count(text) == len(text) // 4
+
+def test_heuristic_english_close_to_word_count():
+    tokenizer = HeuristicTokenizer()
+    assert tokenizer.count("Hello world this is a test") == 6
+    # Long identifiers count as several sub-word tokens
+    assert tokenizer.count("internationalization") == 3
+
+def test_heuristic_punctuation_digits_and_whitespace():
+    tokenizer = HeuristicTokenizer()
+    assert tokenizer.count("123456789") == 3
+    assert tokenizer.count("a\n\nb") == 4
+    assert tokenizer.count("") == 0
+
+def test_heuristic_scale():
+    assert HeuristicTokenizer(scale=2.0).count("你好世界") == 8
+
+def test_get_tokenizer_falls_back_without_vocab(tmp_path):
+    assert isinstance(get_tokenizer(), HeuristicTokenizer)
+    assert isinstance(get_tokenizer(str(tmp_path / "missing.json")), HeuristicTokenizer)
+
+def test_session_uses_tokenizer():
+    session = Session(system_prompt="系统提示", tokenizer=HeuristicTokenizer())
+    assert session._count_tokens() == 4
+
+def test_tokenizer_subclasses_must_implement_count():
+    class Incomplete(Tokenizer):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
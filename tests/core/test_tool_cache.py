@@ -0,0 +1,107 @@
+import pytest
+from codeagent.core.tool_cache import ToolResultCache
+from codeagent.core.executor import ToolExecutor
+import codeagent.tools.file_tools
+import codeagent.tools.search_tools
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ToolResultCache()
+    monkeypatch.setattr(ToolExecutor, "cache", fresh)
+    return fresh
+
+def test_lru_eviction_by_bytes():
+    cache = ToolResultCache(max_bytes=10)
+    cache.put("a", "12345", [], ())
+    cache.put("b", "12345", [], ())
+    assert cache.get("a", ()) == "12345"  # "a" is now most recently used
+    cache.put("c", "12345", [], ())
+
+    assert cache.get("b", ()) is None
+    assert cache.get("a", ()) == "12345"
+    assert cache.get("c", ()) == "12345"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 10
+
+def test_stale_stamps_miss(tmp_path):
+    f = tmp_path / "a.txt"
+    f.write_text("one", encoding="utf-8")
+    cache = ToolResultCache()
+    stamps = cache.snapshot([str(f)])
+    cache.put("k", "one", [str(f)], stamps)
+
+    assert cache.get("k", cache.snapshot([str(f)])) == "one"
+    f.write_text("changed", encoding="utf-8")
+    assert cache.get("k", cache.snapshot([str(f)])) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_recursive_snapshot_sees_nested_changes(tmp_path):
+    (tmp_path / "sub").mkdir()
+    cache = ToolResultCache()
+    before = cache.snapshot([str(tmp_path)], recursive=True)
+    (tmp_path / "sub" / "new.py").write_text("x = 1", encoding="utf-8")
+    assert cache.snapshot([str(tmp_path)], recursive=True) != before
+
+def test_invalidate_paths_drops_ancestors(tmp_path):
+    cache = ToolResultCache()
+    cache.put("tree", "x", [str(tmp_path)], ())
+    cache.put("other", "y", [str(tmp_path / "other.txt")], ())
+    cache.invalidate_paths([str(tmp_path / "sub" / "file.txt")])
+
+    assert cache.get("tree", ()) is None
+    assert cache.get("other", ()) == "y"
+
+@pytest.mark.asyncio
+async def test_executor_caches_read_file(tmp_path, cache, make_call):
+    f = tmp_path / "a.txt"
+    f.write_text("hello", encoding="utf-8")
+
+    first = await ToolExecutor.execute([make_call("c1", "read_file", path=str(f))])
+    second = await ToolExecutor.execute([make_call("c2", "read_file", path=str(f))])
+
+    assert first[0]["content"] == second[0]["content"] == "hello"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_write_file_invalidates_cached_read(tmp_path, cache, make_call):
+    f = tmp_path / "a.txt"
+    f.write_text("hello", encoding="utf-8")
+
+    await ToolExecutor.execute([make_call("c1", "glob_search", pattern="*.txt", path=str(tmp_path))])
+    assert cache.stats()["entries"] == 1
+
+    results = await ToolExecutor.execute([
+        make_call("c2", "write_file", path=str(f), content="bye"),
+        make_call("c3", "read_file", path=str(f)),
+    ])
+
+    assert results[1]["content"] == "bye"
+    assert cache.stats()["invalidations"] == 1
+
+@pytest.mark.asyncio
+async def test_run_shell_flushes_cache(tmp_path, cache, make_call):
+    f = tmp_path / "a.txt"
+    f.write_text("hello", encoding="utf-8")
+    await ToolExecutor.execute([make_call("c1", "read_file", path=str(f))])
+    assert cache.stats()["entries"] == 1
+
+    import codeagent.tools.shell_tools
+    await ToolExecutor.execute([make_call("c2", "run_shell", command="echo hi")])
+
+    assert cache.stats()["entries"] == 0
+
+@pytest.mark.asyncio
+async def test_glob_search_cache_follows_tree(tmp_path, cache, make_call):
+    (tmp_path / "a.py").write_text("x", encoding="utf-8")
+    first = await ToolExecutor.execute([make_call("c1", "glob_search", pattern="**/*.py", path=str(tmp_path))])
+    second = await ToolExecutor.execute([make_call("c2", "glob_search", pattern="**/*.py", path=str(tmp_path))])
+    assert first[0]["content"] == second[0]["content"]
+    assert cache.stats()["hits"] == 1
+
+    # Created outside the agent: the tree fingerprint changes
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.py").write_text("x", encoding="utf-8")
+    third = await ToolExecutor.execute([make_call("c3", "glob_search", pattern="**/*.py", path=str(tmp_path))])
+    assert "b.py" in third[0]["content"]
@@ -0,0 +1,50 @@
+import json
+import time
+import pytest
+from codeagent.core.trace import TraceSink, trace_span
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+def test_events_are_written_by_background_thread(tmp_path):
+    sink = TraceSink(str(tmp_path / "trace.log"))
+    sink.emit("LLM_REQUEST", {"model": "m"})
+    with sink.span("tool", tool="read_file"):
+        pass
+    with pytest.raises(RuntimeError):
+        with sink.span("compression"):
+            raise RuntimeError("boom")
+    sink.close()
+
+    events = read_events(tmp_path / "trace.log")
+    assert [e["event"] for e in events] == ["LLM_REQUEST", "SPAN", "SPAN"]
+    assert events[1]["data"]["name"] == "tool" and events[1]["data"]["tool"] == "read_file"
+    assert events[1]["data"]["status"] == "ok" and "duration_ms" in events[1]["data"]
+    assert events[2]["data"]["status"] == "error" and events[2]["data"]["error"] == "boom"
+
+def test_rotation_by_size(tmp_path):
+    sink = TraceSink(str(tmp_path / "trace.log"), max_bytes=2000, backup_count=2)
+    for i in range(200):
+        sink.emit("EVENT", {"i": i, "pad": "x" * 50})
+    sink.close()
+
+    assert (tmp_path / "trace.log.1").exists()
+    assert not (tmp_path / "trace.log.3").exists()
+
+class StalledSink(TraceSink):
+    def _run(self):
+        pass  # Writer never drains the queue
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    sink = StalledSink(str(tmp_path / "trace.log"), queue_size=5)
+    start = time.perf_counter()
+    for i in range(100):
+        sink.emit("EVENT", i)
+    assert time.perf_counter() - start < 0.5
+    assert sink.dropped == 95
+    sink.close(timeout=0.1)
+
+def test_trace_span_is_noop_without_active_sink():
+    TraceSink.shutdown()
+    with trace_span("tool", tool="x") as attrs:
+        attrs["extra"] = 1
@@ -3,6 +3,7 @@ import pytest
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 
+from codeagent.config import Settings
 from codeagent.core.session import Session
 from codeagent.core.agent import Agent
 from codeagent.core.message import Message
@@ -30,10 +31,11 @@ async def test_agent_run_appends_context(tmp_path, monkeypatch):
     (tmp_path / "x.txt").write_text("hello\nworld\n", encoding="utf-8")
     monkeypatch.chdir(tmp_path)
 
-    settings = MagicMock()
-    settings.openai_api_key = "test"
-    settings.openai_base_url = "http://test"
-    settings.openai_model = "test"
+    settings = Settings(
+        openai_api_key="test",
+        openai_base_url="http://test",
+        openai_model="test"
+    )
 
     agent = Agent(settings)
     agent.llm.chat = AsyncMock(return_value=Message.assistant("OK"))
@@ -59,11 +61,12 @@ async def test_submit_task_injects_resources_hints(monkeypatch):
 
     # Stub settings to avoid env dependency
     import codeagent.tools.agent_tools as tools_agent_mod
-    fake_settings = MagicMock()
-    fake_settings.openai_api_key = "test"
-    fake_settings.openai_base_url = "http://test"
-    fake_settings.openai_model = "test"
-    fake_settings.debug_mode = False
+    fake_settings = Settings(
+        openai_api_key="test",
+        openai_base_url="http://test",
+        openai_model="test",
+        debug_mode=False
+    )
     monkeypatch.setattr(tools_agent_mod, "get_settings", lambda: fake_settings, raising=True)
 
     args = TaskArgs(
@@ -2,12 +2,17 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from codeagent.tools.agent_tools import submit_task, TaskArgs
 from codeagent.core.message import Message
+from codeagent.config import Settings
 
 @pytest.mark.asyncio
 async def test_submit_task():
     # Mock settings
     with patch("codeagent.tools.agent_tools.get_settings") as mock_get_settings:
-        mock_settings = MagicMock()
+        mock_settings = Settings(
+            openai_api_key="test",
+            openai_base_url="http://test",
+            openai_model="test"
+        )
         mock_get_settings.return_value = mock_settings
         
         # Mock Agent inside the tool
@@ -16,7 +21,7 @@ async def test_submit_task():
             MockAgentClass.return_value = mock_agent_instance
             
             # Setup async generator for agent.run
-            async def mock_run(goal):
+            async def mock_run(goal, context_summary=None):
                 yield "I have "
                 yield "completed "
                 yield "the task."
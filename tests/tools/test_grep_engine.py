@@ -0,0 +1,90 @@
+import mmap
+from codeagent.core.ignore import IgnoreRules
+from codeagent.tools import grep_engine
+from codeagent.tools.search_tools import grep_search, GrepArgs
+
+def make_tree(root):
+    (root / ".git").mkdir()
+    (root / ".gitignore").write_text("build/\n*.log\n!keep.log\n/top.txt\n", encoding="utf-8")
+    (root / "src").mkdir()
+    (root / "src" / "app.py").write_text("def main():\n    return 'needle'\n", encoding="utf-8")
+    (root / "src" / ".gitignore").write_text("generated_*.py\n", encoding="utf-8")
+    (root / "src" / "generated_1.py").write_text("needle = 1\n", encoding="utf-8")
+    (root / "build").mkdir()
+    (root / "build" / "out.py").write_text("needle\n", encoding="utf-8")
+    (root / "debug.log").write_text("needle\n", encoding="utf-8")
+    (root / "keep.log").write_text("needle kept\n", encoding="utf-8")
+    (root / "top.txt").write_text("needle\n", encoding="utf-8")
+    (root / "docs").mkdir()
+    (root / "docs" / "top.txt").write_text("needle in docs\n", encoding="utf-8")
+    (root / "image.dat").write_bytes(b"needle\x00\x01\x02" * 10)
+
+def test_gitignore_rules(tmp_path):
+    make_tree(tmp_path)
+    files = sorted(p.replace(str(tmp_path), "").lstrip("/\\\\") for p in grep_engine.iter_files(str(tmp_path)))
+    assert files == [".gitignore", "docs/top.txt", "image.dat", "keep.log", "src/.gitignore", "src/app.py"]
+
+def test_gitignore_applies_from_enclosing_work_tree(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "src" / "trace.log").write_text("needle\n", encoding="utf-8")
+    files = list(grep_engine.iter_files(str(tmp_path / "src")))
+    assert not any(f.endswith("trace.log") for f in files)
+
+def test_double_star_patterns(tmp_path):
+    rules = IgnoreRules(tuple(IgnoreRules.parse(str(tmp_path), "**/cache/**\ndocs/**/*.tmp\n")))
+    assert rules.is_ignored(str(tmp_path / "a" / "cache" / "x.py"), False)
+    assert rules.is_ignored(str(tmp_path / "docs" / "a" / "b" / "x.tmp"), False)
+    assert not rules.is_ignored(str(tmp_path / "src" / "x.tmp"), False)
+
+def test_binary_and_ignored_files_are_skipped(tmp_path):
+    make_tree(tmp_path)
+    res = grep_search(GrepArgs(pattern="needle", path=str(tmp_path)))
+    assert "app.py:2:" in res and "keep.log:1: needle kept" in res and "in docs" in res
+    for skipped in ("image.dat", "generated_1.py", "build", "debug.log", f"{tmp_path}/top.txt"):
+        assert skipped not in res
+
+def test_regex_and_case_folding(tmp_path):
+    (tmp_path / "a.txt").write_text("foo = 12\nFOO = bar\nПривет мир\n", encoding="utf-8")
+    assert "a.txt:1:" in grep_search(GrepArgs(pattern=r"foo = \d+", path=str(tmp_path), regex=True, case_sensitive=True))
+    assert "a.txt:2:" not in grep_search(GrepArgs(pattern=r"foo = \d+", path=str(tmp_path), regex=True))
+    assert "a.txt:3: Привет мир" in grep_search(GrepArgs(pattern="привет", path=str(tmp_path)))
+    assert "Invalid regex" in grep_search(GrepArgs(pattern="(unclosed", path=str(tmp_path), regex=True))
+
+def test_stops_at_match_limit(tmp_path):
+    (tmp_path / "many.txt").write_text("hit\n" * 500, encoding="utf-8")
+    matches, truncated = grep_engine.search(str(tmp_path), "hit", max_results=100)
+    assert truncated and len(matches) == 100
+    assert [m[1] for m in matches[:3]] == [1, 2, 3]
+
+def test_large_file_is_memory_mapped(tmp_path):
+    lines = [f"line {i}" for i in range(5000)]
+    lines[4321] = "the needle line"
+    (tmp_path / "big.txt").write_text("\n".join(lines), encoding="utf-8")
+    matches, _ = grep_engine.search(str(tmp_path), "NEEDLE")
+    assert matches == [(str(tmp_path / "big.txt"), 4322, "the needle line")]
+
+def test_parallel_scan_keeps_walk_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(grep_engine, "MAX_WORKERS", 2)
+    monkeypatch.setattr(grep_engine, "PARALLEL_MIN_FILES", 5)
+    monkeypatch.setattr(grep_engine, "BATCH_FILES", 4)
+    for i in range(40):
+        (tmp_path / f"f{i:02d}.txt").write_text("x\nneedle\n" if i % 3 == 0 else "x\n", encoding="utf-8")
+    try:
+        matches, truncated = grep_engine.search(str(tmp_path), "needle", max_results=100)
+        limited, limited_truncated = grep_engine.search(str(tmp_path), "needle", max_results=5)
+    finally:
+        grep_engine.shutdown_pool()
+
+    expected = [str(tmp_path / f"f{i:02d}.txt") for i in range(0, 40, 3)]
+    assert [m[0] for m in matches] == expected and not truncated
+    assert [m[0] for m in limited] == expected[:5] and limited_truncated
+
+def test_prefilter_windows_overlap(tmp_path, monkeypatch):
+    monkeypatch.setattr(grep_engine, "PREFILTER_WINDOW", 64)
+    path = tmp_path / "big.txt"
+    # The needle straddles the first window boundary
+    path.write_bytes(b"x" * 60 + b"NeedLE" + b"y" * 200)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        assert grep_engine.contains_lower(data, b"needle")
+        assert not grep_engine.contains_lower(data, b"absent")
+    assert grep_engine.contains_lower(b"a NEEDLE", b"needle")
@@ -1,5 +1,6 @@
+import pytest
 from pydantic import BaseModel, Field
-from codeagent.tools.registry import tool, ToolRegistry
+from codeagent.tools.registry import tool, ToolRegistry, ToolArgumentError
 
 class AddArgs(BaseModel):
     a: int = Field(..., description="First number")
@@ -23,3 +24,28 @@ def test_schema_generation():
     assert schema["function"]["description"] == "Add two numbers."
     assert "a" in schema["function"]["parameters"]["properties"]
     assert "b" in schema["function"]["parameters"]["properties"]
+
+def test_dispatch_entry_compiled_at_registration():
+    entry = ToolRegistry.get_entry("add_numbers")
+    assert entry.args_model is AddArgs
+    assert entry.is_async is False
+    assert entry.read_only is False
+    assert entry.schema["function"]["name"] == "add_numbers"
+
+def test_entry_validate_returns_model():
+    entry = ToolRegistry.get_entry("add_numbers")
+    call_args, call_kwargs = entry.validate('{"a": 1, "b": 2}')
+    assert call_args == (AddArgs(a=1, b=2),)
+    assert call_kwargs == {}
+
+def test_entry_validate_structured_errors():
+    entry = ToolRegistry.get_entry("add_numbers")
+    with pytest.raises(ToolArgumentError) as exc_info:
+        entry.validate('{"a": "not a number"}')
+    fields = {e["field"] for e in exc_info.value.errors}
+    assert fields == {"a", "b"}
+    assert "Invalid arguments for tool 'add_numbers'" in str(exc_info.value)
+
+def test_schemas_sorted_by_name():
+    names = [s["function"]["name"] for s in ToolRegistry.get_schemas()]
+    assert names == sorted(names)
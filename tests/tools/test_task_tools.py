@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import patch
+from codeagent.core.context import current_task_manager, current_progress
+from codeagent.core.task_manager import TaskManager, TaskStatus
+from codeagent.tools.task_tools import plan_task, PlanTaskArgs, run_plan, RunPlanArgs
+
+def test_plan_task_reports_invalid_plan():
+    token = current_task_manager.set(TaskManager())
+    try:
+        output = plan_task(PlanTaskArgs(tasks=[{"id": "a", "description": "x", "dependencies": ["a"]}]))
+    finally:
+        current_task_manager.reset(token)
+    assert output.startswith("Error creating plan: Dependency cycle")
+
+@pytest.mark.asyncio
+async def test_run_plan_passes_dependency_results():
+    tm = TaskManager()
+    tm.create_plan([
+        {"id": "1", "description": "write code"},
+        {"id": "2", "description": "test code", "dependencies": ["1"]},
+    ])
+    calls = []
+    reported = []
+
+    async def fake_submit(args):
+        # Progress of earlier tasks is reported while later ones still run
+        reported.append(f"submitted {args.task_id}")
+        calls.append(args)
+        return f"finished {args.task_id}"
+
+    token = current_task_manager.set(tm)
+    progress_token = current_progress.set(reported.append)
+    try:
+        with patch("codeagent.tools.task_tools.submit_task", side_effect=fake_submit):
+            output = await run_plan(RunPlanArgs(max_parallel=2))
+    finally:
+        current_progress.reset(progress_token)
+        current_task_manager.reset(token)
+
+    assert reported.index("[Plan] Task 1 completed (1/2)") < reported.index("submitted 2")
+    assert [c.task_id for c in calls] == ["1", "2"]
+    assert calls[1].context_summary == "Results of prerequisite tasks:\nTask 1: finished 1"
+    assert tm.get_task("2").status == TaskStatus.COMPLETED
+    assert "[Plan] Task 2 completed (2/2)" in output
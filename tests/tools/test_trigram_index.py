@@ -0,0 +1,182 @@
+import os
+import time
+import pytest
+from codeagent.core.executor import ToolExecutor
+from codeagent.tools import grep_engine, trigram_index
+from codeagent.tools.trigram_index import TrigramIndex, query_trigrams
+from codeagent.tools.search_tools import grep_search, GrepArgs
+
+EXCLUDE = [".git", ".venv", "__pycache__", "node_modules"]
+
+@pytest.fixture
+def index_dir(tmp_path):
+    TrigramIndex.configure(str(tmp_path / "index"))
+    yield tmp_path / "index"
+    TrigramIndex.configure(None)
+
+def make_repo(root):
+    (root / ".git").mkdir(parents=True)
+    (root / ".gitignore").write_text("build/\n", encoding="utf-8")
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "app.py").write_text("def main():\n    return find_needle()\n", encoding="utf-8")
+    (root / "src" / "pkg" / "util.py").write_text("def find_needle():\n    return 'Needle'\n", encoding="utf-8")
+    (root / "src" / "z.py").write_text("NEEDLE = 1\n", encoding="utf-8")
+    (root / "README.md").write_text("nothing here\n", encoding="utf-8")
+    (root / "build").mkdir()
+    (root / "build" / "out.py").write_text("needle\n", encoding="utf-8")
+    (root / "blob.dat").write_bytes(b"needle\x00" * 10)
+    return root
+
+def build(root):
+    index = TrigramIndex.for_path(str(root))
+    assert index.wait(10)
+    return index
+
+def same_as_scan(index, path, pattern, **kwargs):
+    kwargs.setdefault("exclude_dirs", EXCLUDE)
+    result = index.search(str(path), pattern, **kwargs)
+    assert result == grep_engine.search(str(path), pattern, **kwargs)
+    return result
+
+def test_query_trigrams():
+    assert query_trigrams("ab") == []
+    assert len(query_trigrams("abcd")) == 2
+    assert query_trigrams("ABCD") == query_trigrams("abcd")
+    # Required literals of a regex; alternation alone gives nothing to narrow on
+    assert query_trigrams(r"foo\w+bar", regex=True) == sorted(query_trigrams("foo") + query_trigrams("bar"))
+    assert query_trigrams(r"ab?cd", regex=True) == []
+    assert query_trigrams(r"foo|bar", regex=True) == []
+    assert query_trigrams(r"(needle)+x", regex=True) == query_trigrams("needle")
+
+def test_results_match_full_scan(tmp_path, index_dir):
+    root = make_repo(tmp_path / "repo")
+    index = build(root)
+    matches, truncated = same_as_scan(index, root, "needle")
+    assert [os.path.relpath(p, root) for p, _, _ in matches] == [
+        os.path.join("src", "app.py"), os.path.join("src", "z.py"),
+        os.path.join("src", "pkg", "util.py"), os.path.join("src", "pkg", "util.py")
+    ]
+    assert not truncated
+    same_as_scan(index, root, "Needle", case_sensitive=True)
+    same_as_scan(index, root, r"find_\w+\(", regex=True)
+    same_as_scan(index, root, "absent pattern")
+    # Searching a subdirectory rebases candidates on the given path
+    matches, _ = same_as_scan(index, root / "src" / "pkg", "needle")
+    assert matches[0][0] == os.path.join(str(root / "src" / "pkg"), "util.py")
+
+def test_queries_it_cannot_answer(tmp_path, index_dir):
+    root = make_repo(tmp_path / "repo")
+    index = build(root)
+    assert index.search(str(root), "ne") is None  # Too short
+    assert index.search(str(root), "needle", exclude_dirs=[]) is None  # Needs excluded dirs
+    assert index.search(str(root / "build"), "needle", exclude_dirs=EXCLUDE) is None  # Ignored dir
+    with pytest.raises(ValueError):
+        index.search(str(root), "(", regex=True)
+
+def test_incremental_refresh(tmp_path, index_dir, monkeypatch):
+    monkeypatch.setattr(trigram_index, "COMPACT_RATIO", 1.0)
+    root = make_repo(tmp_path / "repo")
+    index = build(root)
+    (root / "README.md").write_text("a needle now\n", encoding="utf-8")
+    (root / "src" / "z.py").unlink()
+    (root / "src" / "new.py").write_text("needle_new = 2\n", encoding="utf-8")
+    segments = len(index.segments)
+    index.refresh()
+    assert len(index.segments) == segments + 1
+    matches, _ = same_as_scan(index, root, "needle")
+    assert {os.path.basename(p) for p, _, _ in matches} == {"README.md", "app.py", "new.py", "util.py"}
+    assert "src/z.py" not in index.files
+
+    # A reopened index sees the same live files
+    reopened = TrigramIndex(index.root, index.directory)
+    reopened.refresh()
+    assert reopened.files.keys() == index.files.keys()
+    same_as_scan(reopened, root, "needle")
+    reopened.close()
+
+def test_compaction(tmp_path, index_dir, monkeypatch):
+    monkeypatch.setattr(trigram_index, "MAX_SEGMENTS", 2)
+    root = make_repo(tmp_path / "repo")
+    index = build(root)
+    for i in range(3):
+        (root / "src" / f"extra_{i}.py").write_text(f"needle {i}\n", encoding="utf-8")
+        index.refresh()
+    assert len(index.segments) <= 2
+    same_as_scan(index, root, "needle")
+    stored = {name.split(".")[0] for name in os.listdir(index.directory) if name.startswith("seg-")}
+    assert stored == {s.name for s in index.segments}
+
+def test_agent_changes(tmp_path, index_dir, monkeypatch):
+    root = make_repo(tmp_path / "repo")
+    index = build(root)
+    monkeypatch.setattr(index, "schedule_refresh", lambda: None)
+    # Files the agent wrote are scanned before the next refresh
+    (root / "src" / "written.py").write_text("needle = 3\n", encoding="utf-8")
+    ToolExecutor._notify_invalidation([str(root / "src" / "written.py")])
+    matches, _ = same_as_scan(index, root, "needle")
+    assert any(p.endswith("written.py") for p, _, _ in matches)
+    # Unknown side effects: queries scan the tree until a refresh
+    ToolExecutor._notify_invalidation(None)
+    assert index.search(str(root), "needle", exclude_dirs=EXCLUDE) is None
+    index.refresh()
+    assert index.search(str(root), "needle", exclude_dirs=EXCLUDE) is not None
+
+def age_dirs(root, seconds=3600):
+    """Backdate every directory, as in a checkout that is not being edited."""
+    past = time.time() - seconds
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (past, past))
+
+def test_external_edits_are_found_before_refresh(tmp_path, index_dir, monkeypatch):
+    root = make_repo(tmp_path / "repo")
+    age_dirs(root)
+    index = build(root)
+    monkeypatch.setattr(index, "schedule_refresh", lambda: None)
+    # Saved by replacement (as editors do) and created outside the agent: no notification, no refresh
+    (root / "README.md.tmp").write_text("nothing here\nneedlexyz\n", encoding="utf-8")
+    os.replace(root / "README.md.tmp", root / "README.md")
+    (root / "src" / "pkg" / "fresh.py").write_text("x = 'needlexyz'\n", encoding="utf-8")
+    matches, _ = same_as_scan(index, root, "needlexyz")
+    assert {os.path.basename(p) for p, _, _ in matches} == {"README.md", "fresh.py"}
+    res = grep_search(GrepArgs(pattern="needlexyz", path=str(root)))
+    assert "README.md:2: needlexyz" in res
+
+def test_in_place_edits_are_found_after_refresh(tmp_path, index_dir, monkeypatch):
+    root = make_repo(tmp_path / "repo")
+    age_dirs(root)
+    index = build(root)
+    refreshes = []
+    monkeypatch.setattr(index, "schedule_refresh", lambda: refreshes.append(1))
+    # Rewritten in place: the directory is unchanged, but the file is a
+    # candidate of this query, so its new mtime triggers a refresh
+    with open(root / "src" / "z.py", "a", encoding="utf-8") as f:
+        f.write("needle_in_place = 2\n")
+    same_as_scan(index, root, "needle")
+    assert refreshes
+    index.refresh()
+    matches, _ = same_as_scan(index, root, "needle_in_place")
+    assert [os.path.basename(p) for p, _, _ in matches] == ["z.py"]
+
+def test_queries_stat_only_changed_directories(tmp_path, index_dir, monkeypatch):
+    root = make_repo(tmp_path / "repo")
+    for i in range(300):
+        (root / "src" / f"mod_{i}.py").write_text(f"value = {i}\n", encoding="utf-8")
+    age_dirs(root)
+    index = build(root)
+    monkeypatch.setattr(index, "schedule_refresh", lambda: None)
+    index.search(str(root), "needle", exclude_dirs=EXCLUDE)  # Warm the shared FileTree
+    stats = []
+    original = os.stat
+    monkeypatch.setattr(os, "stat", lambda p, *a, **kw: stats.append(p) or original(p, *a, **kw))
+    same_as_scan(index, root, "needle")
+    assert len(stats) < 20
+
+def test_grep_search_uses_index(tmp_path, index_dir, monkeypatch):
+    root = make_repo(tmp_path / "repo")
+    expected = grep_search(GrepArgs(pattern="needle", path=str(root)))
+    build(root)
+    scanned = []
+    original = grep_engine.search
+    monkeypatch.setattr(grep_engine, "search", lambda *a, **kw: scanned.append(kw.get("files")) or original(*a, **kw))
+    assert grep_search(GrepArgs(pattern="needle", path=str(root))) == expected
+    assert len(scanned[0]) == 3